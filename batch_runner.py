@@ -0,0 +1,128 @@
+"""
+Параллельный прогон множества независимых игровых сессий без окна
+
+Пример: python batch_runner.py --episodes 200 --levels 1,2 --workers 8
+"""
+
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from game import Game, InputState, parse_input_script
+
+
+class Episode(NamedTuple):
+    """Задание на одну сессию: уровень, зерно случайности и лимит кадров"""
+    level: int
+    seed: int
+    max_frames: int = 3600
+    # Сценарий управления (см. parse_input_script); если пуст - случайный игрок
+    script: str = ''
+    entity_arrays: bool = False
+    # Шагов симуляции в одном крупном шаге (см. Game.step_many); итог не меняется
+    step_ticks: int = 1
+
+
+class RandomPolicy:
+    """Случайный игрок: держит направление случайное число кадров и иногда прыгает
+
+    Последовательность действий полностью определяется зерном.
+    """
+
+    def __init__(self, seed: int, jump_chance: float = 0.05):
+        self.rng = random.Random(seed)
+        self.jump_chance = jump_chance
+        self.current = InputState()
+        self.frames_left = 0
+
+    def __call__(self, frame: int) -> InputState:
+        if self.frames_left <= 0:
+            roll = self.rng.random()
+            self.current = InputState(left=roll < 0.25, right=roll > 0.4)
+            self.frames_left = self.rng.randint(10, 90)
+        self.frames_left -= 1
+        return self.current._replace(jump=self.rng.random() < self.jump_chance)
+
+
+def run_episode(episode: Episode) -> Dict[str, Any]:
+    """Прогон одной сессии в текущем процессе"""
+    game = Game(headless=True, entity_arrays=episode.entity_arrays)
+    script = parse_input_script(episode.script) if episode.script else RandomPolicy(episode.seed)
+
+    started = time.perf_counter()
+    result = game.run_headless(episode.level, script, episode.max_frames, episode.step_ticks)
+    result["seed"] = episode.seed
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def run_batch(episodes: Sequence[Episode], workers: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Прогон сессий в пуле процессов
+
+    Каждый процесс создает свои экземпляры Game, поэтому сессии не делят
+    никакого состояния. Возвращает результаты по сессиям (в порядке
+    заданий) и сводку с общей пропускной способностью.
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    if workers == 1:
+        results = [run_episode(episode) for episode in episodes]
+    else:
+        # Задания отдаются пачками, чтобы пересылка между процессами не съедала выигрыш
+        chunksize = max(1, len(episodes) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_episode, episodes, chunksize=chunksize))
+    wall_time = time.perf_counter() - started
+
+    total_frames = sum(result["frames"] for result in results)
+    summary = {
+        "episodes": len(results),
+        "workers": workers,
+        "frames": total_frames,
+        "wall_seconds": wall_time,
+        "frames_per_second": total_frames / wall_time if wall_time > 0 else 0.0,
+        "won": sum(result["won"] for result in results),
+        "lost": sum(result["lost"] for result in results),
+    }
+    return results, summary
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Параллельный прогон игровых сессий без окна")
+    parser.add_argument('--episodes', type=int, default=100, help="число сессий")
+    parser.add_argument('--levels', default='1,2', help="номера уровней через запятую (по кругу)")
+    parser.add_argument('--frames', type=int, default=3600, help="максимум кадров на сессию")
+    parser.add_argument('--seed', type=int, default=0, help="зерно первой сессии")
+    parser.add_argument('--workers', type=int, default=None, help="число процессов (по умолчанию - число ядер)")
+    parser.add_argument('--script', default='', help="общий сценарий управления вместо случайного игрока")
+    parser.add_argument('--entity-arrays', action='store_true', help="монетки и враги в массивах NumPy")
+    parser.add_argument('--step-ticks', type=int, default=1,
+                        help="шагов симуляции в одном крупном шаге (4-8 - быстрее с тем же итогом)")
+    parser.add_argument('--results', action='store_true', help="выводить результаты каждой сессии")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Точка входа: прогон и вывод сводки в JSON"""
+    args = parse_args()
+    levels = [int(level) for level in args.levels.split(',')]
+    episodes = [Episode(levels[i % len(levels)], args.seed + i, args.frames, args.script, args.entity_arrays,
+                        args.step_ticks)
+                for i in range(args.episodes)]
+
+    results, summary = run_batch(episodes, args.workers)
+    if args.results:
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Замеры производительности игры на синтетических нагруженных сценах
+
+Пример: python bench.py --scene 100:1000:100 --scene 500:5000:1000:20000 --ticks 600 --render
+Результат - JSON со средним временем и p99 по фазам кадра.
+"""
+
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+# Замеры с отрисовкой не открывают окно, если драйвер не задан явно
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import json
+import random
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from batch_runner import RandomPolicy
+from game import Game, HEIGHT, WIDTH
+from levels import EnemyData, LevelData, PlatformData
+from profiler import PhaseTimer, summarize
+
+SIMULATION_PHASES = ['update', 'collisions']
+RENDER_PHASES = ['sync', 'background', 'sprites', 'particles', 'ui']
+
+
+class SceneSpec(NamedTuple):
+    """Размер нагруженной сцены: число платформ, монеток и врагов, ширина уровня"""
+    platforms: int
+    coins: int
+    enemies: int
+    width: int = WIDTH
+
+    @classmethod
+    def parse(cls, text: str) -> "SceneSpec":
+        """Разбор строки вида "платформы:монетки:враги[:ширина]" """
+        return cls(*(int(part) for part in text.split(':')))
+
+    def __str__(self) -> str:
+        text = f"{self.platforms}:{self.coins}:{self.enemies}"
+        return text if self.width == WIDTH else f"{text}:{self.width}"
+
+
+def make_stress_level(spec: SceneSpec, seed: int = 0, theme: str = 'day') -> LevelData:
+    """Уровень со случайно расставленными по всей ширине платформами, монетками и врагами"""
+    rng = random.Random(seed)
+    gray, brown = (128, 128, 128), (139, 69, 19)
+
+    platforms = []
+    for _ in range(max(1, spec.platforms)):
+        width = rng.randrange(80, 220)
+        platforms.append(PlatformData(rng.randrange(0, spec.width - width), rng.randrange(120, HEIGHT - 90),
+                                      width, 20, gray, brown))
+    coins = [(rng.randrange(15, spec.width - 15), rng.randrange(60, HEIGHT - 70)) for _ in range(spec.coins)]
+    enemies = [EnemyData(rng.randrange(len(platforms)), rng.choice((2, 3)), None, (255, 0, 0))
+               for _ in range(spec.enemies)]
+
+    return LevelData(
+        number=1,
+        theme=theme,
+        player_start=(100, HEIGHT - 100),
+        ground=PlatformData(0, HEIGHT - 50, spec.width, 50, brown, (0, 255, 0)),
+        platforms=platforms,
+        coins=coins,
+        enemies=enemies,
+        flag=(spec.width + 100, 0, (128, 0, 128)),  # флаг за краем уровня, чтобы сцена не заканчивалась
+        width=spec.width,
+    )
+
+
+def run_scene(spec: SceneSpec, ticks: int, render: bool, seed: int = 0,
+              entity_arrays: bool = False, particles: int = 0) -> Dict[str, Any]:
+    """Прогон сцены заданное число шагов с замером времени фаз
+
+    particles - сколько частиц эффектов держать на экране (только с отрисовкой)
+    """
+    phases = SIMULATION_PHASES + (RENDER_PHASES if render else [])
+    game = Game(headless=not render, render_fps=0, entity_arrays=entity_arrays)
+    game.build_level(make_stress_level(spec, seed))
+    # Игрок бессмертен, чтобы все шаги прошли на одной сцене
+    game.player.lives = 10 ** 9
+
+    timer = PhaseTimer(phases)
+    game.phase_timer = timer
+    policy = RandomPolicy(seed)
+
+    for tick in range(ticks):
+        timer.begin_frame()
+        if render and particles and game.particles is not None:
+            # Недостающие частицы выпускаются по всему экрану
+            game.particles.emit(game.camera.x + WIDTH // 2, HEIGHT // 2, particles - len(game.particles),
+                                speed=4, life=90, colors=((255, 255, 0), (255, 0, 0), (255, 255, 255)),
+                                width=WIDTH, height=HEIGHT)
+        game.step(policy(tick))
+        if render:
+            game.sync_entities()
+            timer.mark('sync')
+            game.frame_time_ms = game.sim_time_ms()
+            game.draw_frame()
+        timer.end_frame()
+
+    return {
+        "scene": str(spec),
+        "mode": "render" if render else "headless",
+        "entity_arrays": entity_arrays,
+        "particles": particles if render else 0,
+        "ticks": ticks,
+        "phases": summarize(phases, timer.samples),
+    }
+
+
+def find_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+                     tolerance: float) -> List[str]:
+    """Сравнение с прошлыми результатами: фазы, ставшие медленнее больше чем на tolerance"""
+    def key(result: Dict[str, Any]) -> tuple:
+        return result["scene"], result["mode"], result["entity_arrays"], result.get("particles", 0)
+
+    previous = {key(result): result for result in baseline}
+    problems = []
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        for phase, stats in result["phases"].items():
+            old_stats = old["phases"].get(phase)
+            if not old_stats:
+                continue
+            for metric in ("mean_ms", "p99_ms"):
+                if stats[metric] > old_stats[metric] * (1 + tolerance):
+                    problems.append(f"{result['scene']} {result['mode']} {phase} {metric}: "
+                                    f"{old_stats[metric]:.3f} -> {stats[metric]:.3f}")
+    return problems
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Замеры производительности на нагруженных сценах")
+    parser.add_argument('--scene', action='append', type=SceneSpec.parse,
+                        help="сцена \"платформы:монетки:враги[:ширина уровня]\", можно несколько раз")
+    parser.add_argument('--ticks', type=int, default=600, help="число шагов на сцену")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--render', action='store_true', help="также замерить отрисовку")
+    parser.add_argument('--entity-arrays', action='store_true', help="монетки и враги в массивах NumPy")
+    parser.add_argument('--particles', type=int, default=0,
+                        help="число частиц эффектов на экране при замере отрисовки")
+    parser.add_argument('--out', help="записать результаты в файл вместо вывода")
+    parser.add_argument('--baseline', help="файл прошлых результатов для поиска регрессий")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="допустимое замедление относительно --baseline (доля)")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Точка входа: замеры на всех сценах, без окна и с отрисовкой"""
+    args = parse_args()
+    scenes = args.scene or [SceneSpec(10, 20, 5), SceneSpec(100, 1000, 100), SceneSpec(500, 5000, 1000)]
+
+    results = []
+    for spec in scenes:
+        results.append(run_scene(spec, args.ticks, False, args.seed, args.entity_arrays))
+        if args.render:
+            results.append(run_scene(spec, args.ticks, True, args.seed, args.entity_arrays, args.particles))
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as file:
+            file.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            problems = find_regressions(results, json.load(file), args.tolerance)
+        for problem in problems:
+            print("Регрессия:", problem, file=sys.stderr)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
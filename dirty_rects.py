@@ -0,0 +1,114 @@
+"""
+Учет изменившихся областей экрана для обновления окна по частям
+"""
+
+from typing import Any, Dict, Hashable, List, Tuple
+
+import pygame
+
+
+class DirtyRectTracker:
+    """Собирает области экрана, которые изменились с прошлого кадра
+
+    Каждый кадр для всех отслеживаемых объектов передается их прямоугольник
+    и (необязательно) состояние внешнего вида. Если прямоугольник или
+    состояние изменились, грязными становятся и старая, и новая области.
+    Объекты, которые в кадре не были переданы (собранные монетки и т. п.),
+    оставляют грязной свою последнюю область.
+    """
+
+    def __init__(self, screen_rect: pygame.Rect, max_rects: int = 16, full_redraw_threshold: int = 64):
+        self.screen_rect = pygame.Rect(screen_rect)
+        # Больше max_rects областей склеиваются между собой,
+        # больше full_redraw_threshold - проще перерисовать весь экран
+        self.max_rects = max_rects
+        self.full_redraw_threshold = full_redraw_threshold
+        self._tracked: Dict[Hashable, Tuple[pygame.Rect, Any]] = {}
+        self._seen: Dict[Hashable, None] = {}
+        self._dirty: List[pygame.Rect] = []
+        self._full = True
+
+    def invalidate(self) -> None:
+        """Следующий кадр перерисовывается целиком"""
+        self._full = True
+
+    def mark(self, rect: pygame.Rect) -> None:
+        """Пометить область как изменившуюся"""
+        self._dirty.append(pygame.Rect(rect))
+
+    def begin_frame(self) -> None:
+        """Начало сбора объектов кадра"""
+        self._seen.clear()
+
+    def track(self, key: Hashable, rect: pygame.Rect, state: Any = None) -> None:
+        """Передача текущей области и состояния объекта"""
+        self._seen[key] = None
+        previous = self._tracked.get(key)
+        if previous is not None:
+            old_rect, old_state = previous
+            if old_rect == rect and old_state == state:
+                return
+            self._dirty.append(old_rect)
+        self._dirty.append(rect)
+        self._tracked[key] = (rect, state)
+
+    def end_frame(self) -> None:
+        """Завершение сбора: исчезнувшие объекты освобождают свою область"""
+        if len(self._seen) == len(self._tracked):
+            return
+        for key in [key for key in self._tracked if key not in self._seen]:
+            rect, _ = self._tracked.pop(key)
+            self._dirty.append(rect)
+
+    def reset(self) -> None:
+        """Забыть все отслеживаемые объекты (смена сцены)"""
+        self._tracked.clear()
+        self._seen.clear()
+        self.invalidate()
+
+    def collect(self) -> List[pygame.Rect]:
+        """Итоговый список областей для перерисовки, после вызова список очищается"""
+        dirty, self._dirty = self._dirty, []
+        if self._full or len(dirty) > self.full_redraw_threshold:
+            self._full = False
+            return [self.screen_rect.copy()]
+
+        rects = [rect.clip(self.screen_rect) for rect in dirty]
+        rects = _merge_overlapping([rect for rect in rects if rect.width and rect.height])
+        while len(rects) > self.max_rects:
+            rects = _merge_cheapest_pair(rects)
+        return rects
+
+
+def _merge_overlapping(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+    """Склейка пересекающихся и соприкасающихся областей"""
+    merged: List[pygame.Rect] = []
+    for rect in rects:
+        rect = rect.copy()
+        changed = True
+        while changed:
+            changed = False
+            for i, other in enumerate(merged):
+                if rect.inflate(2, 2).colliderect(other):
+                    rect.union_ip(merged.pop(i))
+                    changed = True
+                    break
+        merged.append(rect)
+    return merged
+
+
+def _merge_cheapest_pair(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+    """Склейка двух областей, объединение которых добавляет меньше всего площади"""
+    best = None
+    best_cost = None
+    for i in range(len(rects)):
+        a = rects[i]
+        for j in range(i + 1, len(rects)):
+            b = rects[j]
+            union = a.union(b)
+            cost = union.width * union.height - a.width * a.height - b.width * b.height
+            if best_cost is None or cost < best_cost:
+                best, best_cost = (i, j, union), cost
+    i, j, union = best
+    rest = [rect for k, rect in enumerate(rects) if k != i and k != j]
+    return _merge_overlapping(rest + [union])
@@ -0,0 +1,148 @@
+"""
+Хранение монеток и врагов в массивах NumPy для пакетного обновления
+"""
+
+import math
+from array import array
+from typing import Dict, List, Sequence
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # NumPy - необязательная зависимость
+    np = None
+
+NUMPY_AVAILABLE = np is not None
+
+
+class EntityArrays:
+    """Монетки и враги уровня в виде структуры массивов
+
+    Вместо вызова update() у каждого спрайта анимация монеток, патрулирование
+    врагов и разворот на границах считаются одной векторной операцией на
+    весь уровень. Столкновения с игроком тоже проверяются по массивам.
+    Прямоугольники спрайтов обновляются только перед отрисовкой
+    (sync_sprites), поэтому между шагами они могут отставать от массивов.
+
+    Сущности выключенных участков уровня (см. set_active) не патрулируют,
+    не сталкиваются с игроком и не переносятся в спрайты.
+    """
+
+    def __init__(self, coins: Sequence[pygame.sprite.Sprite], enemies: Sequence[pygame.sprite.Sprite],
+                 bob_amplitude: int = 3):
+        if np is None:
+            raise RuntimeError("Для хранения сущностей в массивах нужен NumPy (pip install numpy)")
+
+        self.bob_amplitude = bob_amplitude
+
+        # Монетки: левый край, базовая высота (см. Coin.update), размер, признак "не собрана"
+        self.coins: List[pygame.sprite.Sprite] = list(coins)
+        self.coin_x = np.array([coin.rect.x for coin in self.coins], dtype=np.int32)
+        self.coin_base_y = np.array([coin.original_y for coin in self.coins], dtype=np.int32)
+        self.coin_y = np.array([coin.rect.y for coin in self.coins], dtype=np.int32)
+        self.coin_w = np.array([coin.rect.width for coin in self.coins], dtype=np.int32)
+        self.coin_h = np.array([coin.rect.height for coin in self.coins], dtype=np.int32)
+        self.coin_alive = np.ones(len(self.coins), dtype=bool)
+        self.coin_prev_y = self.coin_y.copy()
+        self.coin_active = np.ones(len(self.coins), dtype=bool)
+        self.coin_index: Dict[pygame.sprite.Sprite, int] = {coin: i for i, coin in enumerate(self.coins)}
+
+        # Враги: положение, размер, скорость, направление и границы патрулирования
+        self.enemies: List[pygame.sprite.Sprite] = list(enemies)
+        self.enemy_x = np.array([enemy.rect.x for enemy in self.enemies], dtype=np.int32)
+        self.enemy_y = np.array([enemy.platform_rect.top - enemy.rect.height for enemy in self.enemies],
+                                dtype=np.int32)
+        self.enemy_w = np.array([enemy.rect.width for enemy in self.enemies], dtype=np.int32)
+        self.enemy_h = np.array([enemy.rect.height for enemy in self.enemies], dtype=np.int32)
+        self.enemy_speed = np.array([enemy.speed for enemy in self.enemies], dtype=np.int32)
+        self.enemy_direction = np.array([enemy.direction for enemy in self.enemies], dtype=np.int32)
+        self.enemy_left_bound = np.array([enemy.left_bound for enemy in self.enemies], dtype=np.int32)
+        self.enemy_right_bound = np.array([enemy.right_bound for enemy in self.enemies], dtype=np.int32)
+        self.enemy_prev_x = self.enemy_x.copy()
+        self.enemy_active = np.ones(len(self.enemies), dtype=bool)
+        self.enemy_index: Dict[pygame.sprite.Sprite, int] = {enemy: i for i, enemy in enumerate(self.enemies)}
+
+    def set_active(self, coins: Sequence[pygame.sprite.Sprite], enemies: Sequence[pygame.sprite.Sprite],
+                   active: bool) -> None:
+        """Включение или выключение монеток и врагов (участок уровня у камеры или вдали)"""
+        if coins:
+            self.coin_active[[self.coin_index[coin] for coin in coins]] = active
+        if enemies:
+            self.enemy_active[[self.enemy_index[enemy] for enemy in enemies]] = active
+
+    def save_previous(self) -> None:
+        """Запоминание позиций перед шагом (для интерполяции при отрисовке)"""
+        self.coin_prev_y[:] = self.coin_y
+        self.enemy_prev_x[:] = self.enemy_x
+
+    def step(self, time_ms: int) -> None:
+        """Один шаг анимации монеток и патрулирования врагов"""
+        self.bob_coins(time_ms)
+
+        x = self.enemy_x
+        x += self.enemy_speed * self.enemy_direction * self.enemy_active
+        turn = self.enemy_active & ((x + self.enemy_w >= self.enemy_right_bound) | (x <= self.enemy_left_bound))
+        self.enemy_direction[turn] *= -1
+
+    def bob_coins(self, time_ms: int) -> None:
+        """Высота монеток на момент time_ms"""
+        # У всех монеток одна фаза подпрыгивания, смещение считается один раз
+        offset = int(math.sin(time_ms * 0.005) * self.bob_amplitude)
+        np.add(self.coin_base_y, offset, out=self.coin_y)
+
+    def enemy_state(self) -> array:
+        """Положения и направления врагов подряд: x, y, направление (см. snapshots)"""
+        state = np.column_stack((self.enemy_x, self.enemy_y, self.enemy_direction)).astype(np.int32)
+        return array('i', state.tobytes())
+
+    def set_enemy_state(self, state: array) -> None:
+        """Восстановление врагов из enemy_state()"""
+        values = np.frombuffer(state, dtype=np.int32).reshape(-1, 3)
+        self.enemy_x[:] = values[:, 0]
+        self.enemy_y[:] = values[:, 1]
+        self.enemy_direction[:] = values[:, 2]
+
+    def set_coin_alive(self, alive: bytes) -> None:
+        """Восстановление несобранных монеток (байт на монетку)"""
+        self.coin_alive[:] = np.frombuffer(alive, dtype=np.uint8).astype(bool)
+
+    def coin_hits(self, rect: pygame.Rect) -> List[int]:
+        """Индексы несобранных монеток, пересекающихся с прямоугольником"""
+        hits = (self.coin_alive & self.coin_active
+                & (self.coin_x < rect.right) & (self.coin_x + self.coin_w > rect.left)
+                & (self.coin_y < rect.bottom) & (self.coin_y + self.coin_h > rect.top))
+        return np.flatnonzero(hits).tolist()
+
+    def collect_coin(self, index: int) -> pygame.sprite.Sprite:
+        """Пометка монетки собранной, возвращает ее спрайт"""
+        self.coin_alive[index] = False
+        return self.coins[index]
+
+    def enemy_hit(self, rect: pygame.Rect) -> bool:
+        """Пересекается ли прямоугольник хотя бы с одним врагом"""
+        if not self.enemies:
+            return False
+        hits = (self.enemy_active & (self.enemy_x < rect.right) & (self.enemy_x + self.enemy_w > rect.left)
+                & (self.enemy_y < rect.bottom) & (self.enemy_y + self.enemy_h > rect.top))
+        return bool(hits.any())
+
+    def sync_sprites(self) -> None:
+        """Перенос положений из массивов в прямоугольники спрайтов для отрисовки"""
+        visible = np.flatnonzero(self.coin_alive & self.coin_active)
+        coins = self.coins
+        for i, x, y, prev_y in zip(visible.tolist(), self.coin_x[visible].tolist(), self.coin_y[visible].tolist(),
+                                   self.coin_prev_y[visible].tolist()):
+            coin = coins[i]
+            coin.rect.topleft = (x, y)
+            coin.prev_pos = (x, prev_y)
+
+        active = np.flatnonzero(self.enemy_active)
+        enemies = self.enemies
+        for i, x, y, prev_x, direction in zip(active.tolist(), self.enemy_x[active].tolist(),
+                                              self.enemy_y[active].tolist(), self.enemy_prev_x[active].tolist(),
+                                              self.enemy_direction[active].tolist()):
+            enemy = enemies[i]
+            enemy.rect.topleft = (x, y)
+            enemy.prev_pos = (prev_x, y)
+            enemy.direction = direction
@@ -0,0 +1,398 @@
+"""
+Среда для обучения агентов в стиле Gym: reset/step и наблюдения в массивах NumPy
+
+Пример:
+    env = PlatformerEnv(level=1, frame_skip=4)
+    obs, info = env.reset()
+    obs, reward, terminated, truncated, info = env.step(ACTION_RIGHT_JUMP)
+
+    envs = BatchPlatformerEnv(16, levels=(1, 2))
+    obs, infos = envs.reset()
+    obs, rewards, terminated, truncated, final_infos = envs.step(actions)
+"""
+
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import pygame
+
+from game import HEIGHT, WIDTH, Game, Ground, InputState
+
+try:
+    import numpy as np
+except ImportError:  # NumPy - необязательная зависимость
+    np = None
+
+# Действия агента: номер действия - индекс в ACTIONS
+ACTIONS = (
+    InputState(),
+    InputState(left=True),
+    InputState(right=True),
+    InputState(jump=True),
+    InputState(left=True, jump=True),
+    InputState(right=True, jump=True),
+)
+ACTION_NOOP, ACTION_LEFT, ACTION_RIGHT, ACTION_JUMP, ACTION_LEFT_JUMP, ACTION_RIGHT_JUMP = range(len(ACTIONS))
+
+# Признаки игрока в наблюдении "player" (по порядку)
+PLAYER_FEATURES = ('x', 'y', 'velocity_y', 'jumping', 'lives', 'invincible', 'flag_dx', 'flag_dy')
+# Признаки ближайших объектов: смещения относительно центра игрока и признак наличия
+PLATFORM_FEATURES = ('left', 'right', 'top', 'bottom', 'present')
+ENEMY_FEATURES = ('dx', 'dy', 'direction', 'present')
+COIN_FEATURES = ('dx', 'dy', 'present')
+
+# Награды: за монетку, за пиксель нового продвижения вправо, за потерю жизни и за победу
+COIN_REWARD = 1.0
+PROGRESS_REWARD = 0.01
+DAMAGE_PENALTY = 5.0
+WIN_REWARD = 50.0
+
+# Масштабы для приведения признаков к диапазону около [-1, 1]
+JUMP_SPEED = 12.0
+START_LIVES = 2.0
+
+
+def observation_spec(platforms: int = 8, enemies: int = 4, coins: int = 4,
+                     frame_scale: float = 0.0) -> Dict[str, Tuple[Tuple[int, ...], Any]]:
+    """Форма и тип каждого массива наблюдения: {имя: (форма, dtype)}"""
+    spec = {
+        'player': ((len(PLAYER_FEATURES),), np.float32),
+        'platforms': ((platforms, len(PLATFORM_FEATURES)), np.float32),
+        'enemies': ((enemies, len(ENEMY_FEATURES)), np.float32),
+        'coins': ((coins, len(COIN_FEATURES)), np.float32),
+    }
+    if frame_scale:
+        spec['frame'] = ((round(HEIGHT * frame_scale), round(WIDTH * frame_scale), 3), np.uint8)
+    return spec
+
+
+def allocate_observation(spec: Dict[str, Tuple[Tuple[int, ...], Any]], batch: int) -> Dict[str, Any]:
+    """Массивы наблюдений batch сред (первое измерение - номер среды)"""
+    return {name: np.zeros((batch,) + shape, dtype=dtype) for name, (shape, dtype) in spec.items()}
+
+
+def nearest(distance, count: int) -> Tuple[Any, Any]:
+    """Индексы count ближайших элементов в каждой строке distance и признак, что элемент есть
+
+    distance - (среды, элементы), элементов не меньше count; бесконечность -
+    элемента нет (пустое место или собранная монетка).
+    """
+    index = np.argpartition(distance, count - 1, axis=1)[:, :count]
+    order = np.argsort(np.take_along_axis(distance, index, axis=1), axis=1, kind='stable')
+    index = np.take_along_axis(index, order, axis=1)
+    found = np.isfinite(np.take_along_axis(distance, index, axis=1))
+    return index, found
+
+
+def padded(rows: Sequence[Any], width: int, fill: float) -> Any:
+    """Строки разной длины в одном массиве (строки, max(width, длина)) с заполнением fill"""
+    length = max([width] + [len(row) for row in rows])
+    result = np.full((len(rows), length) + np.shape(rows[0])[1:], fill, dtype=np.float32)
+    for i, row in enumerate(rows):
+        result[i, :len(row)] = row
+    return result
+
+
+class ObservationWriter:
+    """Запись наблюдений нескольких игр в общие массивы
+
+    Неподвижные данные уровней (платформы и центры монеток) собираются
+    один раз при смене уровня в массивы с первым измерением по играм,
+    дополненные "пустыми" элементами до общей длины. Выбор ближайших
+    объектов и расчет признаков - векторные операции сразу по всем играм,
+    по отдельности собираются только состояние игроков и положения врагов.
+    """
+
+    def __init__(self, games: Sequence[Game], observation: Dict[str, Any], frame_scale: float = 0.0):
+        self.games = list(games)
+        self.observation = observation
+        self.frame_scale = frame_scale
+        self._generations: List[int] = []
+        self._frame_surface: Optional[pygame.Surface] = None
+        self._scale = np.array([WIDTH, WIDTH, HEIGHT, HEIGHT], dtype=np.float32)
+
+    def prepare_levels(self) -> None:
+        """Сбор неподвижных данных уровней, если какая-то игра сменила уровень"""
+        generations = [game.level_generation for game in self.games]
+        if generations == self._generations:
+            return
+        self._generations = generations
+        obs = self.observation
+
+        rects, coin_x, coin_y = [], [], []
+        for game in self.games:
+            platforms = [platform.rect for platform in game.level_platforms if not isinstance(platform, Ground)]
+            rects.append(np.array([(rect.left, rect.right, rect.top, rect.bottom) for rect in platforms],
+                                  dtype=np.float32).reshape(-1, 4))
+            coin_x.append([coin.rect.centerx for coin in game.level_coins])
+            coin_y.append([coin.original_y + coin.rect.height / 2 for coin in game.level_coins])
+        # Пустая платформа бесконечно далеко: левый и верхний края на бесконечности
+        self.platform_rects = padded(rects, obs['platforms'].shape[1], np.inf)
+        self.coin_x = padded(coin_x, obs['coins'].shape[1], np.inf)
+        self.coin_y = padded(coin_y, obs['coins'].shape[1], 0.0)
+        self.coin_alive = np.zeros(self.coin_x.shape, dtype=bool)
+
+        enemies = max([obs['enemies'].shape[1]] + [len(game.level_enemies) for game in self.games])
+        self.enemy_x = np.full((len(self.games), enemies), np.inf, dtype=np.float32)
+        self.enemy_y = np.zeros_like(self.enemy_x)
+        self.enemy_direction = np.zeros_like(self.enemy_x)
+
+    def write(self) -> None:
+        """Запись наблюдений всех игр"""
+        self.prepare_levels()
+        centers = self._write_players()
+        cx, cy = centers[:, :1], centers[:, 1:]
+        self._write_platforms(cx, cy)
+        self._write_enemies(cx, cy)
+        self._write_coins(cx, cy)
+        if self.frame_scale:
+            self._write_frames()
+
+    def _write_players(self) -> Any:
+        """Признаки игроков; возвращает центры игроков (игры, 2)"""
+        rows = []
+        for game in self.games:
+            player = game.player
+            rect = player.rect
+            flag = game.finish_flag
+            rows.append((rect.x / player.world_width, rect.y / HEIGHT, player.velocity_y / JUMP_SPEED,
+                         player.jumping, player.lives / START_LIVES, player.invincible,
+                         (flag.rect.centerx - rect.centerx) / WIDTH if flag else 0.0,
+                         (flag.rect.centery - rect.centery) / HEIGHT if flag else 0.0,
+                         rect.centerx, rect.centery))
+        rows = np.array(rows, dtype=np.float32)
+        self.observation['player'][:] = rows[:, :len(PLAYER_FEATURES)]
+        return rows[:, len(PLAYER_FEATURES):]
+
+    def _write_platforms(self, cx, cy) -> None:
+        out = self.observation['platforms']
+        rects = self.platform_rects
+        left, right, top, bottom = rects[..., 0], rects[..., 1], rects[..., 2], rects[..., 3]
+        # Расстояние от центра игрока до прямоугольника платформы
+        dx = np.maximum(np.maximum(left - cx, cx - right), 0)
+        dy = np.maximum(np.maximum(top - cy, cy - bottom), 0)
+        index, found = nearest(dx + dy, out.shape[1])
+        chosen = np.take_along_axis(rects, index[..., None], axis=1)
+        offsets = np.concatenate((cx, cx, cy, cy), axis=1)[:, None, :]
+        out[..., :4] = np.where(found[..., None], (chosen - offsets) / self._scale, 0)
+        out[..., 4] = found
+
+    def _write_enemies(self, cx, cy) -> None:
+        out = self.observation['enemies']
+        x, y, direction = self.enemy_x, self.enemy_y, self.enemy_direction
+        for i, game in enumerate(self.games):
+            arrays = game.entity_arrays
+            if arrays:
+                count = len(arrays.enemies)
+                x[i, :count] = arrays.enemy_x + arrays.enemy_w / 2
+                y[i, :count] = arrays.enemy_y + arrays.enemy_h / 2
+                direction[i, :count] = arrays.enemy_direction
+            elif game.level_enemies:
+                count = len(game.level_enemies)
+                x[i, :count], y[i, :count], direction[i, :count] = zip(
+                    *[(enemy.rect.centerx, enemy.rect.centery, enemy.direction) for enemy in game.level_enemies])
+        self._write_points(out, x - cx, y - cy, direction)
+
+    def _write_coins(self, cx, cy) -> None:
+        alive = self.coin_alive
+        for i, game in enumerate(self.games):
+            alive[i, :len(game.coin_alive)] = np.frombuffer(game.coin_alive, dtype=np.uint8)
+        # Собранные монетки не попадают в наблюдение
+        x = np.where(alive, self.coin_x, np.inf)
+        self._write_points(self.observation['coins'], x - cx, self.coin_y - cy)
+
+    @staticmethod
+    def _write_points(out, dx, dy, extra=None) -> None:
+        """Смещения ближайших точек (и доп. признак), последний столбец - признак наличия"""
+        index, found = nearest(np.abs(dx) + np.abs(dy), out.shape[1])
+        out[..., 0] = np.where(found, np.take_along_axis(dx, index, axis=1) / WIDTH, 0)
+        out[..., 1] = np.where(found, np.take_along_axis(dy, index, axis=1) / HEIGHT, 0)
+        if extra is not None:
+            out[..., 2] = np.where(found, np.take_along_axis(extra, index, axis=1), 0)
+        out[..., -1] = found
+
+    def _write_frames(self) -> None:
+        """Кадры сцены в пониженном разрешении (как Game.draw_frame при масштабе сцены)"""
+        frames = self.observation['frame']
+        surface = self._frame_surface
+        if surface is None:
+            surface = self._frame_surface = pygame.Surface((frames.shape[2], frames.shape[1]), 0, 32)
+        for game, out in zip(self.games, frames):
+            game.frame_time_ms = game.sim_time_ms()
+            game.sync_entities()
+            game.draw_background(surface, self.frame_scale)
+            game.draw_sprites(surface, self.frame_scale)
+            pixels = pygame.surfarray.pixels3d(surface)
+            np.copyto(out, pixels.transpose(1, 0, 2))
+            del pixels
+
+
+class PlatformerEnv:
+    """Один уровень игры как среда обучения
+
+    step(action) делает frame_skip шагов симуляции с одним действием
+    (прыжок - на первом из них) через крупные шаги Game.step, поэтому
+    итог тот же, что у покадрового прогона, а шаг среды дешевле.
+    Перезапуск уровня в reset() - восстановление снимка, сделанного
+    при загрузке (см. Game.restart_level), а не повторная загрузка.
+
+    Наблюдение - словарь массивов NumPy (см. observation_spec), выделенных
+    один раз: каждый вызов reset/step перезаписывает их на месте, поэтому
+    наблюдение, которое нужно сохранить, копируется вызывающим кодом.
+    frame_scale > 0 добавляет кадр сцены "frame" (фон и спрайты, без
+    интерфейса) в разрешении WIDTH*frame_scale x HEIGHT*frame_scale.
+    observe=False - среда без своих наблюдений: массивы не выделяются,
+    reset/step возвращают None вместо наблюдения (так среды ведет
+    BatchPlatformerEnv, который пишет наблюдения в общие массивы).
+    """
+
+    def __init__(self, level: int = 1, frame_skip: int = 4, max_steps: int = 3600,
+                 platforms: int = 8, enemies: int = 4, coins: int = 4, frame_scale: float = 0.0,
+                 entity_arrays: bool = False, observe: bool = True):
+        if np is None:
+            raise RuntimeError("Для среды обучения нужен NumPy (pip install numpy)")
+        self.level = level
+        self.frame_skip = frame_skip
+        # Лимит шагов симуляции на эпизод (после него truncated)
+        self.max_steps = max_steps
+        self.num_actions = len(ACTIONS)
+        self.spec = observation_spec(platforms, enemies, coins, frame_scale)
+        self.game = Game(headless=True, entity_arrays=entity_arrays)
+        self.observation: Optional[Dict[str, Any]] = None
+        self.writer: Optional[ObservationWriter] = None
+        if observe:
+            batch = allocate_observation(self.spec, 1)
+            self.observation = {name: array[0] for name, array in batch.items()}
+            self.writer = ObservationWriter([self.game], batch, frame_scale)
+        self._best_x = 0
+        self._steps = 0
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Начало эпизода: возвращает (наблюдение, сведения)
+
+        Игра детерминирована, seed принимается для совместимости с Gym.
+        """
+        self.restart()
+        if self.writer:
+            self.writer.write()
+        return self.observation, self.info()
+
+    def step(self, action: int) -> Tuple[Dict[str, Any], float, bool, bool, Dict[str, Any]]:
+        """Шаг среды: (наблюдение, награда, эпизод закончен, эпизод прерван, сведения)"""
+        reward, terminated, truncated = self.advance(action)
+        if self.writer:
+            self.writer.write()
+        return self.observation, reward, terminated, truncated, self.info()
+
+    def restart(self) -> None:
+        """Начало эпизода без записи наблюдения"""
+        game = self.game
+        if game.initial_snapshot is not None and game.current_level == self.level:
+            game.restore(game.initial_snapshot)
+        else:
+            game.start_level(self.level)
+        self._best_x = game.player.rect.x
+        self._steps = 0
+
+    def advance(self, action: int) -> Tuple[float, bool, bool]:
+        """Шаг симуляции без записи наблюдения: (награда, закончен, прерван)"""
+        game = self.game
+        player = game.player
+        if game.game_over or game.game_won:
+            raise RuntimeError("Эпизод закончен, перед следующим шагом нужен reset()")
+        score, lives = player.score, player.lives
+
+        inputs = ACTIONS[action]
+        held = inputs._replace(jump=False)
+        ticks = min(self.frame_skip, self.max_steps - self._steps)
+        done = 0
+        while done < ticks and not (game.game_over or game.game_won):
+            done += game.step(inputs if done == 0 else held, ticks - done)
+        self._steps += done
+
+        reward = (player.score - score) / 10 * COIN_REWARD - (lives - player.lives) * DAMAGE_PENALTY
+        if player.rect.x > self._best_x:
+            reward += (player.rect.x - self._best_x) * PROGRESS_REWARD
+            self._best_x = player.rect.x
+        if game.game_won:
+            reward += WIN_REWARD
+        terminated = game.game_over or game.game_won
+        truncated = not terminated and self._steps >= self.max_steps
+        return reward, terminated, truncated
+
+    def info(self) -> Dict[str, Any]:
+        """Сведения о текущем эпизоде"""
+        player = self.game.player
+        return {"score": player.score, "lives": player.lives, "steps": self._steps,
+                "won": self.game.game_won, "lost": self.game.game_over}
+
+    def close(self) -> None:
+        """Возврат спрайтов уровня в пулы"""
+        self.game.reset_game_state()
+
+
+class BatchPlatformerEnv:
+    """num_envs независимых сред, которые шагают одним вызовом
+
+    Симуляция идет по средам: каждая игра делает свои крупные шаги
+    (Game.step) в цикле Python. Пакетно делается только остальное:
+    наблюдения всех сред лежат в общих массивах с первым измерением
+    num_envs и записываются одним проходом ObservationWriter, награды
+    и признаки окончания - в заранее выделенные массивы. Закончившаяся
+    среда сразу перезапускается, и в ее строке оказывается первое
+    наблюдение нового эпизода; сведения о законченных эпизодах step
+    возвращает словарем {номер среды: сведения}, сведения о текущих
+    эпизодах - infos() по запросу.
+
+    levels - номера уровней сред (по кругу), остальные аргументы - как
+    у PlatformerEnv.
+    """
+
+    def __init__(self, num_envs: int, levels: Union[int, Sequence[int]] = 1, frame_skip: int = 4,
+                 max_steps: int = 3600, platforms: int = 8, enemies: int = 4, coins: int = 4,
+                 frame_scale: float = 0.0, entity_arrays: bool = False):
+        if np is None:
+            raise RuntimeError("Для среды обучения нужен NumPy (pip install numpy)")
+        if isinstance(levels, int):
+            levels = (levels,)
+        self.num_envs = num_envs
+        self.num_actions = len(ACTIONS)
+        self.spec = observation_spec(platforms, enemies, coins, frame_scale)
+        self.observation = allocate_observation(self.spec, num_envs)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+        # Наблюдения пишет общий writer, у самих сред их нет
+        self.envs = [PlatformerEnv(levels[i % len(levels)], frame_skip, max_steps,
+                                   entity_arrays=entity_arrays, observe=False)
+                     for i in range(num_envs)]
+        self.writer = ObservationWriter([env.game for env in self.envs], self.observation, frame_scale)
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Начало эпизода во всех средах: (наблюдения, сведения по средам)"""
+        for env in self.envs:
+            env.restart()
+        self.writer.write()
+        return self.observation, self.infos()
+
+    def step(self, actions: Sequence[int]) -> Tuple[Dict[str, Any], Any, Any, Any, Dict[int, Dict[str, Any]]]:
+        """Шаг всех сред: (наблюдения, награды, закончены, прерваны, сведения о законченных эпизодах)"""
+        rewards, terminated, truncated = self.rewards, self.terminated, self.truncated
+        final_infos = {}
+        for i, (env, action) in enumerate(zip(self.envs, np.asarray(actions).tolist())):
+            rewards[i], terminated[i], truncated[i] = env.advance(action)
+            if terminated[i] or truncated[i]:
+                final_infos[i] = env.info()
+                env.restart()
+        self.writer.write()
+        return self.observation, rewards, terminated, truncated, final_infos
+
+    def infos(self) -> List[Dict[str, Any]]:
+        """Сведения о текущих эпизодах всех сред"""
+        return [env.info() for env in self.envs]
+
+    def close(self) -> None:
+        for env in self.envs:
+            env.close()
@@ -0,0 +1,60 @@
+"""
+Подстройка разрешения отрисовки сцены под время кадра
+"""
+
+from collections import deque
+from typing import Deque, Sequence
+
+# Доступные масштабы сцены относительно размера окна (от полного к самому низкому).
+# Растяжение в целое число раз заметно дешевле: при 0.75 растяжение на окно
+# съедает почти весь выигрыш, поэтому промежуточной ступени нет
+RENDER_SCALES = (1.0, 0.5)
+
+
+class AdaptiveResolution:
+    """Выбор масштаба отрисовки сцены по времени последних кадров
+
+    В record() передается время работы кадра без ожидания (ограничение FPS,
+    вертикальная синхронизация). Если среднее за последние window кадров
+    больше high_water бюджета кадра, масштаб понижается на ступень, если
+    меньше low_water - повышается. После смены масштаба решение
+    не принимается cooldown кадров, чтобы масштаб не скакал каждый кадр.
+    """
+
+    def __init__(self, budget: float, scales: Sequence[float] = RENDER_SCALES, window: int = 30,
+                 cooldown: int = 60, low_water: float = 0.5, high_water: float = 0.9):
+        self.budget = budget
+        self.scales = tuple(scales)
+        self.window = window
+        self.cooldown = cooldown
+        self.low_water = low_water
+        self.high_water = high_water
+        self.level = 0
+        self._times: Deque[float] = deque(maxlen=window)
+        self._frames_since_change = 0
+
+    @property
+    def scale(self) -> float:
+        return self.scales[self.level]
+
+    def record(self, work_seconds: float) -> None:
+        """Время работы очередного кадра в секундах"""
+        self._times.append(work_seconds)
+        self._frames_since_change += 1
+        if self._frames_since_change < self.cooldown or len(self._times) < self.window:
+            return
+
+        average = sum(self._times) / len(self._times)
+        if average > self.budget * self.high_water and self.level < len(self.scales) - 1:
+            self._change(self.level + 1)
+        elif average < self.budget * self.low_water and self.level > 0:
+            self._change(self.level - 1)
+
+    def _change(self, level: int) -> None:
+        self.level = level
+        self._times.clear()
+        self._frames_since_change = 0
+
+    def reset(self) -> None:
+        """Возврат к полному разрешению (например, при смене уровня)"""
+        self._change(0)
@@ -5,16 +5,57 @@
 """
 
 import pygame
+import os
 import sys
 import math
-from typing import List, Tuple, Dict, Any
-
-# Инициализация Pygame
-pygame.init()
+import time
+import json
+import argparse
+import threading
+from array import array
+from typing import List, Tuple, Dict, Any, Optional, NamedTuple, Callable, Sequence, Union
+
+from spatial_hash import SpatialHash
+from levels import LevelData, LevelLoader
+from render_cache import FontCache, SpriteAtlas, TextCache, optimize_surface
+from dirty_rects import DirtyRectTracker
+from entity_store import NUMPY_AVAILABLE, EntityArrays
+from profiler import FrameProfiler
+from snapshots import GameSnapshot, RewindBuffer
+from preloader import Preloader
+from frame_pacing import AdaptiveResolution
+from sprite_pool import SpritePools
+from particles import PARTICLES_AVAILABLE, ParticleSystem
 
 # Константы
 WIDTH, HEIGHT = 800, 600
 FPS = 60
+# Частота шагов симуляции: вся физика задана в единицах "на шаг" этой частоты
+TICK_RATE = 60
+SIM_DT = 1.0 / TICK_RATE
+# Сколько шагов симуляции можно догнать за один кадр отрисовки
+MAX_CATCHUP_TICKS = 5
+# Размер ячейки сетки для поиска столкновений
+COLLISION_CELL_SIZE = 64
+# Амплитуда подпрыгивания монетки (см. Coin.update)
+COIN_BOB_AMPLITUDE = 3
+# Ширина участка уровня: обновляются и рисуются только участки рядом с камерой
+CHUNK_WIDTH = 400
+# Сколько участков за краями экрана тоже остаются активными
+CHUNK_MARGIN = 1
+# Уровни, которые можно запустить из меню
+MENU_LEVELS = (1, 2)
+# Ожидание событий на статичных экранах (меню, проигрыш, победа), мс:
+# без анимации кадр рисуется только по событию, с анимацией - с частотой кадров
+IDLE_TIMEOUT_MS = 1000
+IDLE_ANIMATION_TIMEOUT_MS = 1000 // FPS
+# Эффекты частиц: искры собранной монетки, брызги при уроне и конфетти победы
+# (конфетти выпускается CONFETTI_TICKS шагов по CONFETTI_PER_TICK частиц)
+COIN_SPARKLE_PARTICLES = 24
+HIT_BURST_PARTICLES = 60
+CONFETTI_TICKS = 180
+CONFETTI_PER_TICK = 12
+CONFETTI_COLORS = ((255, 0, 0), (0, 255, 0), (0, 120, 255), (255, 255, 0), (255, 165, 0), (255, 105, 180))
 
 # Цвета
 class Colors:
@@ -36,20 +77,110 @@ class Colors:
     GOLD = (255, 215, 0)
     LIGHT_GREEN = (144, 238, 144)  # Светло-зеленый для фона инструкций
 
-# Создание окна
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Платформер на Python 3.12")
-clock = pygame.time.Clock()
+# Шрифты загружаются при первой отрисовке текста, пути к файлам шрифтов
+# запоминаются на диске (см. render_cache.FontCache)
+font_cache = FontCache()
+
+
+class GameFonts:
+    """Шрифты игры: крупный для заголовков, средний и мелкий"""
+
+    @property
+    def large(self) -> pygame.font.Font:
+        return font_cache.get('Arial', 36, bold=True)
+
+    @property
+    def medium(self) -> pygame.font.Font:
+        return font_cache.get('Arial', 24)
+
+    @property
+    def small(self) -> pygame.font.Font:
+        return font_cache.get('Arial', 18)
+
+
+fonts = GameFonts()
+
+# Кэш отрисованных надписей: статичный текст растеризуется один раз,
+# счет и жизни - только при изменении значения
+text_cache = TextCache()
+
+
+def init_display(vsync: bool = False) -> pygame.Surface:
+    """Создание окна (инициализируются только видео и шрифты, а не все подсистемы)
+
+    vsync - синхронизация смены кадров с обновлением монитора; если драйвер
+    ее не поддерживает, окно создается без нее.
+    """
+    pygame.display.init()
+    pygame.font.init()
+    surface = None
+    if vsync:
+        try:
+            surface = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED, vsync=1)
+        except pygame.error:
+            surface = None
+    if surface is None:
+        surface = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Платформер на Python 3.12")
+
+    # Шрифты и надписи прошлого окна (до pygame.quit) больше не действительны
+    font_cache.clear()
+    text_cache.clear()
+    # Изображения, созданные до открытия окна, переводятся в его формат
+    sprite_atlas.optimize()
+
+    return surface
+
+
+class InputState(NamedTuple):
+    """Состояние управления на один кадр симуляции"""
+    left: bool = False
+    right: bool = False
+    jump: bool = False
+    restart: bool = False
+
+
+# Обозначения в текстовом сценарии управления (см. parse_input_script)
+INPUT_SCRIPT_KEYS = {'L': 'left', 'R': 'right', 'J': 'jump', 'X': 'restart'}
+
+
+def parse_input_script(script: str) -> List[InputState]:
+    """Разбор сценария управления вида "R*120 RJ R*30 .*10 L"
+
+    Каждый токен - набор клавиш на один кадр (L, R, J - прыжок, X - перезапуск,
+    "." - ничего не нажато), суффикс *N повторяет кадр N раз.
+    """
+    frames: List[InputState] = []
+    for token in script.split():
+        keys, _, count = token.partition('*')
+        repeat = int(count) if count else 1
+        flags = {}
+        for key in keys.upper():
+            if key == '.':
+                continue
+            if key not in INPUT_SCRIPT_KEYS:
+                raise ValueError(f"Неизвестная клавиша в сценарии: {key!r}")
+            flags[INPUT_SCRIPT_KEYS[key]] = True
+        frames.extend([InputState(**flags)] * repeat)
+    return frames
 
-# Инициализация шрифтов
-try:
-    font_large = pygame.font.SysFont('Arial', 36, bold=True)
-    font_medium = pygame.font.SysFont('Arial', 24)
-    font_small = pygame.font.SysFont('Arial', 18)
-except:
-    font_large = pygame.font.Font(None, 36)
-    font_medium = pygame.font.Font(None, 24)
-    font_small = pygame.font.Font(None, 18)
+
+def read_keyboard() -> InputState:
+    """Чтение зажатых клавиш движения с клавиатуры"""
+    keys = pygame.key.get_pressed()
+    return InputState(left=bool(keys[pygame.K_LEFT]), right=bool(keys[pygame.K_RIGHT]))
+
+
+# Общие изображения спрайтов: одинаковые спрайты, а также повторные
+# загрузки уровня используют одну и ту же поверхность
+sprite_atlas = SpriteAtlas()
+
+# Загрузчик уровней из папки levels (общий кэш для всех экземпляров игры)
+level_loader = LevelLoader()
+
+# Пулы спрайтов уровня: при смене уровня спрайты старого уровня возвращаются
+# в пулы и переиспользуются для следующего вместо создания новых объектов
+sprite_pools = SpritePools()
 
 
 class Player(pygame.sprite.Sprite):
@@ -57,10 +188,12 @@ class Player(pygame.sprite.Sprite):
 
     def __init__(self, start_x: int = 100, start_y: int = None):
         super().__init__()
-        self.image = pygame.Surface((35, 50), pygame.SRCALPHA)
-        self._draw_character()
+        self.image = sprite_atlas.get('player', Colors.BLUE, (35, 50), self._draw_character)
         self.rect = self.image.get_rect()
+        self.reset(start_x, start_y)
 
+    def reset(self, start_x: int = 100, start_y: int = None) -> None:
+        """Начальное состояние игрока (и при повторном использовании из пула)"""
         # Устанавливаем позицию игрока
         if start_y is None:
             start_y = HEIGHT - 100
@@ -73,22 +206,30 @@ class Player(pygame.sprite.Sprite):
         self.lives = 2
         self.invincible = False
         self.invincible_timer = 0
-
-    def _draw_character(self) -> None:
+        # Ширина уровня, за которую игрок не может выйти
+        self.world_width = WIDTH
+        # Позиция на предыдущем шаге симуляции (для интерполяции при отрисовке)
+        self.prev_pos = self.rect.topleft
+        # Высота до последнего вызова update (для непрерывной проверки платформ)
+        self.last_y = self.rect.y
+
+    @staticmethod
+    def _draw_character(image: pygame.Surface) -> None:
         """Отрисовка персонажа"""
         # Тело
-        pygame.draw.rect(self.image, Colors.BLUE, (5, 10, 25, 30), border_radius=5)
+        pygame.draw.rect(image, Colors.BLUE, (5, 10, 25, 30), border_radius=5)
         # Голова
-        pygame.draw.circle(self.image, Colors.SKIN, (17, 8), 8)
+        pygame.draw.circle(image, Colors.SKIN, (17, 8), 8)
         # Глаза
-        pygame.draw.circle(self.image, Colors.BLACK, (13, 6), 2)
-        pygame.draw.circle(self.image, Colors.BLACK, (21, 6), 2)
+        pygame.draw.circle(image, Colors.BLACK, (13, 6), 2)
+        pygame.draw.circle(image, Colors.BLACK, (21, 6), 2)
         # Ноги
-        pygame.draw.rect(self.image, Colors.BROWN, (8, 40, 8, 10))
-        pygame.draw.rect(self.image, Colors.BROWN, (19, 40, 8, 10))
+        pygame.draw.rect(image, Colors.BROWN, (8, 40, 8, 10))
+        pygame.draw.rect(image, Colors.BROWN, (19, 40, 8, 10))
 
     def update(self) -> None:
         """Обновление физики персонажа"""
+        self.last_y = self.rect.y
         # Гравитация
         self.velocity_y += 0.5
         self.rect.y += int(self.velocity_y)
@@ -101,7 +242,7 @@ class Player(pygame.sprite.Sprite):
 
         # Ограничение выхода за границы
         self.rect.left = max(0, self.rect.left)
-        self.rect.right = min(WIDTH, self.rect.right)
+        self.rect.right = min(self.world_width, self.rect.right)
 
         # Обновление таймера неуязвимости
         if self.invincible:
@@ -138,24 +279,34 @@ class Coin(pygame.sprite.Sprite):
 
     def __init__(self, x: int, y: int):
         super().__init__()
-        self.image = pygame.Surface((25, 25), pygame.SRCALPHA)
-        self._draw_coin()
+        self.image = sprite_atlas.get('coin', Colors.YELLOW, (25, 25), self._draw_coin)
         self.rect = self.image.get_rect()
+        self.reset(x, y)
+
+    def reset(self, x: int, y: int) -> None:
+        """Установка монетки на место (и при повторном использовании из пула)"""
         self.rect.center = (x, y)
         self.original_y = y
+        self.prev_pos = self.rect.topleft
 
-    def _draw_coin(self) -> None:
+    @staticmethod
+    def _draw_coin(image: pygame.Surface) -> None:
         """Отрисовка монетки"""
         # Внешний круг
-        pygame.draw.circle(self.image, Colors.YELLOW, (12, 12), 12)
+        pygame.draw.circle(image, Colors.YELLOW, (12, 12), 12)
         # Внутренний круг
-        pygame.draw.circle(self.image, (255, 215, 0), (12, 12), 8)
+        pygame.draw.circle(image, (255, 215, 0), (12, 12), 8)
         # Блики
-        pygame.draw.ellipse(self.image, (255, 255, 200), (5, 5, 8, 4))
+        pygame.draw.ellipse(image, (255, 255, 200), (5, 5, 8, 4))
 
-    def update(self) -> None:
-        """Анимация подпрыгивания"""
-        self.rect.y = self.original_y + int(math.sin(pygame.time.get_ticks() * 0.005) * 3)
+    def update(self, time_ms: int) -> None:
+        """Анимация подпрыгивания (time_ms - игровое время, см. Game.sim_time_ms)"""
+        self.rect.y = self.original_y + int(math.sin(time_ms * 0.005) * COIN_BOB_AMPLITUDE)
+
+    def bounds(self) -> pygame.Rect:
+        """Область, которую монетка занимает за всю анимацию"""
+        return pygame.Rect(self.rect.x, self.original_y - COIN_BOB_AMPLITUDE,
+                           self.rect.width, self.rect.height + 2 * COIN_BOB_AMPLITUDE)
 
 
 class Enemy(pygame.sprite.Sprite):
@@ -163,10 +314,15 @@ class Enemy(pygame.sprite.Sprite):
 
     def __init__(self, platform_rect: pygame.Rect, speed: int = 2, custom_bounds: Tuple[int, int] = None, color: Tuple[int, int, int] = Colors.RED):
         super().__init__()
-        self.image = pygame.Surface((40, 40), pygame.SRCALPHA)
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(platform_rect, speed, custom_bounds, color)
+
+    def reset(self, platform_rect: pygame.Rect, speed: int = 2, custom_bounds: Tuple[int, int] = None,
+              color: Tuple[int, int, int] = Colors.RED) -> None:
+        """Установка врага на платформу (и при повторном использовании из пула)"""
         self.color = color
-        self._draw_enemy()
-        self.rect = self.image.get_rect()
+        self.image = sprite_atlas.get('enemy', color, (40, 40), lambda image: self._draw_enemy(image, color))
+        self.rect.size = self.image.get_size()
 
         # Позиционируем врага на платформе
         self.platform_rect = platform_rect
@@ -184,17 +340,20 @@ class Enemy(pygame.sprite.Sprite):
             self.left_bound = platform_rect.left + 20
             self.right_bound = platform_rect.right - 20
 
-    def _draw_enemy(self) -> None:
+        self.prev_pos = self.rect.topleft
+
+    @staticmethod
+    def _draw_enemy(image: pygame.Surface, color: Tuple[int, int, int]) -> None:
         """Отрисовка врага"""
         # Тело
-        pygame.draw.circle(self.image, self.color, (20, 20), 18)
+        pygame.draw.circle(image, color, (20, 20), 18)
         # Глаза
-        pygame.draw.circle(self.image, Colors.WHITE, (14, 14), 5)
-        pygame.draw.circle(self.image, Colors.WHITE, (26, 14), 5)
-        pygame.draw.circle(self.image, Colors.BLACK, (14, 14), 2)
-        pygame.draw.circle(self.image, Colors.BLACK, (26, 14), 2)
+        pygame.draw.circle(image, Colors.WHITE, (14, 14), 5)
+        pygame.draw.circle(image, Colors.WHITE, (26, 14), 5)
+        pygame.draw.circle(image, Colors.BLACK, (14, 14), 2)
+        pygame.draw.circle(image, Colors.BLACK, (26, 14), 2)
         # Рот
-        pygame.draw.arc(self.image, Colors.BLACK, (10, 18, 20, 15), 0, math.pi, 2)
+        pygame.draw.arc(image, Colors.BLACK, (10, 18, 20, 15), 0, math.pi, 2)
 
     def update(self) -> None:
         """Обновление патрулирования по платформе"""
@@ -213,21 +372,29 @@ class Platform(pygame.sprite.Sprite):
 
     def __init__(self, x: int, y: int, width: int, height: int, color: Tuple[int, int, int] = Colors.GRAY, border_color: Tuple[int, int, int] = Colors.BROWN):
         super().__init__()
-        self.image = pygame.Surface((width, height))
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, y, width, height, color, border_color)
+
+    def reset(self, x: int, y: int, width: int, height: int, color: Tuple[int, int, int] = Colors.GRAY,
+              border_color: Tuple[int, int, int] = Colors.BROWN) -> None:
+        """Положение, размер и цвета платформы (и при повторном использовании из пула)"""
         self.color = color
         self.border_color = border_color
-        self._draw_platform(width, height)
-
-    def _draw_platform(self, width: int, height: int) -> None:
+        self.image = sprite_atlas.get('platform', (color, border_color), (width, height),
+                                      lambda image: self._draw_platform(image, color, border_color),
+                                      alpha=False)
+        # Прямоугольник меняется на месте: на него ссылаются враги платформы
+        self.rect.update(x, y, width, height)
+
+    @staticmethod
+    def _draw_platform(image: pygame.Surface, color: Tuple[int, int, int], border_color: Tuple[int, int, int]) -> None:
         """Отрисовка платформы с текстурой"""
-        self.image.fill(self.color)
-        pygame.draw.rect(self.image, self.border_color, (0, 0, width, height), 2)
+        width, height = image.get_size()
+        image.fill(color)
+        pygame.draw.rect(image, border_color, (0, 0, width, height), 2)
         # Текстура платформы
         for i in range(0, width, 15):
-            pygame.draw.line(self.image, (max(0, self.color[0]-30), max(0, self.color[1]-30), max(0, self.color[2]-30)),
+            pygame.draw.line(image, (max(0, color[0]-30), max(0, color[1]-30), max(0, color[2]-30)),
                            (i, 0), (i, height), 1)
 
 
@@ -236,21 +403,28 @@ class Ground(pygame.sprite.Sprite):
 
     def __init__(self, x: int, y: int, width: int, height: int, ground_color: Tuple[int, int, int] = Colors.BROWN, grass_color: Tuple[int, int, int] = Colors.GREEN):
         super().__init__()
-        self.image = pygame.Surface((width, height))
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, y, width, height, ground_color, grass_color)
+
+    def reset(self, x: int, y: int, width: int, height: int, ground_color: Tuple[int, int, int] = Colors.BROWN,
+              grass_color: Tuple[int, int, int] = Colors.GREEN) -> None:
+        """Положение, размер и цвета куска земли (и при повторном использовании из пула)"""
         self.ground_color = ground_color
         self.grass_color = grass_color
-        self._draw_ground(width, height)
+        self.image = sprite_atlas.get('ground', (ground_color, grass_color), (width, height),
+                                      lambda image: self._draw_ground(image, ground_color, grass_color),
+                                      alpha=False)
+        self.rect.update(x, y, width, height)
 
-    def _draw_ground(self, width: int, height: int) -> None:
+    @staticmethod
+    def _draw_ground(image: pygame.Surface, ground_color: Tuple[int, int, int], grass_color: Tuple[int, int, int]) -> None:
         """Отрисовка земли с травой"""
-        self.image.fill(self.ground_color)
-        pygame.draw.rect(self.image, self.grass_color, (0, 0, width, 10))
+        width, height = image.get_size()
+        image.fill(ground_color)
+        pygame.draw.rect(image, grass_color, (0, 0, width, 10))
         # Детали травы
         for i in range(0, width, 20):
-            pygame.draw.line(self.image, (max(0, self.grass_color[0]-50), max(0, self.grass_color[1]-50), max(0, self.grass_color[2]-50)),
+            pygame.draw.line(image, (max(0, grass_color[0]-50), max(0, grass_color[1]-50), max(0, grass_color[2]-50)),
                            (i, 0), (i + 10, -5), 2)
 
 
@@ -259,256 +433,733 @@ class FinishFlag(pygame.sprite.Sprite):
 
     def __init__(self, x: int, y: int, flag_color: Tuple[int, int, int] = Colors.PURPLE):
         super().__init__()
-        self.image = pygame.Surface((30, 50), pygame.SRCALPHA)
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.reset(x, y, flag_color)
+
+    def reset(self, x: int, y: int, flag_color: Tuple[int, int, int] = Colors.PURPLE) -> None:
+        """Установка флага (и при повторном использовании из пула)"""
         self.flag_color = flag_color
-        self._draw_flag()
-        self.rect = self.image.get_rect()
+        self.image = sprite_atlas.get('flag', flag_color, (30, 50), lambda image: self._draw_flag(image, flag_color))
+        self.rect.size = self.image.get_size()
         self.rect.bottom = y
         self.rect.centerx = x
 
-    def _draw_flag(self) -> None:
+    @staticmethod
+    def _draw_flag(image: pygame.Surface, flag_color: Tuple[int, int, int]) -> None:
         """Отрисовка флага"""
         # Флагшток
-        pygame.draw.rect(self.image, Colors.BROWN, (12, 0, 6, 50))
+        pygame.draw.rect(image, Colors.BROWN, (12, 0, 6, 50))
         # Флаг
         flag_points = [(18, 10), (18, 30), (28, 20)]
-        pygame.draw.polygon(self.image, self.flag_color, flag_points)
+        pygame.draw.polygon(image, flag_color, flag_points)
+
+
+class BackgroundLayers:
+    """Заранее отрисованные слои фона для темы уровня
+
+    Дневной фон - небо, одно облако (рисуется несколько раз со смещением)
+    и солнце поверх облаков. Ночной фон - два готовых кадра неба со звездами
+    и луной: с желтыми серединками звезд и без них (мерцание).
+    """
+
+    # Облако из трех эллипсов: смещения относительно точки (x, y) облака
+    CLOUD_ELLIPSES = [(0, 0, 100, 40), (30, -20, 80, 40), (60, 0, 70, 30)]
+    CLOUD_OFFSET_Y = -20
+    CLOUD_COUNT = 5
+    SUN_CENTER, SUN_RADIUS, SUN_COLOR = (700, 80), 40, (255, 255, 100)
+    NIGHT_SKY = (40, 40, 100)  # Более светлый темно-синий ночное небо
+    STAR_POSITIONS = [(100, 50), (200, 80), (350, 40), (450, 70),
+                      (600, 30), (700, 60), (750, 90), (300, 120)]
+
+    def __init__(self, theme: str, scale: float = 1.0):
+        self.theme = theme
+        # Масштаб для отрисовки сцены в пониженном разрешении (см. Game.draw_frame)
+        self.scale = scale
+        if theme == 'day':
+            self.sky = pygame.Surface((WIDTH, HEIGHT))
+            self.sky.fill(Colors.LIGHT_BLUE)
+            self.sky = self._prepare(self.sky)
+            self.cloud = self._prepare(self._draw_cloud())
+            self.sun = self._prepare(self._draw_sun())
+        else:
+            self.night_frames = [self._prepare(self._draw_night(twinkle)) for twinkle in (False, True)]
+
+    def _prepare(self, surface: pygame.Surface) -> pygame.Surface:
+        """Масштабирование слоя и перевод в формат экрана"""
+        if self.scale != 1.0:
+            width, height = surface.get_size()
+            surface = pygame.transform.scale(surface, (round(width * self.scale), round(height * self.scale)))
+        return optimize_surface(surface)
+
+    def _draw_cloud(self) -> pygame.Surface:
+        """Отрисовка одного облака"""
+        surface = pygame.Surface((130, 60), pygame.SRCALPHA)
+        for x, y, width, height in self.CLOUD_ELLIPSES:
+            pygame.draw.ellipse(surface, Colors.WHITE, (x, y - self.CLOUD_OFFSET_Y, width, height))
+        return surface
+
+    def _draw_sun(self) -> pygame.Surface:
+        """Отрисовка солнца"""
+        size = self.SUN_RADIUS * 2 + 2
+        surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(surface, self.SUN_COLOR, (size // 2, size // 2), self.SUN_RADIUS)
+        return surface
+
+    def _draw_night(self, twinkle: bool) -> pygame.Surface:
+        """Отрисовка ночного неба со звездами и луной"""
+        surface = pygame.Surface((WIDTH, HEIGHT))
+        surface.fill(self.NIGHT_SKY)
+
+        # Звезды
+        for x, y in self.STAR_POSITIONS:
+            pygame.draw.circle(surface, Colors.WHITE, (x, y), 2)
+            if twinkle:
+                pygame.draw.circle(surface, Colors.YELLOW, (x, y), 1)
+
+        # Луна
+        pygame.draw.circle(surface, (220, 220, 220), (100, 80), 30)
+        pygame.draw.circle(surface, self.NIGHT_SKY, (115, 65), 25)
+        return surface
+
+    def draw(self, target: pygame.Surface, time_ms: int) -> None:
+        """Отрисовка фона на момент времени time_ms"""
+        scale = self.scale
+        if self.theme == 'day':
+            target.blit(self.sky, (0, 0))
+
+            # Облака плывут вправо и появляются снова слева
+            for i in range(self.CLOUD_COUNT):
+                x = (time_ms // 50 + i * 200) % (WIDTH + 200) - 100
+                y = 80 + i * 40
+                target.blit(self.cloud, (round(x * scale), round((y + self.CLOUD_OFFSET_Y) * scale)))
 
+            # Солнце
+            sun_x, sun_y = self.SUN_CENTER
+            half = self.SUN_RADIUS + 1
+            target.blit(self.sun, (round((sun_x - half) * scale), round((sun_y - half) * scale)))
+        else:
+            # Мерцание звезд
+            target.blit(self.night_frames[time_ms % 1000 < 500], (0, 0))
 
-class Game:
-    """Основной класс игры"""
+    def animated_regions(self, time_ms: int) -> List[Tuple[Tuple[str, int], pygame.Rect, Any]]:
+        """Меняющиеся со временем области фона: (ключ, прямоугольник, состояние)"""
+        if self.theme == 'day':
+            regions = []
+            for i in range(self.CLOUD_COUNT):
+                x = (time_ms // 50 + i * 200) % (WIDTH + 200) - 100
+                y = 80 + i * 40 + self.CLOUD_OFFSET_Y
+                regions.append((('cloud', i), pygame.Rect(x, y, *self.cloud.get_size()), None))
+            return regions
+
+        twinkle = time_ms % 1000 < 500
+        return [(('star', i), pygame.Rect(x - 2, y - 2, 5, 5), twinkle)
+                for i, (x, y) in enumerate(self.STAR_POSITIONS)]
+
+
+# Слои фона по темам, создаются при первой отрисовке или при подготовке уровня
+_background_layers: Dict[Tuple[str, float], BackgroundLayers] = {}
+# Слои создаются и при подготовке уровня в фоновом потоке (Game.preload_level)
+_background_lock = threading.Lock()
+
+
+def get_background_layers(theme: str, scale: float = 1.0) -> BackgroundLayers:
+    """Слои фона для темы и масштаба (создаются один раз)"""
+    key = (theme, scale)
+    layers = _background_layers.get(key)
+    if layers is None:
+        with _background_lock:
+            layers = _background_layers.get(key)
+            if layers is None:
+                layers = _background_layers[key] = BackgroundLayers(theme, scale)
+    return layers
+
+
+class Camera:
+    """Горизонтальная камера, следящая за игроком в пределах ширины уровня"""
+
+    def __init__(self, level_width: int = WIDTH):
+        self.level_width = max(WIDTH, level_width)
+        self.x = 0
+        # Положение на предыдущем шаге симуляции (для интерполяции при отрисовке)
+        self.prev_x = 0
+
+    def follow(self, rect: pygame.Rect) -> None:
+        """Центрирование на прямоугольнике без выхода за края уровня"""
+        self.x = self.position_for(rect.centerx)
+
+    def position_for(self, centerx: int) -> int:
+        """Положение камеры, центрированной на координате centerx"""
+        return max(0, min(centerx - WIDTH // 2, self.level_width - WIDTH))
+
+    def offset(self, alpha: float = 1.0) -> int:
+        """Смещение камеры для отрисовки между двумя шагами симуляции"""
+        if alpha >= 1.0:
+            return self.x
+        return round(self.prev_x + (self.x - self.prev_x) * alpha)
+
+
+def chunk_index(x: int, count: int) -> int:
+    """Номер участка уровня из count участков, в который попадает координата x"""
+    return max(0, min(count - 1, x // CHUNK_WIDTH))
+
+
+def ranges_overlap(a: range, b: range) -> bool:
+    """Есть ли у двух диапазонов номеров участков общие номера"""
+    return len(a) > 0 and len(b) > 0 and a.start < b.stop and b.start < a.stop
+
+
+class LevelChunk:
+    """Участок уровня шириной CHUNK_WIDTH и спрайты, относящиеся к нему
+
+    Спрайты выключенного участка не входят в группы и сетки столкновений,
+    поэтому не обновляются и не рисуются.
+    """
+
+    __slots__ = ('platforms', 'coins', 'enemies', 'decor')
 
     def __init__(self):
-        self.reset_game_state()
+        self.platforms: List[pygame.sprite.Sprite] = []
+        self.coins: List[Coin] = []
+        self.enemies: List[Enemy] = []
+        self.decor: List[pygame.sprite.Sprite] = []
+
+
+class PreparedLevel:
+    """Созданные по описанию уровня спрайты, еще не подключенные к игре
+
+    Подготовка не трогает состояние игры, поэтому может идти в фоновом
+    потоке (см. Game.prepare_level и preloader.Preloader).
+    """
+
+    __slots__ = ('level', 'camera', 'chunks', 'player', 'finish_flag', 'level_platforms', 'level_coins',
+                 'level_enemies', 'entity_arrays')
+
+    def __init__(self, level: LevelData):
+        self.level = level
+        self.camera = Camera(level.width)
+        self.chunks = [LevelChunk() for _ in range(-(-self.camera.level_width // CHUNK_WIDTH))]
+        self.player: Optional[Player] = None
+        self.finish_flag: Optional[FinishFlag] = None
+        self.level_platforms: List[pygame.sprite.Sprite] = []
+        self.level_coins: List[Coin] = []
+        self.level_enemies: List[Enemy] = []
+        self.entity_arrays: Optional[EntityArrays] = None
+
+    def chunk_at(self, x: int) -> LevelChunk:
+        return self.chunks[chunk_index(x, len(self.chunks))]
+
+    def chunk_span(self, left: int, right: int) -> range:
+        """Номера участков, которые задевает отрезок от left до right включительно"""
+        count = len(self.chunks)
+        return range(chunk_index(left, count), chunk_index(right, count) + 1)
+
+    def release(self) -> None:
+        """Возврат спрайтов уровня в пулы, если уровень так и не подключили"""
+        sprites: List[pygame.sprite.Sprite] = [self.player] if self.player is not None else []
+        sprites.extend(self.level_platforms)
+        sprites.extend(self.level_coins)
+        sprites.extend(self.level_enemies)
+        if self.finish_flag is not None:
+            sprites.append(self.finish_flag)
+        for sprite in sprites:
+            sprite_pools.release(sprite)
 
-    def reset_game_state(self):
-        """Полный сброс состояния игры"""
-        self.player: Player = None
+
+class Game:
+    """Основной класс игры"""
+
+    def __init__(self, headless: bool = False, render_fps: int = FPS,
+                 loader: Optional[LevelLoader] = None, dirty_rects: bool = False,
+                 entity_arrays: bool = False, profile: bool = False, rewind: bool = False,
+                 preload: bool = False, vsync: bool = False, adaptive: bool = False):
+        self.level_loader = loader or level_loader
+        # Монетки и враги обновляются пакетно в массивах NumPy (см. entity_store);
+        # без NumPy - по спрайтам, результат шагов тот же
+        self.use_entity_arrays = entity_arrays and NUMPY_AVAILABLE
+        # В безоконном режиме окно, шрифты и таймер кадров не создаются,
+        # а отрисовка не выполняется
+        self.headless = headless
+        # Ограничение частоты отрисовки (0 - без ограничения),
+        # на скорость игры не влияет
+        self.render_fps = render_fps
+        # Доля шага симуляции, прошедшая после последнего шага (0..1)
+        self.render_alpha = 1.0
+        # Время кадра для анимации фона (одно на весь кадр отрисовки)
+        self.frame_time_ms = 0
+        # Замер времени фаз кадра (см. profiler.PhaseTimer); F3 показывает наложение
+        self.phase_timer = FrameProfiler() if profile else None
+        self.show_profiler = profile
+        # Куда сохранить буфер профилировщика при выходе (CSV или JSON)
+        self.profile_dump: Optional[str] = None
+        # Номер шага симуляции с начала уровня: все анимации зависят от него,
+        # а не от настоящего времени, поэтому прогон по записи повторяем
+        self.tick = 0
+        # Запись управления (см. replay.InputRecorder)
+        self.recorder = None
+        # Снимки последних шагов для перемотки назад (Backspace)
+        self.rewind_buffer: Optional[RewindBuffer] = RewindBuffer() if rewind else None
+        # Нажатия, ожидающие ближайшего шага симуляции
+        self.pending_jump = False
+        self.pending_restart = False
+        if headless:
+            self.screen: Optional[pygame.Surface] = None
+            self.clock: Optional[pygame.time.Clock] = None
+        else:
+            self.screen = init_display(vsync)
+            self.clock = pygame.time.Clock()
+        # При вертикальной синхронизации темп задает смена кадров, а не таймер
+        if vsync:
+            self.render_fps = 0
+        # Понижение разрешения сцены, когда кадры не укладываются в бюджет
+        budget = 1.0 / (render_fps or FPS)
+        self.resolution: Optional[AdaptiveResolution] = AdaptiveResolution(budget) if adaptive else None
+        self._low_res_surface: Optional[pygame.Surface] = None
+        # Обновление окна только в изменившихся областях вместо flip()
+        self.dirty_tracker: Optional[DirtyRectTracker] = None
+        self._screen_state: Optional[tuple] = None
+        if dirty_rects and self.screen is not None:
+            self.dirty_tracker = DirtyRectTracker(self.screen.get_rect())
+        # Группы и сетки для поиска столкновений создаются один раз и очищаются
+        # при смене уровня: платформы и монетки добавляются при включении
+        # участка уровня, враги обновляются по мере движения
         self.all_sprites = pygame.sprite.Group()
         self.platforms = pygame.sprite.Group()
         self.coins = pygame.sprite.Group()
         self.enemies = pygame.sprite.Group()
+        self.platform_grid = SpatialHash(COLLISION_CELL_SIZE)
+        self.coin_grid = SpatialHash(COLLISION_CELL_SIZE)
+        self.enemy_grid = SpatialHash(COLLISION_CELL_SIZE)
+        self.player: Optional[Player] = None
+        self.chunks: List[LevelChunk] = []
+        # Номер подключения уровня: спрайты переиспользуются, поэтому новый
+        # уровень нельзя отличить по объекту игрока
+        self.level_generation = 0
+        # Частицы эффектов: в мире уровня (монетки, урон) и поверх экрана победы.
+        # Без окна и без NumPy эффектов нет
+        self.particles: Optional[ParticleSystem] = None
+        self.confetti: Optional[ParticleSystem] = None
+        if not headless and PARTICLES_AVAILABLE:
+            self.particles = ParticleSystem()
+            self.confetti = ParticleSystem(gravity=0.05)
+        self.confetti_ticks = 0
+        self.reset_game_state()
+        # Фоновая подготовка уровней меню и следующего уровня
+        self.preloader: Optional[Preloader] = None
+        if preload:
+            self.preloader = Preloader(self.preload_level, PreparedLevel.release)
+            self.preload_menu_levels()
+
+    def reset_game_state(self):
+        """Полный сброс состояния игры
+
+        Спрайты текущего уровня возвращаются в пулы (см. sprite_pools),
+        группы и сетки очищаются на месте.
+        """
+        self.release_level_sprites()
+        for group in (self.all_sprites, self.platforms, self.coins, self.enemies):
+            group.empty()
+        for grid in (self.platform_grid, self.coin_grid, self.enemy_grid):
+            grid.clear()
+        self.clear_effects()
+        self.player = None
         self.finish_flag = None
         self.coin_positions: List[Tuple[int, int]] = []
+        self.entity_arrays: Optional[EntityArrays] = None
+        # Камера и участки уровня: активны только участки из active_chunks
+        self.camera = Camera()
+        self.chunks: List[LevelChunk] = []
+        self.active_chunks = range(0)
+        # Земля и платформы уровня (каждая один раз, хотя может входить в несколько участков)
+        self.level_platforms: List[pygame.sprite.Sprite] = []
+        # Все монетки и враги уровня в порядке создания (для снимков состояния)
+        self.level_coins: List[Coin] = []
+        self.level_enemies: List[Enemy] = []
+        self.coin_alive = bytearray()
+        # Снимок сразу после загрузки уровня, перезапуск восстанавливает его
+        self.initial_snapshot: Optional[GameSnapshot] = None
         self.game_over = False
         self.game_won = False
         self.current_level = 1
+        self.level_theme = 'day'
         self.in_menu = True
         self.level_complete = False
 
-    def create_level_1(self) -> None:
-        """Создание первого игрового уровня (дневной)"""
-        # Сброс состояния перед созданием уровня
-        self.reset_game_state()
-        self.in_menu = False
-        self.current_level = 1
+    def release_level_sprites(self) -> None:
+        """Возврат всех спрайтов текущего уровня в пулы
 
-        # Создание игрока
-        self.player = Player()
-        self.all_sprites.add(self.player)
+        Собранные монетки тоже возвращаются: они остаются в level_coins
+        для перезапуска уровня (см. restore_coins) до смены уровня.
+        """
+        if self.player is None:
+            return
+        sprites: List[pygame.sprite.Sprite] = [self.player]
+        sprites.extend(self.level_platforms)
+        sprites.extend(self.level_coins)
+        sprites.extend(self.level_enemies)
+        if self.finish_flag is not None:
+            sprites.append(self.finish_flag)
+        for sprite in sprites:
+            sprite_pools.release(sprite)
+
+    def add_platform(self, platform: pygame.sprite.Sprite) -> None:
+        """Добавление платформы или земли на уровень"""
+        self.platforms.add(platform)
+        self.all_sprites.add(platform)
+        self.platform_grid.insert(platform, platform.rect)
+
+    def remove_platform(self, platform: pygame.sprite.Sprite) -> None:
+        """Убрать платформу из групп и сетки (участок уровня выключен)"""
+        platform.kill()
+        self.platform_grid.remove(platform)
+
+    def add_coin(self, coin: Coin) -> None:
+        """Добавление монетки на уровень"""
+        self.coins.add(coin)
+        self.all_sprites.add(coin)
+        # В режиме массивов монетки и враги ищутся по массивам, а не по сеткам
+        if not self.entity_arrays:
+            self.coin_grid.insert(coin, coin.bounds())
+
+    def add_enemy(self, enemy: Enemy) -> None:
+        """Добавление врага на уровень"""
+        self.enemies.add(enemy)
+        self.all_sprites.add(enemy)
+        if not self.entity_arrays:
+            self.enemy_grid.insert(enemy, enemy.rect)
+
+    def remove_entity(self, sprite: pygame.sprite.Sprite, grid: SpatialHash) -> None:
+        """Убрать монетку или врага из групп и сетки"""
+        sprite.kill()
+        if sprite in grid:
+            grid.remove(sprite)
+
+    def prepare_level(self, level: LevelData) -> PreparedLevel:
+        """Создание спрайтов уровня по его описанию без изменения состояния игры
+
+        Спрайты раскладываются по участкам уровня, в группы они попадут
+        при подключении уровня (см. install_level). Платформа входит во все
+        участки, которые задевает, а враг - во все участки своего маршрута:
+        они активны, пока активен хотя бы один из этих участков
+        (chunk_span, см. set_chunk_active).
+        """
+        prepared = PreparedLevel(level)
 
-        # Создание земли
-        ground = Ground(0, HEIGHT - 50, WIDTH, 50)
-        self.platforms.add(ground)
-        self.all_sprites.add(ground)
+        # Создание игрока
+        prepared.player = sprite_pools.acquire(Player, *level.player_start)
+        prepared.player.world_width = prepared.camera.level_width
+
+        # Создание земли: по куску на участок, куски одного размера делят изображение
+        ground = level.ground
+        for x in range(ground.x, ground.x + ground.width, CHUNK_WIDTH):
+            piece = sprite_pools.acquire(Ground, x, ground.y, min(CHUNK_WIDTH, ground.x + ground.width - x),
+                                         ground.height, ground.color, ground.border_color)
+            piece.chunk_span = prepared.chunk_span(piece.rect.left, piece.rect.right - 1)
+            prepared.chunk_at(x).platforms.append(piece)
+            prepared.level_platforms.append(piece)
 
         # Платформы
-        platform_data = [
-            (100, 450, 200, 20),
-            (400, 400, 150, 20),
-            (200, 300, 100, 20),
-            (600, 450, 150, 20),
-            (500, 250, 100, 20)
-        ]
-
         platforms_list = []
-        for x, y, width, height in platform_data:
-            platform = Platform(x, y, width, height)
-            self.platforms.add(platform)
-            self.all_sprites.add(platform)
+        for item in level.platforms:
+            platform = sprite_pools.acquire(Platform, *item)
+            platform.chunk_span = prepared.chunk_span(platform.rect.left, platform.rect.right - 1)
+            for index in platform.chunk_span:
+                prepared.chunks[index].platforms.append(platform)
             platforms_list.append(platform)
-
-        # Монетки (убраны те, что находятся прямо друг над другом)
-        self.coin_positions = [
-            (150, 420), (250, 420), (350, 370),
-            (450, 370), (550, 420), (650, 420),
-            # Убраны: (250, 270), (150, 370),
-            (700, 420),
-            (100, 520), (300, 520), (400, 420),
-            (650, 370)  # Оставлена только одна из двух монеток на этой позиции
-        ]
-
-        for x, y in self.coin_positions:
-            coin = Coin(x, y)
-            self.coins.add(coin)
-            self.all_sprites.add(coin)
-
-        # Враги
-        enemy_data = [
-            (platforms_list[0].rect, 2, None, Colors.RED),
-            (platforms_list[1].rect, 3, None, Colors.RED),
-            (platforms_list[3].rect, 2, None, Colors.RED)
-        ]
-
-        for platform_rect, speed, custom_bounds, color in enemy_data:
-            enemy = Enemy(platform_rect, speed, custom_bounds, color)
-            self.enemies.add(enemy)
-            self.all_sprites.add(enemy)
+            prepared.level_platforms.append(platform)
+
+        # Монетки
+        for index, (x, y) in enumerate(level.coins):
+            coin = sprite_pools.acquire(Coin, x, y)
+            coin.index = index
+            coin.chunk = chunk_index(x, len(prepared.chunks))
+            prepared.chunks[coin.chunk].coins.append(coin)
+            prepared.level_coins.append(coin)
+
+        # Враги относятся ко всем участкам своего маршрута
+        for enemy in level.enemies:
+            sprite = sprite_pools.acquire(Enemy, platforms_list[enemy.platform].rect, enemy.speed, enemy.bounds,
+                                          enemy.color)
+            sprite.chunk_span = prepared.chunk_span(min(sprite.left_bound, sprite.rect.left),
+                                                    max(sprite.right_bound, sprite.rect.right))
+            for index in sprite.chunk_span:
+                prepared.chunks[index].enemies.append(sprite)
+            prepared.level_enemies.append(sprite)
 
         # Финишный флаг
-        self.finish_flag = FinishFlag(550, 250, Colors.PURPLE)
-        self.all_sprites.add(self.finish_flag)
-
-    def create_level_2(self) -> None:
-        """Создание второго игрового уровня (ночной)"""
-        # Сброс состояния перед созданием уровня
+        x, y, color = level.flag
+        prepared.finish_flag = sprite_pools.acquire(FinishFlag, x, y, color)
+        prepared.chunk_at(x).decor.append(prepared.finish_flag)
+
+        if self.use_entity_arrays:
+            prepared.entity_arrays = EntityArrays(prepared.level_coins, prepared.level_enemies, COIN_BOB_AMPLITUDE)
+            prepared.entity_arrays.set_active(prepared.level_coins, prepared.level_enemies, False)
+
+        prepared.camera.follow(prepared.player.rect)
+        prepared.camera.prev_x = prepared.camera.x
+        return prepared
+
+    def build_level(self, level: LevelData) -> None:
+        """Создание уровня по его описанию"""
+        self.install_level(self.prepare_level(level))
+
+    def install_level(self, prepared: PreparedLevel) -> None:
+        """Подключение подготовленного уровня вместо текущего"""
+        level = prepared.level
+        # Сброс состояния перед сменой уровня
         self.reset_game_state()
         self.in_menu = False
-        self.current_level = 2
-
-        # Создание игрока (появляется слева от первой платформы на земле)
-        self.player = Player(start_x=50, start_y=HEIGHT - 100)
+        self.current_level = level.number
+        self.level_theme = level.theme
+        self.level_generation += 1
+        self.tick = 0
+        self.camera = prepared.camera
+        self.chunks = prepared.chunks
+        self.level_platforms = prepared.level_platforms
+        self.player = prepared.player
         self.all_sprites.add(self.player)
+        self.finish_flag = prepared.finish_flag
+        self.coin_positions = list(level.coins)
+        self.level_coins = prepared.level_coins
+        self.level_enemies = prepared.level_enemies
+        self.coin_alive = bytearray(b'\x01') * len(self.level_coins)
+        self.entity_arrays = prepared.entity_arrays
+        self.update_active_chunks()
+
+        self.initial_snapshot = self.snapshot()
+        if self.rewind_buffer is not None:
+            self.rewind_buffer.clear()
+            self.rewind_buffer.push(self.initial_snapshot)
+        # Замеры прошлого уровня к новому не относятся
+        if self.resolution is not None:
+            self.resolution.reset()
+
+    def snapshot(self) -> GameSnapshot:
+        """Снимок изменяемого состояния уровня (см. snapshots.GameSnapshot)"""
+        player = self.player
+        scalars = array('d', (self.tick, player.rect.x, player.rect.y, player.velocity_y, player.jumping,
+                              player.lives, player.score, player.invincible, player.invincible_timer,
+                              self.camera.x, self.game_over, self.game_won, self.level_complete))
+        if self.entity_arrays:
+            enemies = self.entity_arrays.enemy_state()
+        else:
+            enemies = array('i')
+            for enemy in self.level_enemies:
+                enemies.extend((enemy.rect.x, enemy.rect.y, enemy.direction))
+        return GameSnapshot(scalars, enemies, bytes(self.coin_alive))
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """Возврат уровня к состоянию из снимка, сделанного на этом же уровне"""
+        (tick, player_x, player_y, velocity_y, jumping, lives, score, invincible, invincible_timer,
+         camera_x, game_over, game_won, level_complete) = snapshot.scalars
+        self.tick = int(tick)
+        player = self.player
+        player.rect.topleft = (int(player_x), int(player_y))
+        player.velocity_y = velocity_y
+        player.jumping = bool(jumping)
+        player.lives = int(lives)
+        player.score = int(score)
+        player.invincible = bool(invincible)
+        player.invincible_timer = int(invincible_timer)
+        self.game_over = bool(game_over)
+        self.game_won = bool(game_won)
+        self.level_complete = bool(level_complete)
+
+        if self.entity_arrays:
+            self.entity_arrays.set_enemy_state(snapshot.enemies)
+        else:
+            state = snapshot.enemies
+            for i, enemy in enumerate(self.level_enemies):
+                enemy.rect.topleft = (state[3 * i], state[3 * i + 1])
+                enemy.direction = state[3 * i + 2]
+                if enemy in self.enemy_grid:
+                    self.enemy_grid.move(enemy, enemy.rect)
+
+        self.camera.x = int(camera_x)
+        self.update_active_chunks()
+        if snapshot.coins != self.coin_alive:
+            self.restore_coins(snapshot.coins)
+        self.clear_effects()
+        if self.entity_arrays:
+            self.entity_arrays.bob_coins(self.sim_time_ms())
+        else:
+            self.coins.update(self.sim_time_ms())
+        self.save_previous_positions()
+
+    def restore_coins(self, alive: bytes) -> None:
+        """Возврат собранных монеток и удаление несобранных по признакам из снимка"""
+        revived = False
+        for index, (was, now) in enumerate(zip(self.coin_alive, alive)):
+            if was == now:
+                continue
+            coin = self.level_coins[index]
+            chunk = self.chunks[coin.chunk]
+            if now:
+                chunk.coins.append(coin)
+                revived = True
+            else:
+                chunk.coins.remove(coin)
+                self.remove_entity(coin, self.coin_grid)
+        self.coin_alive[:] = alive
+        if self.entity_arrays:
+            self.entity_arrays.set_coin_alive(alive)
+        if revived:
+            # Участки включаются заново, чтобы порядок отрисовки был как после загрузки
+            for chunk in self.chunks:
+                chunk.coins.sort(key=lambda coin: coin.index)
+            previous, self.active_chunks = self.active_chunks, range(0)
+            for index in previous:
+                self.set_chunk_active(self.chunks[index], False)
+            self.update_active_chunks()
+
+    def chunk_range(self, camera_x: int) -> range:
+        """Номера участков, активных при положении камеры camera_x"""
+        first = max(0, camera_x // CHUNK_WIDTH - CHUNK_MARGIN)
+        last = min(len(self.chunks) - 1, (camera_x + WIDTH - 1) // CHUNK_WIDTH + CHUNK_MARGIN)
+        return range(first, last + 1)
+
+    def update_active_chunks(self) -> None:
+        """Включение участков рядом с камерой и выключение остальных"""
+        active = self.chunk_range(self.camera.x)
+        if active == self.active_chunks:
+            return
 
-        # Создание земли (темные цвета)
-        ground = Ground(0, HEIGHT - 50, WIDTH, 50, Colors.DARK_RED, Colors.DARK_GREEN)
-        self.platforms.add(ground)
-        self.all_sprites.add(ground)
-
-        # Платформы (поднята самая нижняя платформа)
-        platform_data = [
-            (100, 480, 200, 20),    # Левая нижняя (поднята с 500 до 480)
-            (500, 450, 200, 20),    # Правая нижняя
-            (200, 350, 150, 20),    # Левая средняя
-            (450, 250, 180, 20)     # Правая верхняя (финиш)
-        ]
-
-        platforms_list = []
-        for x, y, width, height in platform_data:
-            platform = Platform(x, y, width, height, Colors.DARK_BLUE, Colors.BLUE)
-            self.platforms.add(platform)
-            self.all_sprites.add(platform)
-            platforms_list.append(platform)
-
-        # Монетки (убраны две монетки у финиша)
-        self.coin_positions = [
-            (150, 450), (250, 450),  # На первой платформе (координаты обновлены)
-            (550, 420), (650, 420),  # На второй платформе
-            (250, 320), (300, 320),  # На третьей платформе
-            # Убраны две монетки у финиша: (500, 220), (550, 220)
-            (350, 520),              # На земле
-            (750, 520),              # На земле
-            (400, 400),              # Между платформами
-            (300, 200)               # В воздухе
-        ]
-
-        for x, y in self.coin_positions:
-            coin = Coin(x, y)
-            self.coins.add(coin)
-            self.all_sprites.add(coin)
+        previous, self.active_chunks = self.active_chunks, active
+        for index in previous:
+            if index not in active:
+                self.set_chunk_active(self.chunks[index], False)
+        for index in active:
+            if index not in previous:
+                self.set_chunk_active(self.chunks[index], True)
+
+    def set_chunk_active(self, chunk: LevelChunk, active: bool) -> None:
+        """Добавление спрайтов участка в группы и сетки или удаление из них
+
+        Платформы и враги из нескольких участков добавляются один раз и
+        убираются, только когда ни один их участок не входит в active_chunks.
+        """
+        if active:
+            for platform in chunk.platforms:
+                if platform not in self.platforms:
+                    self.add_platform(platform)
+            for coin in chunk.coins:
+                self.add_coin(coin)
+            enemies = [enemy for enemy in chunk.enemies if enemy not in self.enemies]
+            for enemy in enemies:
+                self.add_enemy(enemy)
+            self.all_sprites.add(chunk.decor)
+        else:
+            for platform in chunk.platforms:
+                if not ranges_overlap(platform.chunk_span, self.active_chunks):
+                    self.remove_platform(platform)
+            for coin in chunk.coins:
+                self.remove_entity(coin, self.coin_grid)
+            enemies = [enemy for enemy in chunk.enemies
+                       if not ranges_overlap(enemy.chunk_span, self.active_chunks)]
+            for enemy in enemies:
+                self.remove_entity(enemy, self.enemy_grid)
+            self.all_sprites.remove(chunk.decor)
+        if self.entity_arrays:
+            self.entity_arrays.set_active(chunk.coins, enemies, active)
+
+    def load_level(self, number: int) -> None:
+        """Загрузка уровня из файла levels/level<номер>.json
+
+        Если уровень заранее подготовлен в фоне, подключаются готовые спрайты.
+        """
+        prepared = self.preloader.take(number) if self.preloader else None
+        if prepared is None:
+            prepared = self.prepare_level(self.level_loader.load(f"level{number}"))
+        self.install_level(prepared)
+        # Пока идет этот уровень, готовится следующий
+        self.request_preload(number + 1)
+
+    def preload_level(self, number: int) -> PreparedLevel:
+        """Подготовка уровня в фоновом потоке: описание, спрайты и фон его темы"""
+        level = self.level_loader.load(f"level{number}")
+        get_background_layers(level.theme)
+        return self.prepare_level(level)
+
+    def request_preload(self, number: int) -> None:
+        """Запрос фоновой подготовки уровня, если файл уровня существует"""
+        if self.preloader and os.path.exists(self.level_loader.source_path(f"level{number}")):
+            self.preloader.request(number)
+
+    def preload_menu_levels(self) -> None:
+        """Подготовка уровней, которые можно выбрать в меню"""
+        for number in MENU_LEVELS:
+            self.request_preload(number)
 
-        # Враги
-        enemy_data = [
-            (platforms_list[0].rect, 2, None, Colors.ORANGE),
-            (platforms_list[1].rect, 3, None, Colors.ORANGE),
-            (platforms_list[2].rect, 2, None, Colors.ORANGE)
-        ]
+    def create_level_1(self) -> None:
+        """Создание первого игрового уровня (дневной)"""
+        self.load_level(1)
 
-        for platform_rect, speed, custom_bounds, color in enemy_data:
-            enemy = Enemy(platform_rect, speed, custom_bounds, color)
-            self.enemies.add(enemy)
-            self.all_sprites.add(enemy)
+    def create_level_2(self) -> None:
+        """Создание второго игрового уровня (ночной)"""
+        self.load_level(2)
 
-        # Финишный флаг
-        self.finish_flag = FinishFlag(530, 250, Colors.GOLD)
-        self.all_sprites.add(self.finish_flag)
+    def background_layers(self, scale: float = 1.0) -> BackgroundLayers:
+        """Слои фона для темы текущего уровня"""
+        return get_background_layers(self.level_theme, scale)
 
-    def draw_background(self) -> None:
+    def draw_background(self, target: Optional[pygame.Surface] = None, scale: float = 1.0) -> None:
         """Отрисовка фона в зависимости от уровня"""
-        if self.current_level == 1:
-            # Дневной фон для уровня 1
-            screen.fill(Colors.LIGHT_BLUE)
-
-            # Облака
-            current_time = pygame.time.get_ticks()
-            for i in range(5):
-                x = (current_time // 50 + i * 200) % (WIDTH + 200) - 100
-                y = 80 + i * 40
-                pygame.draw.ellipse(screen, Colors.WHITE, (x, y, 100, 40))
-                pygame.draw.ellipse(screen, Colors.WHITE, (x + 30, y - 20, 80, 40))
-                pygame.draw.ellipse(screen, Colors.WHITE, (x + 60, y, 70, 30))
-
-            # Солнце
-            pygame.draw.circle(screen, (255, 255, 100), (700, 80), 40)
-
-        else:
-            # Ночной фон для уровня 2 (сделан светлее)
-            screen.fill((40, 40, 100))  # Более светлый темно-синий ночное небо
-
-            # Звезды
-            star_positions = [(100, 50), (200, 80), (350, 40), (450, 70),
-                            (600, 30), (700, 60), (750, 90), (300, 120)]
-            for x, y in star_positions:
-                pygame.draw.circle(screen, Colors.WHITE, (x, y), 2)
-                # Мерцание звезд
-                if pygame.time.get_ticks() % 1000 < 500:
-                    pygame.draw.circle(screen, Colors.YELLOW, (x, y), 1)
-
-            # Луна
-            pygame.draw.circle(screen, (220, 220, 220), (100, 80), 30)
-            pygame.draw.circle(screen, (40, 40, 100), (115, 65), 25)
+        self.background_layers(scale).draw(target or self.screen, self.frame_time_ms)
 
     def draw_menu(self) -> None:
         """Отрисовка главного меню"""
         # Фон меню
-        screen.fill((30, 30, 80))
+        self.screen.fill((30, 30, 80))
 
         # Заголовок
-        title_text = font_large.render("ВЫБЕРИТЕ УРОВЕНЬ", True, Colors.WHITE)
-        screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 100))
+        title_text = text_cache.render(fonts.large, "ВЫБЕРИТЕ УРОВЕНЬ", True, Colors.WHITE)
+        self.screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 100))
 
         # Информация об уровнях
-        level1_text = font_medium.render("Уровень 1: Дневной мир", True, Colors.LIGHT_BLUE)
-        level2_text = font_medium.render("Уровень 2: Ночное приключение", True, Colors.ORANGE)
+        level1_text = text_cache.render(fonts.medium, "Уровень 1: Дневной мир", True, Colors.LIGHT_BLUE)
+        level2_text = text_cache.render(fonts.medium, "Уровень 2: Ночное приключение", True, Colors.ORANGE)
 
-        screen.blit(level1_text, (WIDTH // 2 - level1_text.get_width() // 2, 180))
-        screen.blit(level2_text, (WIDTH // 2 - level2_text.get_width() // 2, 220))
+        self.screen.blit(level1_text, (WIDTH // 2 - level1_text.get_width() // 2, 180))
+        self.screen.blit(level2_text, (WIDTH // 2 - level2_text.get_width() // 2, 220))
 
         # Кнопки выбора уровня
-        pygame.draw.rect(screen, Colors.BLUE, (WIDTH // 2 - 150, 280, 300, 60), border_radius=10)
-        pygame.draw.rect(screen, Colors.DARK_BLUE, (WIDTH // 2 - 150, 360, 300, 60), border_radius=10)
+        pygame.draw.rect(self.screen, Colors.BLUE, (WIDTH // 2 - 150, 280, 300, 60), border_radius=10)
+        pygame.draw.rect(self.screen, Colors.DARK_BLUE, (WIDTH // 2 - 150, 360, 300, 60), border_radius=10)
 
-        level1_btn = font_medium.render("ИГРАТЬ УРОВЕНЬ 1", True, Colors.WHITE)
-        level2_btn = font_medium.render("ИГРАТЬ УРОВЕНЬ 2", True, Colors.WHITE)
+        level1_btn = text_cache.render(fonts.medium, "ИГРАТЬ УРОВЕНЬ 1", True, Colors.WHITE)
+        level2_btn = text_cache.render(fonts.medium, "ИГРАТЬ УРОВЕНЬ 2", True, Colors.WHITE)
 
-        screen.blit(level1_btn, (WIDTH // 2 - level1_btn.get_width() // 2, 300))
-        screen.blit(level2_btn, (WIDTH // 2 - level2_btn.get_width() // 2, 380))
+        self.screen.blit(level1_btn, (WIDTH // 2 - level1_btn.get_width() // 2, 300))
+        self.screen.blit(level2_btn, (WIDTH // 2 - level2_btn.get_width() // 2, 380))
 
         # Управление (перекрашено в цвет травы)
         controls_bg = pygame.Rect(0, HEIGHT - 40, WIDTH, 40)
-        pygame.draw.rect(screen, Colors.LIGHT_GREEN, controls_bg)
+        pygame.draw.rect(self.screen, Colors.LIGHT_GREEN, controls_bg)
 
-        controls_text = font_small.render("Управление: ← → двигаться, ↑ прыжок, R перезапуск уровня, ESC меню", True, Colors.BLACK)
-        screen.blit(controls_text, (WIDTH // 2 - controls_text.get_width() // 2, HEIGHT - 30))
+        controls_text = text_cache.render(fonts.small, "Управление: ← → двигаться, ↑ прыжок, R перезапуск уровня, ESC меню", True, Colors.BLACK)
+        self.screen.blit(controls_text, (WIDTH // 2 - controls_text.get_width() // 2, HEIGHT - 30))
 
         # Если уровень завершен, показываем сообщение
         if self.level_complete:
-            complete_text = font_medium.render("Уровень завершен! Выберите следующий уровень", True, Colors.GREEN)
-            screen.blit(complete_text, (WIDTH // 2 - complete_text.get_width() // 2, 450))
+            complete_text = text_cache.render(fonts.medium, "Уровень завершен! Выберите следующий уровень", True, Colors.GREEN)
+            self.screen.blit(complete_text, (WIDTH // 2 - complete_text.get_width() // 2, 450))
 
     def handle_menu_events(self) -> bool:
         """Обработка событий в меню"""
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.invalidate_screen()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.toggle_profiler()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 x, y = event.pos
                 # Проверка нажатия на кнопку уровня 1
                 if WIDTH // 2 - 150 <= x <= WIDTH // 2 + 150 and 280 <= y <= 340:
-                    self.create_level_1()
+                    self.start_level(1)
                 # Проверка нажатия на кнопку уровня 2
                 elif WIDTH // 2 - 150 <= x <= WIDTH // 2 + 150 and 360 <= y <= 420:
-                    self.create_level_2()
+                    self.start_level(2)
             if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 # Предотвращаем выход из меню по ESC
                 pass
@@ -519,21 +1170,35 @@ class Game:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.invalidate_screen()
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_UP and not self.game_over and not self.game_won:
-                    self.player.jump()
-                if event.key == pygame.K_r and (self.game_over or self.game_won):
-                    self.restart_level()
+                # Прыжок и перезапуск выполняются на ближайшем шаге симуляции
+                if event.key == pygame.K_UP:
+                    self.pending_jump = True
+                if event.key == pygame.K_r:
+                    self.pending_restart = True
+                if event.key == pygame.K_F3:
+                    self.toggle_profiler()
                 if event.key == pygame.K_ESCAPE:  # Возврат в меню по ESC
                     self.in_menu = True
+                    self.preload_menu_levels()
                     # Не сбрасываем level_complete при выходе в меню
         return True
 
-    def check_collisions(self) -> None:
-        """Проверка всех столкновений в игре"""
+    def check_collisions(self, candidates: Optional[Sequence[pygame.sprite.Sprite]] = None) -> None:
+        """Проверка всех столкновений в игре
+
+        candidates - платформы, среди которых искать столкновения; если не заданы,
+        берутся из сетки по пути игрока за шаг (см. update_coarse)
+        """
+        if candidates is None:
+            candidates = self.platform_grid.query(self.sweep_area())
+        # Платформы, пересеченные за шаг насквозь (быстрое падение)
+        on_ground = self.sweep_platforms(candidates)
+
         # Проверка столкновений с платформами
-        platform_hits = pygame.sprite.spritecollide(self.player, self.platforms, False)
-        on_ground = False
+        platform_hits = [platform for platform in candidates if self.player.rect.colliderect(platform.rect)]
 
         for platform in platform_hits:
             # Игнорируем столкновение с землей при проверке прыжка
@@ -560,85 +1225,339 @@ class Game:
         if not on_ground and self.player.rect.bottom < HEIGHT - 50:
             self.player.jumping = True
 
-    def update_game_state(self) -> None:
-        """Обновление состояния игры"""
+    def sweep_area(self) -> pygame.Rect:
+        """Область, которую игрок прошел по вертикали за последний вызов Player.update"""
+        rect = self.player.rect
+        top = min(rect.y, self.player.last_y)
+        return pygame.Rect(rect.x, top, rect.width, abs(rect.y - self.player.last_y) + rect.height)
+
+    def sweep_platforms(self, candidates: Sequence[pygame.sprite.Sprite]) -> bool:
+        """Остановка игрока на первой платформе, пересеченной за шаг по вертикали
+
+        Проверка непрерывная (swept AABB с разделением по осям): сдвиг по x
+        уже сделан, а путь по y от прошлой высоты до новой сравнивается
+        с краями платформ под игроком. Если верх игрока прошел низ платформы,
+        подъем останавливается, если ноги прошли верх платформы - игрок встает
+        на нее. Пока шаг меньше высоты платформы и игрока, это ничего
+        не меняет: такое пересечение находит и обычная проверка перекрытий.
+        Возвращает True, если игрок встал на платформу.
+        """
+        player = self.player
+        rect = player.rect
+        start_y = player.last_y
+        if rect.y == start_y:
+            return False
+        boxes = [platform.rect for platform in candidates
+                 if not isinstance(platform, Ground)
+                 and platform.rect.left < rect.right and platform.rect.right > rect.left]
+        if not boxes:
+            return False
+
+        if rect.y < start_y:
+            # Подъем: верх игрока прошел низ платформы
+            ceilings = [box.bottom for box in boxes if rect.y < box.bottom <= start_y]
+            if ceilings:
+                rect.top = max(ceilings)
+                player.velocity_y = 0
+            return False
+
+        # Падение: ноги игрока прошли верх платформы
+        floors = [box.top for box in boxes if start_y + rect.height <= box.top < rect.bottom]
+        if not floors:
+            return False
+        rect.bottom = min(floors)
+        player.jumping = False
+        player.velocity_y = 0
+        return True
+
+    @staticmethod
+    def collide_grid(rect: pygame.Rect, grid: SpatialHash) -> List[pygame.sprite.Sprite]:
+        """Спрайты из сетки, пересекающиеся с прямоугольником"""
+        return [sprite for sprite in grid.query(rect) if rect.colliderect(sprite.rect)]
+
+    def update_game_state(self, inputs: Optional[InputState] = None) -> None:
+        """Обновление состояния игры
+
+        inputs - зажатые клавиши движения; если не заданы, читаются с клавиатуры
+        """
         if self.game_over or self.game_won or self.in_menu:
             return
 
         # Обработка управления
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
+        if inputs is None:
+            inputs = read_keyboard()
+        self.update_objects(inputs)
+        self.mark_phase('update')
+
+        # Проверка столкновений
+        self.check_collisions()
+        self.resolve_interactions()
+        self.mark_phase('collisions')
+
+    def update_objects(self, inputs: InputState) -> None:
+        """Движение игрока по управлению и обновление всех движущихся объектов"""
+        if inputs.left:
             self.player.move_left()
-        if keys[pygame.K_RIGHT]:
+        if inputs.right:
             self.player.move_right()
 
-        # Обновление объектов
         self.player.update()
-        self.enemies.update()
-        self.coins.update()
-
-        # Проверка столкновений
-        self.check_collisions()
+        # Камера идет за игроком, участки у нее включаются до обновления врагов
+        self.camera.follow(self.player.rect)
+        self.update_active_chunks()
+        if self.entity_arrays:
+            self.entity_arrays.step(self.sim_time_ms())
+        else:
+            self.enemies.update()
+            self.coins.update(self.sim_time_ms())
+            for enemy in self.enemies:
+                self.enemy_grid.move(enemy, enemy.rect)
+
+    def update_coarse(self, inputs: InputState, ticks: int) -> int:
+        """Крупный шаг: до ticks шагов симуляции с одним управлением
+
+        Игрок, враги и монетки обновляются по шагам в том же порядке, что
+        и в update_game_state, поэтому итог совпадает с прогоном по одному
+        шагу. Экономия в том, что платформы и монетки выбираются из сеток один
+        раз на весь шаг по области, которую игрок может пройти (swept AABB),
+        а камера, участки уровня и сетка врагов обновляются один раз. Шаг
+        обрывается раньше, если внутри него сменился бы набор активных
+        участков или закончилась игра. Первый шаг уже учтен в self.tick
+        (см. step); возвращает число выполненных шагов.
+        """
+        if self.game_over or self.game_won or self.in_menu:
+            self.tick += ticks - 1
+            return ticks
+
+        player = self.player
+        rect = player.rect
+        move = (player.speed if inputs.right else 0) - (player.speed if inputs.left else 0)
+        ticks, end_x = self.coarse_step_plan(move, ticks)
+        area = self.coarse_step_area(rect.x, end_x, ticks)
+        held = inputs._replace(jump=False, restart=False)
+
+        platforms = coins = None
+        time_ms = self.sim_time_ms()
+        for tick in range(ticks):
+            if tick:
+                self.tick += 1
+                if self.recorder:
+                    self.recorder.record(held)
+            if inputs.left:
+                player.move_left()
+            if inputs.right:
+                player.move_right()
+            player.update()
+            if platforms is None:
+                # Набор участков на всем шаге одинаковый (см. coarse_step_plan)
+                self.camera.follow(rect)
+                self.update_active_chunks()
+                platforms = self.platform_grid.query(area)
+                coins = None if self.entity_arrays else self.coin_grid.query(area)
+
+            time_ms = self.sim_time_ms()
+            if self.entity_arrays:
+                self.entity_arrays.step(time_ms)
+            else:
+                self.enemies.update()
+                for coin in coins:
+                    coin.update(time_ms)
+
+            self.check_collisions(platforms)
+            self.resolve_interactions(coins, self.enemies)
+            if self.game_over or self.game_won:
+                ticks = tick + 1
+                break
+
+        self.camera.follow(rect)
+        if not self.entity_arrays:
+            self.coins.update(time_ms)
+            for enemy in self.enemies:
+                self.enemy_grid.move(enemy, enemy.rect)
+        return ticks
+
+    def coarse_step_plan(self, move: int, ticks: int) -> Tuple[int, int]:
+        """Длина крупного шага и x игрока в его конце
+
+        Сдвиг по x зависит только от управления (платформы останавливают
+        игрока только по вертикали), поэтому путь камеры известен заранее.
+        Шаг укорачивается до последнего шага с тем же набором активных
+        участков, что и на первом: враги участка, включенного посреди шага,
+        должны начать движение именно с этого шага.
+        """
+        player = self.player
+        start_x = player.rect.x
+        half = player.rect.width // 2
+        right_limit = player.world_width - player.rect.width
+
+        def active_after(tick: int) -> range:
+            x = min(max(0, start_x + move * tick), right_limit)
+            return self.chunk_range(self.camera.position_for(x + half))
+
+        # Камера движется в одну сторону, так что совпадение на концах шага
+        # означает одинаковый набор участков на всем шаге
+        first = active_after(1)
+        if active_after(ticks) != first:
+            ticks = next(tick for tick in range(2, ticks + 1) if active_after(tick) != first) - 1
+        return ticks, min(max(0, start_x + move * ticks), right_limit)
+
+    def coarse_step_area(self, start_x: int, end_x: int, ticks: int) -> pygame.Rect:
+        """Область, из которой игрок не выйдет за ticks шагов (для выборки кандидатов)
+
+        За шаг игрок смещается по y на int(velocity_y) при росте скорости
+        на 0.5 за шаг, а столкновения движение только гасят, поэтому
+        подъем не больше -velocity_y * ticks, а падение - не больше
+        velocity_y * ticks + 0.5 * (1 + ... + ticks).
+        """
+        rect = self.player.rect
+        velocity = self.player.velocity_y
+        rise = int(max(0.0, -velocity) * ticks) + 1
+        fall = int(max(0.0, velocity) * ticks + 0.25 * ticks * (ticks + 1)) + 1
+        left = min(start_x, end_x)
+        return pygame.Rect(left, rect.y - rise, abs(end_x - start_x) + rect.width, rise + fall + rect.height)
+
+    def resolve_interactions(self, coins: Optional[List[Coin]] = None,
+                             enemies: Optional[pygame.sprite.Group] = None) -> None:
+        """Сбор монеток, урон от врагов и достижение финиша
+
+        coins, enemies - кандидаты вместо поиска по сеткам (крупный шаг,
+        см. update_coarse); собранные монетки удаляются из coins.
+        """
+        rect = self.player.rect
 
         # Сбор монеток
-        coin_hits = pygame.sprite.spritecollide(self.player, self.coins, True)
-        for _ in coin_hits:
+        if self.entity_arrays:
+            arrays = self.entity_arrays
+            coin_hits = [arrays.collect_coin(index) for index in arrays.coin_hits(rect)]
+        else:
+            if coins is None:
+                coin_hits = self.collide_grid(rect, self.coin_grid)
+            else:
+                coin_hits = [coin for coin in coins if rect.colliderect(coin.rect)]
+                for coin in coin_hits:
+                    coins.remove(coin)
+            for coin in coin_hits:
+                self.coin_grid.remove(coin)
+        for coin in coin_hits:
+            coin.kill()
+            self.chunks[coin.chunk].coins.remove(coin)
+            self.coin_alive[coin.index] = 0
             self.player.score += 10
+            self.emit_coin_sparkle(coin)
 
         # Столкновение с врагами
-        enemy_hits = pygame.sprite.spritecollide(self.player, self.enemies, False)
-        if enemy_hits:
+        if self.entity_arrays:
+            enemy_hit = self.entity_arrays.enemy_hit(rect)
+        elif enemies is None:
+            enemy_hit = bool(self.collide_grid(rect, self.enemy_grid))
+        else:
+            enemy_hit = any(rect.colliderect(enemy.rect) for enemy in enemies)
+        if enemy_hit:
+            lives = self.player.lives
             if self.player.take_damage():
                 self.game_over = True
+            if self.player.lives < lives:
+                self.emit_hit_burst()
 
         # Проверка достижения финиша
         if self.finish_flag and pygame.sprite.collide_rect(self.player, self.finish_flag):
             self.game_won = True
             self.level_complete = True
-
-    def draw_ui(self) -> None:
-        """Отрисовка пользовательского интерфейса"""
+            self.confetti_ticks = CONFETTI_TICKS
+
+    def emit_coin_sparkle(self, coin: Coin) -> None:
+        """Искры на месте собранной монетки"""
+        if self.particles is not None:
+            self.particles.emit(coin.rect.centerx, coin.original_y + coin.rect.height // 2, COIN_SPARKLE_PARTICLES,
+                                speed=3, life=30, colors=(Colors.YELLOW, Colors.GOLD, Colors.WHITE))
+
+    def emit_hit_burst(self) -> None:
+        """Брызги вокруг игрока при потере жизни"""
+        if self.particles is not None:
+            rect = self.player.rect
+            self.particles.emit(rect.centerx, rect.centery, HIT_BURST_PARTICLES, speed=5, life=40,
+                                colors=(Colors.RED, Colors.DARK_RED, Colors.ORANGE), size=4)
+
+    def step_effects(self, ticks: int) -> None:
+        """Движение частиц эффектов и выпуск конфетти после победы"""
+        if self.particles is None:
+            return
+        if self.confetti_ticks > 0:
+            # Конфетти сыплется из-за верхнего края экрана по всей ширине
+            self.confetti.emit(WIDTH // 2, -10, CONFETTI_PER_TICK * min(ticks, self.confetti_ticks), speed=2,
+                               life=150, colors=CONFETTI_COLORS, angle=math.pi / 2, spread=math.pi, size=4,
+                               width=WIDTH)
+            self.confetti_ticks -= ticks
+        self.particles.step(ticks)
+        self.confetti.step(ticks)
+        self.mark_phase('particles')
+
+    def clear_effects(self) -> None:
+        """Удаление всех частиц (смена уровня, перезапуск, перемотка)"""
+        self.confetti_ticks = 0
+        for system in (self.particles, self.confetti):
+            if system is not None:
+                system.clear()
+
+    def effects_active(self) -> bool:
+        """Есть ли на экране движущиеся частицы"""
+        return self.confetti_ticks > 0 or any(system is not None and len(system)
+                                              for system in (self.particles, self.confetti))
+
+    def hud_items(self) -> List[Tuple[str, pygame.Surface, Tuple[int, int]]]:
+        """Надписи интерфейса: (имя, поверхность, позиция)"""
+        text_color = Colors.WHITE if self.level_theme == 'night' else Colors.BLACK
         # Счет
-        score_text = font_medium.render(f"Очки: {self.player.score}", True, Colors.WHITE if self.current_level == 2 else Colors.BLACK)
-        screen.blit(score_text, (10, 10))
-
+        score_text = text_cache.render(fonts.medium, f"Очки: {self.player.score}", True, text_color)
         # Жизни
-        lives_text = font_medium.render(f"Жизни: {self.player.lives}", True, Colors.RED)
-        screen.blit(lives_text, (WIDTH - 120, 10))
-
+        lives_text = text_cache.render(fonts.medium, f"Жизни: {self.player.lives}", True, Colors.RED)
         # Уровень
-        level_text = font_medium.render(f"Уровень: {self.current_level}", True, Colors.WHITE if self.current_level == 2 else Colors.BLACK)
-        screen.blit(level_text, (WIDTH // 2 - level_text.get_width() // 2, 10))
+        level_text = text_cache.render(fonts.medium, f"Уровень: {self.current_level}", True, text_color)
+        return [
+            ('score', score_text, (10, 10)),
+            ('lives', lives_text, (WIDTH - 120, 10)),
+            ('level', level_text, (WIDTH // 2 - level_text.get_width() // 2, 10)),
+        ]
+
+    def player_blinking(self) -> bool:
+        """Мигает ли игрок в текущем кадре (неуязвимость после урона)"""
+        return self.player.invincible and self.player.invincible_timer % 10 < 5
+
+    def draw_ui(self) -> None:
+        """Отрисовка пользовательского интерфейса"""
+        for _, surface, position in self.hud_items():
+            self.screen.blit(surface, position)
 
         # Управление (перекрашено в цвет травы)
         controls_bg = pygame.Rect(0, HEIGHT - 40, WIDTH, 40)
-        pygame.draw.rect(screen, Colors.LIGHT_GREEN, controls_bg)
+        pygame.draw.rect(self.screen, Colors.LIGHT_GREEN, controls_bg)
 
-        controls_text = font_small.render(
+        controls_text = text_cache.render(
+            fonts.small,
             "Управление: ← → двигаться, ↑ прыжок, R перезапуск, ESC меню",
             True, Colors.BLACK
         )
-        screen.blit(controls_text, (10, HEIGHT - 30))
+        self.screen.blit(controls_text, (10, HEIGHT - 30))
 
         # Мигание при неуязвимости
-        if self.player.invincible and self.player.invincible_timer % 10 < 5:
-            blink_surface = pygame.Surface((self.player.rect.width, self.player.rect.height), pygame.SRCALPHA)
-            blink_surface.fill((255, 255, 255, 128))
-            screen.blit(blink_surface, self.player.rect)
+        if self.player_blinking():
+            blink_surface = sprite_atlas.get('blink', (255, 255, 255, 128), self.player.rect.size,
+                                             lambda image: image.fill((255, 255, 255, 128)))
+            self.screen.blit(blink_surface, self.screen_position(self.player))
 
     def draw_game_over(self) -> None:
         """Отрисовка экрана завершения игры"""
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        screen.blit(overlay, (0, 0))
+        overlay = sprite_atlas.get('overlay', (0, 0, 0, 150), (WIDTH, HEIGHT),
+                                   lambda image: image.fill((0, 0, 0, 150)))
+        self.screen.blit(overlay, (0, 0))
 
-        game_over_text = font_large.render("ИГРА ОКОНЧЕНА!", True, Colors.RED)
-        restart_text = font_medium.render("Нажми R для перезапуска уровня", True, Colors.WHITE)
-        menu_text = font_medium.render("Нажми ESC для выхода в меню", True, Colors.WHITE)
+        game_over_text = text_cache.render(fonts.large, "ИГРА ОКОНЧЕНА!", True, Colors.RED)
+        restart_text = text_cache.render(fonts.medium, "Нажми R для перезапуска уровня", True, Colors.WHITE)
+        menu_text = text_cache.render(fonts.medium, "Нажми ESC для выхода в меню", True, Colors.WHITE)
 
-        screen.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 50))
-        screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 10))
-        screen.blit(menu_text, (WIDTH // 2 - menu_text.get_width() // 2, HEIGHT // 2 + 50))
+        self.screen.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 50))
+        self.screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 10))
+        self.screen.blit(menu_text, (WIDTH // 2 - menu_text.get_width() // 2, HEIGHT // 2 + 50))
 
     def draw_victory(self) -> None:
         """Отрисовка экрана победы"""
@@ -653,29 +1572,33 @@ class Game:
         else:
             stars = 1
 
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 150))
-        screen.blit(overlay, (0, 0))
+        overlay = sprite_atlas.get('overlay', (0, 0, 0, 150), (WIDTH, HEIGHT),
+                                   lambda image: image.fill((0, 0, 0, 150)))
+        self.screen.blit(overlay, (0, 0))
 
         # Тексты победы
         texts = [
-            font_large.render("УРОВЕНЬ ПРОЙДЕН!", True, Colors.GREEN),
-            font_medium.render(f"Звезды: {stars}", True, Colors.YELLOW),
-            font_medium.render(f"Собрано монет: {collected_coins}/{total_coins}", True, Colors.WHITE),
-            font_medium.render("Нажми ESC для выхода в меню", True, Colors.WHITE),
-            font_medium.render("Нажми R для перезапуска уровня", True, Colors.WHITE)
+            text_cache.render(fonts.large, "УРОВЕНЬ ПРОЙДЕН!", True, Colors.GREEN),
+            text_cache.render(fonts.medium, f"Звезды: {stars}", True, Colors.YELLOW),
+            text_cache.render(fonts.medium, f"Собрано монет: {collected_coins}/{total_coins}", True, Colors.WHITE),
+            text_cache.render(fonts.medium, "Нажми ESC для выхода в меню", True, Colors.WHITE),
+            text_cache.render(fonts.medium, "Нажми R для перезапуска уровня", True, Colors.WHITE)
         ]
 
         # Расположение текстов
         y_positions = [HEIGHT // 2 - 80, HEIGHT // 2 - 30, HEIGHT // 2 + 10, HEIGHT // 2 + 50, HEIGHT // 2 + 90]
         for text, y in zip(texts, y_positions):
-            screen.blit(text, (WIDTH // 2 - text.get_width() // 2, y))
+            self.screen.blit(text, (WIDTH // 2 - text.get_width() // 2, y))
 
         # Отрисовка звезд
         for i in range(stars):
             star_x = WIDTH // 2 - (stars * 25) + i * 50
             self._draw_star(star_x, HEIGHT // 2 + 130)
 
+        # Конфетти поверх затемнения
+        if self.confetti is not None:
+            self.confetti.draw(self.screen)
+
     def _draw_star(self, x: int, y: int) -> None:
         """Отрисовка звезды"""
         points = [
@@ -685,51 +1608,496 @@ class Game:
             (x - 5, y + 10), (x - 20, y),
             (x - 10, y - 20)
         ]
-        pygame.draw.polygon(screen, Colors.YELLOW, points)
+        pygame.draw.polygon(self.screen, Colors.YELLOW, points)
+
+    def start_level(self, level: int) -> None:
+        """Запуск уровня по номеру"""
+        self.load_level(level)
+        if self.recorder:
+            self.recorder.begin(level)
 
     def restart_level(self) -> None:
-        """Перезапуск текущего уровня"""
-        if self.current_level == 1:
-            self.create_level_1()
+        """Перезапуск текущего уровня: возврат к снимку, сделанному при загрузке"""
+        if self.initial_snapshot is None:
+            self.load_level(self.current_level)
+            return
+        self.restore(self.initial_snapshot)
+        if self.rewind_buffer is not None:
+            self.rewind_buffer.push(self.initial_snapshot)
+
+    def sim_time_ms(self, alpha: float = 1.0) -> int:
+        """Игровое время в миллисекундах по счетчику шагов
+
+        alpha - доля шага для отрисовки между шагами (см. render_alpha).
+        """
+        return max(0, int((self.tick - 1 + alpha) * 1000 / TICK_RATE))
+
+    def step(self, inputs: InputState, ticks: int = 1) -> int:
+        """Один кадр симуляции по заданному управлению, без отрисовки
+
+        Прыжок и перезапуск обрабатываются так же, как нажатия клавиш
+        в handle_events, движение - как зажатые клавиши.
+
+        ticks > 1 - крупный шаг на несколько шагов симуляции с этим управлением
+        (прыжок и перезапуск - на первом из них), см. update_coarse.
+        Возвращает число выполненных шагов симуляции.
+        """
+        if self.in_menu:
+            return ticks
+        if self.recorder:
+            self.recorder.record(inputs)
+        self.tick += 1
+        if inputs.restart and (self.game_over or self.game_won):
+            self.restart_level()
+        if inputs.jump and not self.game_over and not self.game_won:
+            self.player.jump()
+        # Прошлые позиции нужны только для интерполяции при отрисовке
+        if not self.headless:
+            self.save_previous_positions()
+        if ticks == 1:
+            self.update_game_state(inputs)
         else:
-            self.create_level_2()
+            ticks = self.update_coarse(inputs, ticks)
+        if self.rewind_buffer is not None and not (self.game_over or self.game_won):
+            self.rewind_buffer.push(self.snapshot())
+        self.step_effects(ticks)
+        return ticks
+
+    def step_many(self, inputs: Sequence[InputState], max_ticks: int = 8, until_end: bool = False) -> int:
+        """Прогон шагов симуляции по управлению inputs крупными шагами
+
+        Крупный шаг (не длиннее max_ticks) покрывает подряд идущие шаги
+        с одинаковым управлением, а прыжок и перезапуск начинают новый шаг,
+        поэтому итог тот же, что у вызова step для каждого состояния.
+        until_end - остановиться на победе или проигрыше, как run_headless.
+        Возвращает число использованных состояний управления.
+        """
+        done = 0
+        while done < len(inputs) and not (until_end and (self.game_over or self.game_won)):
+            first = inputs[done]
+            held = first._replace(jump=False, restart=False)
+            end = done + 1
+            limit = min(len(inputs), done + max_ticks)
+            while end < limit and inputs[end] == held:
+                end += 1
+            done += self.step(first, end - done)
+        return done
+
+    def rewind_step(self) -> None:
+        """Шаг назад по буферу перемотки вместо шага симуляции"""
+        buffer = self.rewind_buffer
+        if buffer is None or self.in_menu or len(buffer) < 2:
+            return
+        buffer.pop()
+        self.restore(buffer.peek())
+
+    def rewinding(self) -> bool:
+        """Зажата ли клавиша перемотки (при записи управления перемотка отключена)"""
+        return (self.rewind_buffer is not None and self.recorder is None
+                and pygame.key.get_pressed()[pygame.K_BACKSPACE])
+
+    def take_input(self) -> InputState:
+        """Управление для очередного шага: зажатые клавиши и накопленные нажатия"""
+        keys = read_keyboard()
+        inputs = keys._replace(jump=self.pending_jump, restart=self.pending_restart)
+        self.pending_jump = False
+        self.pending_restart = False
+        return inputs
+
+    def save_previous_positions(self) -> None:
+        """Запоминание позиций движущихся объектов перед шагом симуляции"""
+        if self.player:
+            self.player.prev_pos = self.player.rect.topleft
+        self.camera.prev_x = self.camera.x
+        if self.entity_arrays:
+            self.entity_arrays.save_previous()
+            return
+        for sprite in self.enemies:
+            sprite.prev_pos = sprite.rect.topleft
+        for sprite in self.coins:
+            sprite.prev_pos = sprite.rect.topleft
+
+    def draw_position(self, sprite: pygame.sprite.Sprite) -> Tuple[int, int]:
+        """Позиция спрайта для отрисовки между двумя шагами симуляции"""
+        x, y = sprite.rect.topleft
+        prev = getattr(sprite, 'prev_pos', None)
+        if prev is None or self.render_alpha >= 1.0:
+            return x, y
+        alpha = self.render_alpha
+        return (round(prev[0] + (x - prev[0]) * alpha),
+                round(prev[1] + (y - prev[1]) * alpha))
+
+    def screen_position(self, sprite: pygame.sprite.Sprite) -> Tuple[int, int]:
+        """Позиция спрайта на экране с учетом камеры"""
+        x, y = self.draw_position(sprite)
+        return x - self.camera.offset(self.render_alpha), y
+
+    def visible_sprites(self) -> List[Tuple[pygame.sprite.Sprite, Tuple[int, int]]]:
+        """Спрайты активных участков, попадающие в экран, и их позиции на экране"""
+        offset = self.camera.offset(self.render_alpha)
+        right = offset + WIDTH
+        visible = []
+        for sprite in self.all_sprites:
+            x, y = self.draw_position(sprite)
+            if x < right and x + sprite.rect.width > offset:
+                visible.append((sprite, (x - offset, y)))
+        return visible
+
+    def draw_sprites(self, target: Optional[pygame.Surface] = None, scale: float = 1.0) -> None:
+        """Отрисовка видимых спрайтов в интерполированных позициях"""
+        target = target or self.screen
+        if scale == 1.0:
+            target.blits([(sprite.image, position) for sprite, position in self.visible_sprites()],
+                         doreturn=False)
+            return
+        target.blits([(sprite_atlas.scaled(sprite.image, scale), (round(x * scale), round(y * scale)))
+                      for sprite, (x, y) in self.visible_sprites()], doreturn=False)
+
+    def render_scale(self) -> float:
+        """Масштаб отрисовки сцены (меньше 1 - сцена рисуется в пониженном разрешении)"""
+        if self.resolution is None or self.dirty_tracker:
+            return 1.0
+        return self.resolution.scale
+
+    def low_res_surface(self, scale: float) -> pygame.Surface:
+        """Поверхность для сцены в пониженном разрешении"""
+        size = (round(WIDTH * scale), round(HEIGHT * scale))
+        surface = self._low_res_surface
+        if surface is None or surface.get_size() != size:
+            surface = self._low_res_surface = optimize_surface(pygame.Surface(size))
+        return surface
+
+    def run_headless(self, level: Union[int, LevelData],
+                     script: Union[Sequence[InputState], Callable[[int], InputState]],
+                     max_frames: int, step_ticks: int = 1) -> Dict[str, Any]:
+        """Прогон уровня без окна и ограничения FPS
+
+        level - номер уровня из файла или готовое описание уровня (например,
+        сгенерированного по зерну, см. level_generator).
+        script - список состояний управления по кадрам (после его окончания
+        ничего не нажато) или функция, возвращающая управление по номеру кадра.
+        Прогон заканчивается победой, проигрышем или по истечении max_frames.
+        step_ticks > 1 - прогон крупными шагами до step_ticks кадров (см. step_many):
+        итог тот же, а прогон быстрее.
+        """
+        if callable(script):
+            get_input = script
+        else:
+            idle = InputState()
+            get_input = lambda frame: script[frame] if frame < len(script) else idle
+
+        if isinstance(level, LevelData):
+            self.build_level(level)
+        else:
+            self.start_level(level)
+        frames = 0
+        while frames < max_frames and not (self.game_over or self.game_won):
+            if step_ticks == 1:
+                self.step(get_input(frames))
+                frames += 1
+            else:
+                count = min(step_ticks, max_frames - frames)
+                frames += self.step_many([get_input(frames + i) for i in range(count)], step_ticks, True)
+
+        return {
+            "level": self.current_level,
+            "score": self.player.score,
+            "lives": self.player.lives,
+            "won": self.game_won,
+            "lost": self.game_over,
+            "frames": frames,
+        }
+
+    def sync_entities(self) -> None:
+        """Перенос положений из массивов сущностей в спрайты перед отрисовкой"""
+        if self.entity_arrays:
+            self.entity_arrays.sync_sprites()
+
+    def toggle_profiler(self) -> None:
+        """Показ/скрытие наложения профилировщика (замеры включаются при первом показе)"""
+        if not isinstance(self.phase_timer, FrameProfiler):
+            self.phase_timer = FrameProfiler()
+        self.show_profiler = not self.show_profiler
+        self.invalidate_screen()
+
+    def draw_profiler(self) -> None:
+        """Отрисовка наложения профилировщика поверх кадра"""
+        self.phase_timer.draw_overlay(self.screen, lambda text, color: text_cache.render(fonts.small, text, True, color))
+
+    def mark_phase(self, phase: str) -> None:
+        """Отметка конца фазы кадра для замера времени"""
+        if self.phase_timer is not None:
+            self.phase_timer.mark(phase)
+
+    def draw_frame(self) -> None:
+        """Отрисовка всего кадра: меню или игровой сцены с экранами завершения"""
+        if self.in_menu:
+            self.draw_menu()
+            self.mark_phase('ui')
+            return
+
+        scale = self.render_scale()
+        if scale == 1.0:
+            self.draw_background()
+            self.mark_phase('background')
+            self.draw_sprites()
+        else:
+            # Фон и спрайты рисуются в уменьшенную поверхность и растягиваются на окно,
+            # интерфейс поверх - в полном разрешении
+            scene = self.low_res_surface(scale)
+            self.draw_background(scene, scale)
+            self.mark_phase('background')
+            self.draw_sprites(scene, scale)
+            pygame.transform.scale(scene, self.screen.get_size(), self.screen)
+        self.mark_phase('sprites')
+        # Частицы рисуются в полном разрешении поверх сцены
+        if self.particles is not None:
+            self.particles.draw(self.screen, self.camera.offset(self.render_alpha))
+            self.mark_phase('particles')
+        self.draw_ui()
+
+        # Отрисовка экранов завершения
+        if self.game_over:
+            self.draw_game_over()
+        elif self.game_won:
+            self.draw_victory()
+        self.mark_phase('ui')
+
+    def invalidate_screen(self) -> None:
+        """Перерисовать весь экран в следующем кадре (в режиме грязных областей)"""
+        if self.dirty_tracker:
+            self.dirty_tracker.invalidate()
+
+    def track_dirty_regions(self) -> None:
+        """Передача трекеру областей всех меняющихся элементов сцены"""
+        tracker = self.dirty_tracker
+        tracker.begin_frame()
+
+        for key, rect, state in self.background_layers().animated_regions(self.frame_time_ms):
+            tracker.track(key, rect, state)
+
+        for sprite, position in self.visible_sprites():
+            tracker.track(sprite, pygame.Rect(position, sprite.rect.size))
+
+        for name, surface, position in self.hud_items():
+            tracker.track(('hud', name), pygame.Rect(position, surface.get_size()), surface)
+
+        tracker.track('blink', pygame.Rect(self.screen_position(self.player), self.player.rect.size),
+                      self.player_blinking())
+
+        # Частицы движутся каждый шаг: пока они есть, их область меняется
+        for name, system, offset in (('particles', self.particles, self.camera.offset(self.render_alpha)),
+                                     ('confetti', self.confetti, 0)):
+            rect = system.bounds(offset) if system is not None else None
+            if rect is not None:
+                tracker.track(name, rect, self.tick)
+        tracker.end_frame()
+
+    def render_dirty(self) -> List[pygame.Rect]:
+        """Перерисовка только изменившихся областей, возвращает их список"""
+        tracker = self.dirty_tracker
+        # Смена экрана (меню, уровень, экраны завершения) - полная перерисовка
+        # Сдвиг камеры тоже меняет весь экран
+        state = (self.in_menu, self.game_over, self.game_won, self.level_complete,
+                 self.current_level, self.level_generation, self.camera.offset(self.render_alpha))
+        if state != self._screen_state:
+            self._screen_state = state
+            tracker.reset()
+
+        if not self.in_menu:
+            self.track_dirty_regions()
+
+        rects = tracker.collect()
+        if rects:
+            # Кадр рисуется один раз в объединении областей: за его пределами
+            # экран не меняется, а в окно выводятся только сами области
+            self.screen.set_clip(rects[0].unionall(rects[1:]))
+            self.draw_frame()
+            self.screen.set_clip(None)
+        return rects
+
+    def is_idle_screen(self) -> bool:
+        """Статичный экран, на котором цикл ждет событий вместо отрисовки с частотой кадров"""
+        if self.show_profiler or self.rewinding():
+            return False
+        return self.in_menu or self.game_over or self.game_won
+
+    def needs_animation(self) -> bool:
+        """Есть ли на статичном экране анимация, которую нужно рисовать без событий"""
+        return self.effects_active()
+
+    def wait_idle(self) -> bool:
+        """Ожидание события на статичном экране, True - нужно нарисовать кадр
+
+        Полученное событие возвращается в очередь для обычной обработки.
+        Движение мыши на статичных экранах ничего не меняет и пропускается
+        (анимация при этом продолжается).
+        """
+        animated = self.needs_animation()
+        event = pygame.event.wait(IDLE_ANIMATION_TIMEOUT_MS if animated else IDLE_TIMEOUT_MS)
+        if event.type == pygame.NOEVENT:
+            return animated
+        if event.type == pygame.MOUSEMOTION:
+            return animated
+        pygame.event.post(event)
+        return True
 
     def run(self) -> None:
-        """Основной игровой цикл"""
+        """Основной игровой цикл
+
+        Симуляция идет фиксированными шагами SIM_DT независимо от частоты
+        отрисовки: на медленной машине за кадр выполняется несколько шагов
+        (не больше MAX_CATCHUP_TICKS), на быстрой - кадры рисуются между
+        шагами с интерполяцией позиций. На статичных экранах цикл ждет
+        событий (см. wait_idle) и почти не загружает процессор.
+        """
         running = True
+        accumulator = 0.0
+        previous_time = time.perf_counter()
+        idle = False
 
         while running:
-            clock.tick(FPS)
+            if self.is_idle_screen():
+                # Первый кадр статичного экрана рисуется сразу, дальше - по событиям
+                if idle and not self.wait_idle():
+                    continue
+                idle = True
+                # Время ожидания не догоняется: событие обрабатывается одним шагом
+                previous_time = time.perf_counter()
+                accumulator = SIM_DT
+            else:
+                idle = False
+                self.clock.tick(self.render_fps)
+            now = time.perf_counter()
+            frame_start = now
+            accumulator += now - previous_time
+            previous_time = now
+            timer = self.phase_timer
+            if timer:
+                timer.begin_frame()
 
             if self.in_menu:
                 # Режим меню
                 running = self.handle_menu_events()
-                self.draw_menu()
+                self.mark_phase('events')
+                accumulator = 0.0
             else:
                 # Режим игры
                 running = self.handle_events()
-                self.update_game_state()
-
-                # Отрисовка
-                self.draw_background()
-                self.all_sprites.draw(screen)
-                self.draw_ui()
-
-                # Отрисовка экранов завершения
-                if self.game_over:
-                    self.draw_game_over()
-                elif self.game_won:
-                    self.draw_victory()
+                self.mark_phase('events')
+
+                ticks = 0
+                while accumulator >= SIM_DT and ticks < MAX_CATCHUP_TICKS:
+                    if self.rewinding():
+                        self.rewind_step()
+                    else:
+                        self.step(self.take_input())
+                    accumulator -= SIM_DT
+                    ticks += 1
+                # Отставание больше лимита не догоняем, чтобы не уйти в "спираль смерти"
+                if accumulator >= SIM_DT:
+                    accumulator = 0.0
+                self.render_alpha = accumulator / SIM_DT
+
+            # Отрисовка
+            self.frame_time_ms = self.sim_time_ms(self.render_alpha)
+            self.sync_entities()
+            # Перенос положений из массивов считается частью отрисовки спрайтов
+            self.mark_phase('sprites')
+            if self.dirty_tracker:
+                if self.show_profiler:
+                    self.dirty_tracker.mark(self.phase_timer.overlay_rect(self.screen.get_size()))
+                rects = self.render_dirty()
+                if self.show_profiler:
+                    self.draw_profiler()
+                if rects:
+                    pygame.display.update(rects)
+            else:
+                self.draw_frame()
+                if self.show_profiler:
+                    self.draw_profiler()
+                # Время работы кадра без ожидания смены кадра при вертикальной синхронизации
+                if self.resolution and not (idle or self.in_menu):
+                    self.resolution.record(time.perf_counter() - frame_start)
+                pygame.display.flip()
+            self.mark_phase('display')
+            if timer:
+                timer.end_frame()
+
+        if self.profile_dump and isinstance(self.phase_timer, FrameProfiler):
+            self.phase_timer.export(self.profile_dump)
+        if self.preloader:
+            self.preloader.shutdown()
+        pygame.quit()
 
-            pygame.display.flip()
 
-        pygame.quit()
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Платформер на Python")
+    parser.add_argument('--headless', action='store_true',
+                        help="прогнать уровень без окна и вывести результат в JSON")
+    parser.add_argument('--level', type=int, default=1, help="номер уровня для --headless")
+    parser.add_argument('--seed', type=int,
+                        help="играть уровень, сгенерированный по зерну (см. level_generator), вместо --level")
+    parser.add_argument('--frames', type=int, default=3600, help="максимум кадров для --headless")
+    parser.add_argument('--script', default='',
+                        help="сценарий управления для --headless, например \"R*120 RJ R*60\"")
+    parser.add_argument('--step-ticks', type=int, default=1,
+                        help="для --headless: шагов симуляции в одном крупном шаге (быстрее, 4-8)")
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help="ограничение частоты отрисовки, 0 - без ограничения")
+    parser.add_argument('--vsync', action='store_true',
+                        help="синхронизировать кадры с обновлением монитора вместо --fps")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="понижать разрешение сцены, если кадры не укладываются в бюджет --fps")
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="обновлять в окне только изменившиеся области")
+    parser.add_argument('--entity-arrays', action='store_true',
+                        help="обновлять монетки и врагов пакетно в массивах NumPy")
+    parser.add_argument('--profile', action='store_true',
+                        help="замерять время фаз кадра и показать наложение (F3 - показать/скрыть)")
+    parser.add_argument('--profile-dump', metavar='FILE',
+                        help="при выходе сохранить замеры в CSV или JSON (по расширению)")
+    parser.add_argument('--rewind', action='store_true',
+                        help="хранить последние 10 секунд игры для перемотки назад (Backspace)")
+    parser.add_argument('--record', metavar='FILE',
+                        help="записать управление в файл для воспроизведения (см. replay.py)")
+    return parser.parse_args(argv)
 
 
 def main():
     """Точка входа в программу"""
-    game = Game()
-    game.run()
+    args = parse_args()
+    if args.headless:
+        game = Game(headless=True, entity_arrays=args.entity_arrays)
+    else:
+        game = Game(render_fps=args.fps, dirty_rects=args.dirty_rects, entity_arrays=args.entity_arrays,
+                    profile=args.profile, rewind=args.rewind, preload=True, vsync=args.vsync,
+                    adaptive=args.adaptive)
+        if args.profile_dump:
+            game.phase_timer = game.phase_timer or FrameProfiler()
+            game.profile_dump = args.profile_dump
+
+    if args.record:
+        from replay import InputRecorder
+        game.recorder = InputRecorder()
+
+    level: Union[int, LevelData] = args.level
+    if args.seed is not None:
+        from level_generator import GeneratedLevels
+        level = GeneratedLevels().load(args.seed)
+
+    if args.headless:
+        result = game.run_headless(level, parse_input_script(args.script), args.frames, args.step_ticks)
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        if isinstance(level, LevelData):
+            # Сгенерированный уровень запускается сразу, без меню
+            game.build_level(level)
+        game.run()
+
+    if args.record:
+        game.recorder.save(args.record)
 
 
 if __name__ == "__main__":
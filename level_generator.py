@@ -0,0 +1,587 @@
+"""
+Генератор уровней по зерну с проверкой достижимости по дуге прыжка игрока
+
+Пример: python level_generator.py 0-999 --width 3200
+        python level_generator.py 42 --print --number 3 > levels/level3.json
+"""
+
+import argparse
+import bisect
+import json
+import os
+import random
+import struct
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from levels import (COMPILED_DIR_NAME, COMPILED_EXT, LEVELS_DIR, THEMES, Color, EnemyData, LevelData,
+                    PlatformData, compile_level, decode_level, level_to_dict)
+
+# Экран и физика игрока, как в game.py (Player.jump, Player.update, Player.move_left/move_right)
+SCREEN_HEIGHT = 600
+GROUND_TOP = SCREEN_HEIGHT - 50
+PLAYER_WIDTH, PLAYER_HEIGHT = 35, 50
+JUMP_VELOCITY = -12
+GRAVITY = 0.5
+RUN_SPEED = 4
+# Размеры монетки и флага (Coin, FinishFlag) и размах подпрыгивания монетки (COIN_BOB_AMPLITUDE)
+COIN_SIZE = 25
+COIN_BOB = 3
+FLAG_WIDTH, FLAG_HEIGHT = 30, 50
+
+
+def flight_path(velocity: float) -> List[int]:
+    """Высота ног игрока относительно точки отрыва после каждого шага полета
+
+    Шаг как в Player.update: скорость растет на GRAVITY, а сдвиг - целая часть
+    скорости. Путь считается, пока игрок не опустится на высоту экрана.
+    """
+    path = []
+    y = 0
+    while y <= SCREEN_HEIGHT:
+        velocity += GRAVITY
+        y += int(velocity)
+        path.append(y)
+    return path
+
+
+JUMP_PATH = flight_path(JUMP_VELOCITY)
+# Наибольшая высота прыжка в пикселях
+MAX_RISE = -min(JUMP_PATH)
+
+
+def landing_ticks(path: Sequence[int]) -> List[int]:
+    """Шаг приземления для каждой разницы высот dy от -MAX_RISE до SCREEN_HEIGHT
+
+    Игрок встает на платформу, когда ноги проходят ее верх сверху вниз
+    (см. Game.sweep_platforms). Элемент dy + MAX_RISE - номер шага, на котором
+    это происходит для платформы на dy ниже точки отрыва, 0 - не происходит.
+    """
+    ticks = [0] * (MAX_RISE + SCREEN_HEIGHT + 1)
+    previous = 0
+    for tick, y in enumerate(path, 1):
+        for dy in range(max(previous, -MAX_RISE), min(y, SCREEN_HEIGHT + 1)):
+            if not ticks[dy + MAX_RISE]:
+                ticks[dy + MAX_RISE] = tick
+        previous = y
+    return ticks
+
+
+JUMP_LANDING = landing_ticks(JUMP_PATH)
+# Наибольшее расстояние по горизонтали, которое игрок пролетает за прыжок
+MAX_REACH = RUN_SPEED * max(JUMP_LANDING)
+
+# Прямоугольник (left, top, right, bottom)
+Box = Tuple[int, int, int, int]
+
+
+class ReachabilityGraph:
+    """Граф переходов между платформами по дуге прыжка игрока
+
+    Узел 0 - земля (игрок стоит на ней по всей ширине уровня), узлы 1..n -
+    платформы в порядке добавления. С любой платформы можно спуститься на
+    землю, поэтому достижимы те платформы, до которых есть путь от земли.
+
+    Переход A -> B проверяется без перебора кадров игры: по заранее
+    посчитанной таблице JUMP_LANDING известен шаг, на котором игрок пролетает
+    верх B, а значит и наибольшее расстояние, которое он успевает пробежать
+    в прыжке. Если по пути над прямой от A до B нет других платформ и B
+    не выше A, этого достаточно. Иначе (B выше: можно удариться головой
+    о ее низ, или мешают другие платформы) полет считается по шагам, как
+    в Game.check_collisions, для нескольких разбегов: с ближайшей к B точки
+    и с краев тени B, с движением сразу или после подъема выше B, а для
+    нижних платформ еще и шаг с края без прыжка. Такая проверка строже игры
+    (игрок может найти и другие пути), но найденный переход игра всегда
+    позволяет.
+    """
+
+    def __init__(self, platforms: Sequence[PlatformData] = (), world_width: int = 800):
+        self.world_width = world_width
+        self.boxes: List[Box] = [(0, GROUND_TOP, world_width, SCREEN_HEIGHT)]
+        # Платформы, отсортированные по левому краю (для выборки по x)
+        self._lefts: List[int] = []
+        self._order: List[int] = []
+        self._max_width = 0
+        for platform in platforms:
+            self.add(platform)
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def add(self, platform: PlatformData) -> int:
+        """Добавление платформы, возвращает ее узел"""
+        node = len(self.boxes)
+        box = (platform.x, platform.y, platform.x + platform.width, platform.y + platform.height)
+        self.boxes.append(box)
+        position = bisect.bisect_right(self._lefts, box[0])
+        self._lefts.insert(position, box[0])
+        self._order.insert(position, node)
+        self._max_width = max(self._max_width, platform.width)
+        return node
+
+    def pop(self) -> None:
+        """Удаление последней добавленной платформы"""
+        node = len(self.boxes) - 1
+        position = self._order.index(node)
+        del self._lefts[position], self._order[position]
+        self.boxes.pop()
+
+    def standing(self, node: int) -> Tuple[int, int]:
+        """Крайние положения левого края игрока, стоящего на узле"""
+        left, _, right, _ = self.boxes[node]
+        return max(0, left - PLAYER_WIDTH + 1), min(self.world_width - PLAYER_WIDTH, right - 1)
+
+    def near(self, left: int, right: int, top: int, bottom: int) -> List[int]:
+        """Платформы, пересекающие прямоугольник"""
+        boxes = self.boxes
+        first = bisect.bisect_left(self._lefts, left - self._max_width)
+        last = bisect.bisect_left(self._lefts, right)
+        return [node for node in self._order[first:last]
+                if boxes[node][2] > left and boxes[node][1] < bottom and boxes[node][3] > top]
+
+    def can_reach(self, a: int, b: int) -> bool:
+        """Может ли игрок, стоящий на узле a, допрыгнуть до платформы b"""
+        if b == 0 or a == b:
+            return False
+        boxes = self.boxes
+        top_a, top_b = boxes[a][1], boxes[b][1]
+        dy = top_b - top_a
+        if not -MAX_RISE <= dy <= SCREEN_HEIGHT or not JUMP_LANDING[dy + MAX_RISE]:
+            return False
+        reach = RUN_SPEED * JUMP_LANDING[dy + MAX_RISE]
+        lo_a, hi_a = self.standing(a)
+        lo_b, hi_b = self.standing(b)
+
+        if dy < 0:
+            targets = [(lo_b, hi_b)]
+        else:
+            # На нижнюю платформу нельзя опуститься из-под тени верхней
+            targets = [(lo, hi) for lo, hi in ((lo_b, min(hi_b, lo_a - 1)), (max(lo_b, hi_a + 1), hi_b))
+                       if lo <= hi]
+        for lo, hi in targets:
+            start = min(max(lo, lo_a), hi_a)
+            end = min(max(start, lo), hi)
+            if abs(end - start) > reach:
+                continue
+            if dy >= 0:
+                left, right = min(start, end), max(start, end) + PLAYER_WIDTH
+                obstacles = self.near(left, right, top_a - PLAYER_HEIGHT - MAX_RISE, top_b)
+                if all(node in (a, b) for node in obstacles):
+                    return True
+            if self._try_flights(a, b, lo, hi, start):
+                return True
+        return False
+
+    def _try_flights(self, a: int, b: int, lo: int, hi: int, nearest: int) -> bool:
+        """Полет по шагам с несколькими разбегами до участка lo..hi положений игрока на b"""
+        boxes = self.boxes
+        left_a, top_a, right_a, _ = boxes[a]
+        left_b, top_b, right_b, _ = boxes[b]
+        lo_a, hi_a = self.standing(a)
+        dy = top_b - top_a
+
+        starts = [nearest] + [x for x in (left_b - PLAYER_WIDTH, right_b) if lo_a <= x <= hi_a and x != nearest]
+        delays = [0]
+        if dy < 0:
+            # Движение к платформе после того, как ноги поднимутся до ее верха
+            delays.append(next(tick for tick, y in enumerate(JUMP_PATH, 1) if y <= dy))
+        left = min(starts + [lo, left_a]) - MAX_REACH
+        right = max(starts + [hi, right_a]) + PLAYER_WIDTH + MAX_REACH
+        obstacles = [node for node in self.near(left, right, top_a - PLAYER_HEIGHT - MAX_RISE, max(top_a, top_b) + 1)
+                     if node != 0]
+
+        for start in starts:
+            for delay in delays:
+                if self._fly(b, obstacles, start, top_a, JUMP_VELOCITY, delay, lo, hi):
+                    return True
+        if a != 0 and dy > 0:
+            # Шаг с края платформы без прыжка
+            start = right_a if lo > hi_a else left_a - PLAYER_WIDTH
+            if 0 <= start <= self.world_width - PLAYER_WIDTH:
+                return self._fly(b, obstacles, start, top_a, 0.0, 0, lo, hi)
+        return False
+
+    def _fly(self, b: int, obstacles: Sequence[int], x: int, feet: int, velocity: float,
+             delay: int, lo: int, hi: int) -> bool:
+        """Полет игрока по шагам (движение к lo..hi после delay шагов); True - приземлился на b"""
+        boxes = self.boxes
+        top_b = boxes[b][1]
+        max_x = self.world_width - PLAYER_WIDTH
+        for tick in range(len(JUMP_PATH)):
+            if tick >= delay and not lo <= x <= hi:
+                x = min(max(x + (RUN_SPEED if x < lo else -RUN_SPEED), 0), max_x)
+            velocity += GRAVITY
+            last = feet
+            feet += int(velocity)
+            over = [node for node in obstacles if boxes[node][0] < x + PLAYER_WIDTH and boxes[node][2] > x]
+
+            # Непрерывная проверка, как в Game.sweep_platforms
+            if feet < last:
+                ceilings = [boxes[node][3] for node in over
+                            if feet - PLAYER_HEIGHT < boxes[node][3] <= last - PLAYER_HEIGHT]
+                if ceilings:
+                    feet = max(ceilings) + PLAYER_HEIGHT
+                    velocity = 0
+            elif feet > last:
+                floors = [node for node in over if last <= boxes[node][1] < feet]
+                if floors:
+                    return min(floors, key=lambda node: boxes[node][1]) == b
+
+            # Проверка перекрытий, как в Game.check_collisions
+            for node in over:
+                _, top, _, bottom = boxes[node]
+                if feet > top and feet - PLAYER_HEIGHT < bottom:
+                    if velocity > 0 and feet - PLAYER_HEIGHT < top:
+                        return node == b
+                    if velocity < 0 and feet > bottom:
+                        feet = bottom + PLAYER_HEIGHT
+                        velocity = 0
+
+            if feet >= GROUND_TOP or (velocity > 0 and feet - PLAYER_HEIGHT >= top_b):
+                return False
+        return False
+
+    def reachable(self, start: int = 0) -> Set[int]:
+        """Узлы, достижимые от start (обход в ширину; переходы к уже найденным узлам не проверяются)"""
+        found = {start, 0}
+        # С любого узла можно спуститься на землю
+        queue = [start] if start == 0 else [start, 0]
+        boxes = self.boxes
+        for node in queue:
+            lo, hi = self.standing(node)
+            top = boxes[node][1]
+            candidates = self.near(lo - MAX_REACH, hi + PLAYER_WIDTH + MAX_REACH,
+                                   top - MAX_RISE, SCREEN_HEIGHT)
+            for other in candidates:
+                if other not in found and self.can_reach(node, other):
+                    found.add(other)
+                    queue.append(other)
+        return found
+
+    def node_at(self, x: int, y: int) -> int:
+        """Узел, на который встанет игрок с центром в (x, y)"""
+        left = x - PLAYER_WIDTH // 2
+        feet = y + PLAYER_HEIGHT // 2
+        below = [node for node in self.near(left, left + PLAYER_WIDTH, feet, SCREEN_HEIGHT)
+                 if self.boxes[node][1] >= feet]
+        return min(below, key=lambda node: self.boxes[node][1], default=0)
+
+    def collectible(self, box: Box, nodes: Sequence[int]) -> bool:
+        """Может ли игрок коснуться прямоугольника, стоя на одном из узлов или подпрыгнув с него
+
+        Касания в полете между платформами не учитываются, а подпрыгнуть
+        нельзя, если над игроком есть другая платформа.
+        """
+        left, top, right, bottom = box
+        boxes = self.boxes
+        for node in nodes:
+            lo, hi = self.standing(node)
+            ground = boxes[node][1]
+            lo, hi = max(lo, left - PLAYER_WIDTH + 1), min(hi, right - 1)
+            if lo > hi or not ground - PLAYER_HEIGHT - MAX_RISE < bottom or not top < ground:
+                continue
+            if bottom > ground - PLAYER_HEIGHT:
+                return True
+            if not self.near(lo, hi + PLAYER_WIDTH, bottom, ground - PLAYER_HEIGHT):
+                return True
+        return False
+
+
+def coin_box(position: Tuple[int, int]) -> Box:
+    """Область, которую монетка занимает при любой фазе подпрыгивания
+
+    В игре центр монетки ставится в (x, y) только при создании, а затем
+    Coin.update ставит ее верх в y + смещение от -COIN_BOB до COIN_BOB.
+    """
+    x, y = position
+    left = x - COIN_SIZE // 2
+    return (left, y + COIN_BOB, left + COIN_SIZE, y - COIN_BOB + COIN_SIZE)
+
+
+def flag_box(flag: Tuple[int, int, Color]) -> Box:
+    x, y, _ = flag
+    return (x - FLAG_WIDTH // 2, y - FLAG_HEIGHT, x - FLAG_WIDTH // 2 + FLAG_WIDTH, y)
+
+
+class LevelCheck(NamedTuple):
+    """Результат проверки уровня"""
+    reachable: List[int]           # индексы достижимых платформ (в level.platforms)
+    flag_reachable: bool
+    unreachable_coins: List[int]   # индексы монеток, до которых не добраться
+
+    @property
+    def ok(self) -> bool:
+        return self.flag_reachable and not self.unreachable_coins
+
+
+def check_level(level: LevelData) -> LevelCheck:
+    """Проверка, что до флага и всех монеток можно добраться от начальной позиции"""
+    graph = ReachabilityGraph(level.platforms, level.width)
+    nodes = sorted(graph.reachable(graph.node_at(*level.player_start)))
+    return LevelCheck(
+        reachable=[node - 1 for node in nodes if node],
+        flag_reachable=graph.collectible(flag_box(level.flag), nodes),
+        unreachable_coins=[index for index, position in enumerate(level.coins)
+                           if not graph.collectible(coin_box(position), nodes)],
+    )
+
+
+class ThemePalette(NamedTuple):
+    """Цвета сгенерированного уровня для темы"""
+    ground: Color
+    grass: Color
+    platform: Color
+    border: Color
+    enemy: Color
+    flag: Color
+
+
+# Цвета как у уровней 1 (день) и 2 (ночь)
+PALETTES = {
+    'day': ThemePalette((139, 69, 19), (0, 255, 0), (128, 128, 128), (139, 69, 19), (255, 0, 0), (128, 0, 128)),
+    'night': ThemePalette((139, 0, 0), (0, 100, 0), (0, 0, 139), (0, 120, 255), (255, 165, 0), (255, 215, 0)),
+}
+
+# Параметры генератора; при изменении алгоритма увеличивается версия (сбрасывает кэш)
+GENERATOR_VERSION = 2
+GENERATED_WIDTH = 3200
+PLAYER_START = (100, SCREEN_HEIGHT - 100)
+PLATFORM_HEIGHT = 20
+MIN_PLATFORM_WIDTH, MAX_PLATFORM_WIDTH = 90, 220
+# Верх платформ: не выше MIN_TOP и так, чтобы под платформой проходил игрок
+MIN_TOP, MAX_TOP = 130, GROUND_TOP - PLAYER_HEIGHT - PLATFORM_HEIGHT - 20
+MIN_GAP = 40
+END_MARGIN = 100
+PLACEMENT_ATTEMPTS = 12
+# Вероятности: дополнительная платформа над основной, враг на широкой платформе,
+# монетка на месте ряда и монетка в прыжке над платформой
+BONUS_CHANCE = 0.3
+ENEMY_CHANCE = 0.4
+ENEMY_MIN_PLATFORM_WIDTH = 140
+COIN_CHANCE = 0.6
+COIN_SPACING = 45
+HIGH_COIN_CHANCE = 0.3
+
+
+def _overlaps(platform: PlatformData, platforms: Sequence[PlatformData]) -> bool:
+    """Пересекается ли платформа с другими с запасом на рост игрока"""
+    for other in platforms:
+        if (platform.x < other.x + other.width + PLAYER_WIDTH and other.x < platform.x + platform.width + PLAYER_WIDTH
+                and platform.y < other.y + other.height + PLAYER_HEIGHT + 10
+                and other.y < platform.y + platform.height + PLAYER_HEIGHT + 10):
+            return True
+    return False
+
+
+def generate_level(seed: int, width: int = GENERATED_WIDTH, number: int = 0) -> LevelData:
+    """Уровень по зерну: одинаковые seed и width всегда дают один и тот же уровень
+
+    Основные платформы идут слева направо, каждая следующая достижима
+    с предыдущей (ReachabilityGraph.can_reach); над некоторыми есть
+    дополнительные. Флаг стоит на последней основной платформе. В конце
+    недостижимые платформы и монетки убираются, так что check_level
+    для результата всегда успешна.
+    """
+    rng = random.Random(seed)
+    theme = rng.choice(THEMES)
+    palette = PALETTES[theme]
+    graph = ReachabilityGraph(world_width=width)
+    platforms: List[PlatformData] = []
+    path: List[int] = []
+
+    def place(candidate: PlatformData, *sources: int) -> Optional[int]:
+        if candidate.y < MIN_TOP or candidate.y > MAX_TOP or _overlaps(candidate, platforms):
+            return None
+        node = graph.add(candidate)
+        if all(graph.can_reach(source, node) for source in sources):
+            platforms.append(candidate)
+            return node
+        graph.pop()
+        return None
+
+    previous, right = 0, PLAYER_START[0] + 50
+    while True:
+        node = None
+        for _ in range(PLACEMENT_ATTEMPTS):
+            platform_width = rng.randrange(MIN_PLATFORM_WIDTH, MAX_PLATFORM_WIDTH + 1, 10)
+            top_previous = graph.boxes[previous][1]
+            top = min(max(top_previous + rng.randint(-MAX_RISE + 20, 120), MIN_TOP), MAX_TOP)
+            reach = RUN_SPEED * JUMP_LANDING[top - top_previous + MAX_RISE]
+            left = right + rng.randint(MIN_GAP, max(MIN_GAP, reach * 3 // 4 + PLAYER_WIDTH))
+            if left + platform_width > width - END_MARGIN:
+                break
+            node = place(PlatformData(left, top, platform_width, PLATFORM_HEIGHT, palette.platform, palette.border),
+                         previous)
+            if node is not None:
+                break
+        if node is None:
+            break
+        path.append(node)
+        previous, right = node, graph.boxes[node][2]
+
+        if rng.random() < BONUS_CHANCE:
+            base_left, base_top, base_right, _ = graph.boxes[node]
+            bonus_width = rng.randrange(MIN_PLATFORM_WIDTH, MAX_PLATFORM_WIDTH + 1, 10)
+            bonus = PlatformData(rng.randint(base_left - bonus_width, base_right),
+                                 base_top - rng.randint(PLAYER_HEIGHT + PLATFORM_HEIGHT + 40, MAX_RISE + 40),
+                                 bonus_width, PLATFORM_HEIGHT, palette.platform, palette.border)
+            if place(bonus, node) is not None and len(path) > 1 and not graph.can_reach(path[-2], node):
+                # Дополнительная платформа не должна закрывать путь к основной
+                graph.pop()
+                platforms.pop()
+
+    # Финиш на последней основной платформе (или на земле, если платформ нет)
+    if path:
+        left, top, right, _ = graph.boxes[path[-1]]
+        flag = ((left + right) // 2, top, palette.flag)
+    else:
+        flag = (width - END_MARGIN, GROUND_TOP, palette.flag)
+
+    # Недостижимые платформы убираются (это не делает другие недостижимыми)
+    reachable = graph.reachable(graph.node_at(*PLAYER_START))
+    kept = [node for node in range(1, len(graph)) if node in reachable]
+    index = {node: position for position, node in enumerate(kept)}
+    platforms = [platforms[node - 1] for node in kept]
+
+    # Монетки рядами над платформами и землей и иногда выше, в прыжке
+    coins = []
+    for x in range(PLAYER_START[0] + 100, width - END_MARGIN, COIN_SPACING * 3):
+        if rng.random() < COIN_CHANCE / 2:
+            coins.append((x, GROUND_TOP - 30))
+    for platform in platforms:
+        for x in range(platform.x + 20, platform.x + platform.width - 10, COIN_SPACING):
+            if rng.random() < COIN_CHANCE:
+                coins.append((x, platform.y - 30))
+        if rng.random() < HIGH_COIN_CHANCE:
+            coins.append((platform.x + platform.width // 2, platform.y - 30 - rng.randint(40, MAX_RISE - 20)))
+
+    enemies = []
+    for node in path[1:-1]:
+        platform = platforms[index[node]] if node in index else None
+        if platform and platform.width >= ENEMY_MIN_PLATFORM_WIDTH and rng.random() < ENEMY_CHANCE:
+            enemies.append(EnemyData(index[node], rng.choice((2, 3)), None, palette.enemy))
+
+    level = LevelData(
+        number=number,
+        theme=theme,
+        player_start=PLAYER_START,
+        ground=PlatformData(0, GROUND_TOP, width, SCREEN_HEIGHT - GROUND_TOP, palette.ground, palette.grass),
+        platforms=platforms,
+        coins=coins,
+        enemies=enemies,
+        flag=flag,
+        width=width,
+    )
+    check = check_level(level)
+    if not check.ok:
+        missing = set(check.unreachable_coins)
+        level = level._replace(coins=[coin for i, coin in enumerate(coins) if i not in missing])
+        if not check.flag_reachable:
+            # Сюда генератор не попадает: путь к последней платформе проверен при ее добавлении
+            raise RuntimeError(f"Флаг уровня с зерном {seed} недостижим")
+    return level
+
+
+# Папка кэша сгенерированных уровней (рядом со скомпилированными уровнями)
+GENERATED_DIR = os.path.join(LEVELS_DIR, COMPILED_DIR_NAME, 'generated')
+
+
+class GeneratedLevels:
+    """Сгенерированные уровни с кэшем в памяти и на диске
+
+    Уровень хранится в двоичном формате levels.compile_level в файле, имя
+    которого включает версию генератора, ширину и зерно, поэтому повторная
+    загрузка не запускает генератор и проверку заново.
+    """
+
+    def __init__(self, cache_dir: str = GENERATED_DIR):
+        self.cache_dir = cache_dir
+        self._loaded: Dict[Tuple[int, int], LevelData] = {}
+        self.generated = 0
+
+    def path(self, seed: int, width: int = GENERATED_WIDTH) -> str:
+        return os.path.join(self.cache_dir, f"gen{GENERATOR_VERSION}-{width}-{seed}{COMPILED_EXT}")
+
+    def load(self, seed: int, width: int = GENERATED_WIDTH) -> LevelData:
+        """Уровень по зерну: из памяти, из файла кэша или от генератора"""
+        key = (seed, width)
+        level = self._loaded.get(key)
+        if level is None:
+            level = self._load_from_disk(seed, width)
+            self._loaded[key] = level
+        return level
+
+    def _load_from_disk(self, seed: int, width: int) -> LevelData:
+        path = self.path(seed, width)
+        try:
+            with open(path, 'rb') as file:
+                return decode_level(file.read())
+        except (OSError, ValueError, struct.error):
+            pass
+
+        level = generate_level(seed, width)
+        self.generated += 1
+        # Кэш на диске - оптимизация: если записать не удалось, просто работаем без него
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(compile_level(level))
+        except OSError:
+            pass
+        return level
+
+    def forget(self) -> None:
+        """Сброс кэша в памяти"""
+        self._loaded.clear()
+
+
+def parse_seeds(text: str) -> range:
+    """Зерна вида "42" или "0-999" """
+    first, _, last = text.partition('-')
+    return range(int(first), int(last or first) + 1)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Генератор уровней по зерну")
+    parser.add_argument('seeds', type=parse_seeds, help="зерно или диапазон зерен, например 0-999")
+    parser.add_argument('--width', type=int, default=GENERATED_WIDTH, help="ширина уровня в пикселях")
+    parser.add_argument('--cache-dir', default=GENERATED_DIR, help="папка кэша уровней")
+    parser.add_argument('--no-cache', action='store_true', help="генерировать заново, без кэша на диске")
+    parser.add_argument('--print', action='store_true', help="вывести уровни в формате JSON-файла уровня")
+    parser.add_argument('--number', type=int, default=0, help="номер уровня в выводе --print")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Точка входа: генерация и проверка уровней, сводка в JSON"""
+    args = parse_args()
+    levels = GeneratedLevels(args.cache_dir)
+    started = time.perf_counter()
+    failed = []
+    platforms = coins = 0
+    for seed in args.seeds:
+        level = generate_level(seed, args.width) if args.no_cache else levels.load(seed, args.width)
+        if not check_level(level).ok:
+            failed.append(seed)
+        platforms += len(level.platforms)
+        coins += len(level.coins)
+        if args.print:
+            print(json.dumps(level_to_dict(level._replace(number=args.number)), ensure_ascii=False))
+    elapsed = time.perf_counter() - started
+
+    count = len(args.seeds)
+    summary = {
+        "levels": count,
+        "generated": count if args.no_cache else levels.generated,
+        "failed": failed,
+        "platforms_per_level": platforms / count if count else 0.0,
+        "coins_per_level": coins / count if count else 0.0,
+        "levels_per_minute": count / elapsed * 60 if elapsed else 0.0,
+    }
+    if not args.print:
+        print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
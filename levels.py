@@ -0,0 +1,247 @@
+"""
+Формат уровней: JSON для редактирования и компактный двоичный вид для загрузки
+"""
+
+import json
+import os
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+Color = Tuple[int, int, int]
+
+# Папка с уровнями рядом с игрой и папка для скомпилированных уровней
+LEVELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels')
+COMPILED_DIR_NAME = 'compiled'
+COMPILED_EXT = '.lvl'
+
+THEMES = ('day', 'night')
+# Ширина уровня по умолчанию - один экран
+DEFAULT_WIDTH = 800
+
+# Двоичный формат (little-endian):
+#   заголовок:  сигнатура, версия, номер уровня, тема, ширина уровня
+#   игрок:      x, y
+#   земля:      x, y, ширина, высота, цвет земли, цвет травы
+#   флаг:       x, y, цвет
+#   количества: платформ, монеток, врагов
+#   далее записи платформ, монеток и врагов подряд
+MAGIC = b'PLVL'
+VERSION = 2
+_HEADER = struct.Struct('<4sBHBI')
+_POINT = struct.Struct('<ii')
+_BOX = struct.Struct('<iiii3B3B')
+_FLAG = struct.Struct('<ii3B')
+_COUNTS = struct.Struct('<III')
+_ENEMY = struct.Struct('<iiBii3B')
+
+
+class PlatformData(NamedTuple):
+    """Платформа или земля: положение, размер и цвета"""
+    x: int
+    y: int
+    width: int
+    height: int
+    color: Color
+    border_color: Color
+
+
+class EnemyData(NamedTuple):
+    """Враг: индекс платформы, скорость, границы патрулирования и цвет"""
+    platform: int
+    speed: int
+    bounds: Optional[Tuple[int, int]]
+    color: Color
+
+
+class LevelData(NamedTuple):
+    """Описание уровня, из которого игра создает спрайты"""
+    number: int
+    theme: str
+    player_start: Tuple[int, int]
+    ground: PlatformData
+    platforms: List[PlatformData]
+    coins: List[Tuple[int, int]]
+    enemies: List[EnemyData]
+    flag: Tuple[int, int, Color]
+    width: int = DEFAULT_WIDTH
+
+
+def _color(value) -> Color:
+    r, g, b = value
+    return (int(r), int(g), int(b))
+
+
+def _box(data: dict) -> PlatformData:
+    return PlatformData(int(data['x']), int(data['y']), int(data['width']), int(data['height']),
+                        _color(data['color']), _color(data['border_color']))
+
+
+def parse_level(data: dict) -> LevelData:
+    """Разбор уровня из словаря (формат JSON-файла уровня)"""
+    theme = data.get('theme', 'day')
+    if theme not in THEMES:
+        raise ValueError(f"Неизвестная тема уровня: {theme!r}")
+
+    platforms = [_box(item) for item in data.get('platforms', [])]
+    enemies = []
+    for item in data.get('enemies', []):
+        index = int(item['platform'])
+        if not 0 <= index < len(platforms):
+            raise ValueError(f"Враг ссылается на несуществующую платформу {index}")
+        bounds = item.get('bounds')
+        enemies.append(EnemyData(index, int(item.get('speed', 2)),
+                                 (int(bounds[0]), int(bounds[1])) if bounds else None,
+                                 _color(item['color'])))
+
+    flag = data['flag']
+    start = data['player_start']
+    return LevelData(
+        number=int(data['number']),
+        theme=theme,
+        player_start=(int(start[0]), int(start[1])),
+        ground=_box(data['ground']),
+        platforms=platforms,
+        coins=[(int(x), int(y)) for x, y in data.get('coins', [])],
+        enemies=enemies,
+        flag=(int(flag['x']), int(flag['y']), _color(flag['color'])),
+        width=int(data.get('width', DEFAULT_WIDTH)),
+    )
+
+
+def level_to_dict(level: LevelData) -> dict:
+    """Обратное преобразование уровня в словарь для записи в JSON"""
+    def box(item: PlatformData) -> dict:
+        return {'x': item.x, 'y': item.y, 'width': item.width, 'height': item.height,
+                'color': list(item.color), 'border_color': list(item.border_color)}
+
+    enemies = []
+    for enemy in level.enemies:
+        entry = {'platform': enemy.platform, 'speed': enemy.speed, 'color': list(enemy.color)}
+        if enemy.bounds:
+            entry['bounds'] = list(enemy.bounds)
+        enemies.append(entry)
+
+    x, y, color = level.flag
+    return {
+        'number': level.number,
+        'theme': level.theme,
+        'width': level.width,
+        'player_start': list(level.player_start),
+        'ground': box(level.ground),
+        'platforms': [box(item) for item in level.platforms],
+        'coins': [list(position) for position in level.coins],
+        'enemies': enemies,
+        'flag': {'x': x, 'y': y, 'color': list(color)},
+    }
+
+
+def compile_level(level: LevelData) -> bytes:
+    """Упаковка уровня в двоичный вид"""
+    parts = [
+        _HEADER.pack(MAGIC, VERSION, level.number, THEMES.index(level.theme), level.width),
+        _POINT.pack(*level.player_start),
+        _BOX.pack(*level.ground[:4], *level.ground.color, *level.ground.border_color),
+    ]
+    flag_x, flag_y, flag_color = level.flag
+    parts.append(_FLAG.pack(flag_x, flag_y, *flag_color))
+    parts.append(_COUNTS.pack(len(level.platforms), len(level.coins), len(level.enemies)))
+    for item in level.platforms:
+        parts.append(_BOX.pack(*item[:4], *item.color, *item.border_color))
+    for position in level.coins:
+        parts.append(_POINT.pack(*position))
+    for enemy in level.enemies:
+        left, right = enemy.bounds or (0, 0)
+        parts.append(_ENEMY.pack(enemy.platform, enemy.speed, enemy.bounds is not None,
+                                 left, right, *enemy.color))
+    return b''.join(parts)
+
+
+def decode_level(data: bytes) -> LevelData:
+    """Распаковка уровня из двоичного вида"""
+    magic, version, number, theme, width = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Неподдерживаемый формат скомпилированного уровня")
+    offset = _HEADER.size
+
+    def read(record: struct.Struct) -> tuple:
+        nonlocal offset
+        values = record.unpack_from(data, offset)
+        offset += record.size
+        return values
+
+    def read_box() -> PlatformData:
+        values = read(_BOX)
+        return PlatformData(*values[:4], tuple(values[4:7]), tuple(values[7:10]))
+
+    player_start = read(_POINT)
+    ground = read_box()
+    flag_values = read(_FLAG)
+    platform_count, coin_count, enemy_count = read(_COUNTS)
+    platforms = [read_box() for _ in range(platform_count)]
+    coins = [read(_POINT) for _ in range(coin_count)]
+    enemies = []
+    for _ in range(enemy_count):
+        index, speed, has_bounds, left, right, *color = read(_ENEMY)
+        enemies.append(EnemyData(index, speed, (left, right) if has_bounds else None, tuple(color)))
+
+    return LevelData(number, THEMES[theme], player_start, ground, platforms, coins, enemies,
+                     (flag_values[0], flag_values[1], tuple(flag_values[2:5])), width)
+
+
+class LevelLoader:
+    """Загрузчик уровней с кэшем в памяти и на диске
+
+    Уровень ищется как <name>.json в папке уровней. Скомпилированная версия
+    хранится в подпапке compiled и пересобирается, только если JSON новее.
+    Загруженные уровни остаются в памяти, поэтому повторная загрузка
+    (перезапуск, смена уровня) не обращается к диску.
+    """
+
+    def __init__(self, levels_dir: str = LEVELS_DIR, cache_dir: Optional[str] = None):
+        self.levels_dir = levels_dir
+        self.cache_dir = cache_dir or os.path.join(levels_dir, COMPILED_DIR_NAME)
+        self._loaded: Dict[str, LevelData] = {}
+
+    def source_path(self, name: str) -> str:
+        return os.path.join(self.levels_dir, name + '.json')
+
+    def compiled_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, name + COMPILED_EXT)
+
+    def load(self, name: str) -> LevelData:
+        """Загрузка уровня по имени файла без расширения"""
+        level = self._loaded.get(name)
+        if level is None:
+            level = self._load_from_disk(name)
+            self._loaded[name] = level
+        return level
+
+    def _load_from_disk(self, name: str) -> LevelData:
+        source = self.source_path(name)
+        compiled = self.compiled_path(name)
+
+        try:
+            if os.path.getmtime(compiled) >= os.path.getmtime(source):
+                with open(compiled, 'rb') as file:
+                    return decode_level(file.read())
+        except (OSError, ValueError, struct.error):
+            pass
+
+        with open(source, encoding='utf-8') as file:
+            level = parse_level(json.load(file))
+
+        # Кэш на диске - оптимизация: если записать не удалось, просто работаем без него
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(compiled, 'wb') as file:
+                file.write(compile_level(level))
+        except OSError:
+            pass
+        return level
+
+    def forget(self, name: Optional[str] = None) -> None:
+        """Сброс кэша в памяти (для одного уровня или для всех)"""
+        if name is None:
+            self._loaded.clear()
+        else:
+            self._loaded.pop(name, None)
@@ -0,0 +1,202 @@
+"""
+Частицы эффектов (искры монеток, брызги при уроне, конфетти) в массивах NumPy
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pygame
+
+from render_cache import optimize_surface
+
+try:
+    import numpy as np
+except ImportError:  # NumPy - необязательная зависимость
+    np = None
+
+PARTICLES_AVAILABLE = np is not None
+
+# Емкость пула частиц по умолчанию
+DEFAULT_CAPACITY = 32768
+# Наибольший размер частицы в пикселях (частица - квадрат)
+MAX_PARTICLE_SIZE = 4
+
+
+class ParticleSystem:
+    """Пул частиц фиксированной емкости в непрерывных массивах
+
+    Живые частицы занимают первые count элементов массивов положения,
+    скорости, оставшейся и полной жизни (в шагах симуляции), цвета
+    (номер в палитре) и размера. Шаг (step) - несколько векторных операций
+    сразу на все частицы, умершие частицы убираются сжатием массивов.
+    Если пул заполнен, новые частицы не создаются.
+
+    Частица рисуется квадратом, который уменьшается к концу жизни. На 16-
+    и 32-битных поверхностях квадраты пишутся прямо в массив пикселей
+    (pygame.surfarray) одной операцией на размер и смещение, на остальных
+    копируются заранее отрисованные поверхности по цвету и размеру.
+    Частица, не помещающаяся в область отсечения целиком, не рисуется.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, gravity: float = 0.25, seed: Optional[int] = None):
+        if np is None:
+            raise RuntimeError("Для частиц нужен NumPy (pip install numpy)")
+        self.capacity = capacity
+        self.gravity = gravity
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.max_life = np.ones(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self._arrays = (self.x, self.y, self.vx, self.vy, self.life, self.max_life, self.color, self.size)
+        self.rng = np.random.default_rng(seed)
+        # Палитра частиц (до 256 цветов) и она же в формате пикселей поверхностей
+        self.palette: List[Tuple[int, int, int]] = []
+        self._color_index: Dict[Tuple[int, int, int], int] = {}
+        self._mapped: Dict[tuple, object] = {}
+        self._surfaces: Dict[Tuple[int, int], pygame.Surface] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def color_index(self, color: Tuple[int, int, int]) -> int:
+        """Номер цвета в палитре (новый цвет добавляется)"""
+        color = tuple(color[:3])
+        index = self._color_index.get(color)
+        if index is None:
+            if len(self.palette) >= 256:
+                raise ValueError("В палитре частиц не больше 256 цветов")
+            index = self._color_index[color] = len(self.palette)
+            self.palette.append(color)
+            self._mapped.clear()
+        return index
+
+    def emit(self, x: float, y: float, count: int, speed: float, life: int,
+             colors: Sequence[Tuple[int, int, int]], angle: float = -math.pi / 2, spread: float = 2 * math.pi,
+             size: int = 3, width: float = 0.0, height: float = 0.0) -> int:
+        """Выпуск count частиц из прямоугольника width x height с центром (x, y)
+
+        Направления равномерно распределены в секторе spread вокруг angle
+        (в радианах, вверх - -pi/2), скорость - от speed/2 до speed пикселей
+        за шаг, жизнь - от life/2 до life шагов, цвет - случайный из colors.
+        Возвращает число созданных частиц.
+        """
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return 0
+        rng = self.rng
+        part = slice(self.count, self.count + count)
+        direction = angle + (rng.random(count, dtype=np.float32) - 0.5) * spread
+        velocity = speed * (0.5 + 0.5 * rng.random(count, dtype=np.float32))
+        self.x[part] = x + (rng.random(count, dtype=np.float32) - 0.5) * width
+        self.y[part] = y + (rng.random(count, dtype=np.float32) - 0.5) * height
+        self.vx[part] = np.cos(direction) * velocity
+        self.vy[part] = np.sin(direction) * velocity
+        lifetimes = rng.integers(max(1, life // 2), life + 1, count)
+        self.life[part] = lifetimes
+        self.max_life[part] = lifetimes
+        indexes = np.array([self.color_index(color) for color in colors], dtype=np.uint8)
+        self.color[part] = indexes[rng.integers(0, len(indexes), count)]
+        self.size[part] = min(size, MAX_PARTICLE_SIZE)
+        self.count += count
+        return count
+
+    def step(self, ticks: int = 1) -> None:
+        """Движение всех частиц на ticks шагов симуляции
+
+        Скорость по y растет на gravity за шаг, и частица сдвигается уже на новую
+        скорость (как игрок, см. Player.update), поэтому ticks шагов считаются сразу.
+        """
+        count = self.count
+        if not count:
+            return
+        vy = self.vy[:count]
+        self.x[:count] += self.vx[:count] * ticks
+        self.y[:count] += vy * ticks + self.gravity * ticks * (ticks + 1) / 2
+        vy += self.gravity * ticks
+        life = self.life[:count]
+        life -= ticks
+
+        alive = life > 0
+        if alive.all():
+            return
+        keep = np.flatnonzero(alive)
+        for values in self._arrays:
+            values[:len(keep)] = values[:count][keep]
+        self.count = len(keep)
+
+    def clear(self) -> None:
+        """Удаление всех частиц"""
+        self.count = 0
+
+    def _screen_state(self, offset_x: int, offset_y: int) -> Tuple[object, object, object]:
+        """Целые координаты левого верхнего угла и текущие размеры живых частиц"""
+        count = self.count
+        # Размер уменьшается к концу жизни, но не меньше пикселя
+        size = -(-self.size[:count] * self.life[:count] // self.max_life[:count])
+        x = (self.x[:count] - offset_x).astype(np.int32) - size // 2
+        y = (self.y[:count] - offset_y).astype(np.int32) - size // 2
+        return x, y, size
+
+    def bounds(self, offset_x: int = 0, offset_y: int = 0) -> Optional[pygame.Rect]:
+        """Область, занятая живыми частицами (для перерисовки по грязным областям)"""
+        if not self.count:
+            return None
+        x, y, size = self._screen_state(offset_x, offset_y)
+        left, top = int(x.min()), int(y.min())
+        return pygame.Rect(left, top, int((x + size).max()) - left, int((y + size).max()) - top)
+
+    def draw(self, target: pygame.Surface, offset_x: int = 0, offset_y: int = 0) -> None:
+        """Отрисовка живых частиц со смещением (например, камеры)"""
+        if not self.count:
+            return
+        x, y, size = self._screen_state(offset_x, offset_y)
+        clip = target.get_clip()
+        inside = np.flatnonzero((x >= clip.left) & (y >= clip.top)
+                                & (x + size <= clip.right) & (y + size <= clip.bottom))
+        if not len(inside):
+            return
+        x, y, size, color = x[inside], y[inside], size[inside], self.color[:self.count][inside]
+
+        if target.get_bytesize() not in (2, 4):
+            self._draw_surfaces(target, x, y, size, color)
+            return
+        mapped = self._mapped_palette(target)
+        pixels = pygame.surfarray.pixels2d(target)
+        try:
+            for side in range(1, MAX_PARTICLE_SIZE + 1):
+                group = np.flatnonzero(size == side)
+                if not len(group):
+                    continue
+                gx, gy, values = x[group], y[group], mapped[color[group]]
+                for dx in range(side):
+                    for dy in range(side):
+                        pixels[gx + dx, gy + dy] = values
+        finally:
+            del pixels
+
+    def _mapped_palette(self, target: pygame.Surface):
+        """Цвета палитры в формате пикселей поверхности target"""
+        key = (target.get_bitsize(), target.get_masks(), target.get_shifts())
+        mapped = self._mapped.get(key)
+        if mapped is None:
+            dtype = np.uint32 if target.get_bytesize() == 4 else np.uint16
+            mapped = self._mapped[key] = np.array([target.map_rgb(color) for color in self.palette], dtype=dtype)
+        return mapped
+
+    def _draw_surfaces(self, target: pygame.Surface, x, y, size, color) -> None:
+        """Отрисовка копированием поверхностей по цвету и размеру"""
+        surfaces = self._surfaces
+        blits = []
+        for left, top, side, index in zip(x.tolist(), y.tolist(), size.tolist(), color.tolist()):
+            surface = surfaces.get((index, side))
+            if surface is None:
+                surface = pygame.Surface((side, side))
+                surface.fill(self.palette[index])
+                surface = surfaces[(index, side)] = optimize_surface(surface)
+            blits.append((surface, (left, top)))
+        target.blits(blits, doreturn=False)
@@ -0,0 +1,55 @@
+"""
+Подготовка уровней в фоновом потоке, пока игрок в меню или на другом уровне
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class Preloader:
+    """Фоновая подготовка объектов по ключу (например, уровней по номеру)
+
+    prepare(key) выполняется в одном рабочем потоке. Готовый результат
+    забирается take(key) один раз: подготовленный уровень изменяется во
+    время игры, поэтому для повторного запуска его нужно запросить снова.
+    Результаты, которые так и не забрали до shutdown, передаются в release,
+    например чтобы вернуть спрайты в пулы.
+    """
+
+    def __init__(self, prepare: Callable[[Hashable], Any], release: Optional[Callable[[Any], None]] = None):
+        self.prepare = prepare
+        self.release = release
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='preload')
+        self._futures: Dict[Hashable, Future] = {}
+
+    def request(self, key: Hashable) -> None:
+        """Поставить подготовку в очередь, если она еще не запрошена"""
+        if key not in self._futures:
+            self._futures[key] = self._executor.submit(self.prepare, key)
+
+    def take(self, key: Hashable) -> Optional[Any]:
+        """Готовый результат (с ожиданием, если подготовка уже идет)
+
+        None - подготовка не запрашивалась или завершилась ошибкой; тогда
+        вызывающий код готовит объект сам и получает ошибку как обычно.
+        """
+        future = self._futures.pop(key, None)
+        if future is None or future.cancelled():
+            return None
+        try:
+            return future.result()
+        except Exception:
+            return None
+
+    def shutdown(self) -> None:
+        """Отмена ожидающих подготовок, остановка потока и освобождение готовых результатов"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        futures = list(self._futures.values())
+        self._futures.clear()
+        for future in futures:
+            self._release(future)
+
+    def _release(self, future: Future) -> None:
+        if self.release is None or future.cancelled() or future.exception() is not None:
+            return
+        self.release(future.result())
@@ -0,0 +1,185 @@
+"""
+Замеры времени по фазам кадра (обработка событий, обновление, отрисовка и т. д.)
+"""
+
+import csv
+import json
+import math
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pygame
+
+
+class PhaseTimer:
+    """Накопление времени фаз кадра
+
+    Игра вызывает mark(фаза) в конце каждой фазы: время с предыдущей отметки
+    добавляется к этой фазе. Если фаза повторяется за кадр (несколько шагов
+    симуляции, несколько грязных областей), время суммируется.
+    Кадры целиком сохраняются в samples.
+    """
+
+    def __init__(self, phases: Sequence[str]):
+        self.phases = list(phases)
+        self._index = {name: i for i, name in enumerate(self.phases)}
+        self._current = [0.0] * len(self.phases)
+        self._last = time.perf_counter()
+        self.samples: List[List[float]] = []
+
+    def begin_frame(self) -> None:
+        """Начало кадра: обнуление накопленных значений"""
+        for i in range(len(self._current)):
+            self._current[i] = 0.0
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str) -> None:
+        """Конец фазы phase"""
+        now = time.perf_counter()
+        index = self._index.get(phase)
+        if index is not None:
+            self._current[index] += now - self._last
+        self._last = now
+
+    def end_frame(self) -> None:
+        """Конец кадра: сохранение времени фаз"""
+        self.record(self._current)
+
+    def record(self, durations: Sequence[float]) -> None:
+        self.samples.append(list(durations))
+
+    def frame_durations(self) -> Dict[str, float]:
+        """Время фаз текущего (еще не завершенного) кадра в секундах"""
+        return dict(zip(self.phases, self._current))
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(phases: Sequence[str], samples: Sequence[Sequence[float]]) -> Dict[str, Dict[str, float]]:
+    """Среднее, медиана, p99 и максимум по фазам и по кадру целиком, в миллисекундах"""
+    columns = {name: [sample[i] for sample in samples] for i, name in enumerate(phases)}
+    columns['frame'] = [sum(sample) for sample in samples]
+
+    summary = {}
+    for name, values in columns.items():
+        values = sorted(values)
+        count = len(values) or 1
+        summary[name] = {
+            "mean_ms": sum(values) / count * 1000,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+        }
+    return summary
+
+
+# Фазы кадра основного цикла игры в порядке выполнения
+FRAME_PHASES = ['events', 'update', 'collisions', 'background', 'sprites', 'particles', 'ui', 'display']
+# Бюджет кадра при 60 FPS
+FRAME_BUDGET = 1.0 / 60
+
+
+class FrameProfiler(PhaseTimer):
+    """Профилировщик кадров с кольцевым буфером и наложением на экран
+
+    Время фаз последних capacity кадров хранится в одном массиве фиксированного
+    размера, поэтому профилировщик можно держать включенным постоянно.
+    """
+
+    # Область наложения на экране
+    OVERLAY_SIZE = (300, 150)
+    GRAPH_HEIGHT = 60
+
+    def __init__(self, phases: Sequence[str] = FRAME_PHASES, capacity: int = 600):
+        super().__init__(phases)
+        self.capacity = capacity
+        self._ring = array('d', bytes(8 * capacity * len(self.phases)))
+        self._next = 0
+        self.count = 0
+
+    def record(self, durations: Sequence[float]) -> None:
+        width = len(self.phases)
+        start = self._next * width
+        self._ring[start:start + width] = array('d', durations)
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def frames(self, last: Optional[int] = None) -> List[List[float]]:
+        """Сохраненные кадры от старых к новым (или только последние last)"""
+        count = self.count if last is None else min(last, self.count)
+        width = len(self.phases)
+        result = []
+        for i in range(self.count - count, self.count):
+            index = (self._next - self.count + i) % self.capacity
+            result.append(self._ring[index * width:(index + 1) * width].tolist())
+        return result
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return summarize(self.phases, self.frames())
+
+    def export(self, path: str) -> None:
+        """Сохранение буфера в CSV или JSON (по расширению файла), время в мс"""
+        frames = self.frames()
+        if path.lower().endswith('.json'):
+            data = {
+                "phases": self.phases,
+                "frames_ms": [[value * 1000 for value in frame] for frame in frames],
+                "summary": summarize(self.phases, frames),
+            }
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(data, file, ensure_ascii=False, indent=1)
+            return
+
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['frame'] + self.phases + ['total'])
+            for number, frame in enumerate(frames):
+                writer.writerow([number] + [f"{value * 1000:.4f}" for value in frame]
+                                + [f"{sum(frame) * 1000:.4f}"])
+
+    def overlay_rect(self, screen_size: Tuple[int, int]) -> pygame.Rect:
+        """Где на экране рисуется наложение (правый верхний угол под интерфейсом)"""
+        width, height = self.OVERLAY_SIZE
+        return pygame.Rect(screen_size[0] - width - 10, 40, width, height)
+
+    def draw_overlay(self, surface: pygame.Surface, render_text: Callable[[str, Tuple[int, int, int]], pygame.Surface]) -> None:
+        """График времени кадров и разбивка по фазам за последние кадры"""
+        rect = self.overlay_rect(surface.get_size())
+        panel = pygame.Surface(rect.size, pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+
+        # График: столбец на кадр, линия - бюджет 16.6 мс, верх графика - два бюджета
+        recent = self.frames(rect.width // 2)
+        graph_bottom = self.GRAPH_HEIGHT + 5
+        scale = self.GRAPH_HEIGHT / (2 * FRAME_BUDGET)
+        for i, frame in enumerate(recent):
+            total = sum(frame)
+            height = min(self.GRAPH_HEIGHT, max(1, int(total * scale)))
+            color = (80, 220, 80) if total <= FRAME_BUDGET else (230, 60, 60)
+            panel.fill(color, (i * 2, graph_bottom - height, 2, height))
+        budget_y = graph_bottom - int(FRAME_BUDGET * scale)
+        pygame.draw.line(panel, (255, 255, 0), (0, budget_y), (rect.width, budget_y))
+
+        # Средние значения по фазам за последнюю секунду
+        last = self.frames(60)
+        count = len(last) or 1
+        averages = [sum(frame[i] for frame in last) / count * 1000 for i in range(len(self.phases))]
+        total = sum(averages)
+        fps = 1000 / total if total > 0 else 0
+        lines = [f"кадр {total:.2f} мс (~{fps:.0f} FPS без ожидания)"]
+        lines += [f"{name} {value:.2f}" for name, value in zip(self.phases, averages)]
+
+        y = graph_bottom + 4
+        column_x = [4, rect.width // 2]
+        panel.blit(render_text(lines[0], (255, 255, 255)), (4, y))
+        for i, line in enumerate(lines[1:]):
+            panel.blit(render_text(line, (220, 220, 220)), (column_x[i % 2], y + 18 + (i // 2) * 16))
+
+        surface.blit(panel, rect)
@@ -0,0 +1,193 @@
+"""
+Кэши отрисовки: готовые поверхности, которые не нужно рисовать каждый кадр
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pygame
+
+Color = Tuple[int, int, int]
+
+# Файл с найденными путями системных шрифтов (между запусками игры)
+FONT_CACHE_PATH = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+                               'python-platformer', 'fonts.json')
+
+
+def optimize_surface(surface: pygame.Surface) -> pygame.Surface:
+    """Перевод поверхности в формат экрана для быстрого копирования
+
+    Без открытого окна (безоконный режим) поверхность возвращается как есть.
+    """
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+
+class TextCache:
+    """Кэш отрисованного текста с вытеснением давно не использованных строк (LRU)
+
+    Ключ - (шрифт, текст, цвет, сглаживание). Неизменные надписи
+    растеризуются один раз, а значения вроде счета - только когда меняются.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._surfaces: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def render(self, font: pygame.font.Font, text: str, antialias: bool, color: Color) -> pygame.Surface:
+        """То же, что font.render(text, antialias, color), но с кэшем"""
+        key = (font, text, tuple(color), antialias)
+        surfaces = self._surfaces
+        surface = surfaces.get(key)
+        if surface is not None:
+            surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        surfaces[key] = surface
+        if len(surfaces) > self.max_size:
+            surfaces.popitem(last=False)
+        return surface
+
+    def clear(self) -> None:
+        """Очистка кэша (например, после пересоздания шрифтов)"""
+        self._surfaces.clear()
+
+
+class SpriteAtlas:
+    """Общие изображения спрайтов по ключу (вид, цвет, размер)
+
+    Одинаковые спрайты (все монетки, враги одного цвета, платформы одного
+    размера) используют одну поверхность, которая рисуется один раз и
+    переводится в формат экрана для быстрого копирования. Новые изображения
+    создаются под блокировкой: к атласу обращается и поток подготовки уровней.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._images: Dict[tuple, pygame.Surface] = {}
+        # Уменьшенные копии изображений для отрисовки сцены в пониженном разрешении
+        self._scaled: Dict[Tuple[pygame.Surface, float], pygame.Surface] = {}
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def get(self, kind: str, color, size: Tuple[int, int],
+            painter: Callable[[pygame.Surface], None], alpha: bool = True) -> pygame.Surface:
+        """Изображение по ключу; при первом обращении рисуется функцией painter"""
+        key = (kind, color, size)
+        image = self._images.get(key)
+        if image is None:
+            with self._lock:
+                image = self._images.get(key)
+                if image is None:
+                    image = pygame.Surface(size, pygame.SRCALPHA) if alpha else pygame.Surface(size)
+                    painter(image)
+                    image = self._images[key] = optimize_surface(image)
+        return image
+
+    def scaled(self, image: pygame.Surface, scale: float) -> pygame.Surface:
+        """Копия изображения в масштабе scale (создается один раз)"""
+        key = (image, scale)
+        result = self._scaled.get(key)
+        if result is None:
+            with self._lock:
+                result = self._scaled.get(key)
+                if result is None:
+                    width, height = image.get_size()
+                    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                    result = self._scaled[key] = optimize_surface(pygame.transform.scale(image, size))
+        return result
+
+    def optimize(self) -> None:
+        """Перевод уже созданных изображений в формат только что открытого окна"""
+        with self._lock:
+            for key, image in self._images.items():
+                self._images[key] = optimize_surface(image)
+            self._scaled.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._images.clear()
+            self._scaled.clear()
+
+
+class FontCache:
+    """Шрифты по требованию с запоминанием найденных файлов шрифтов на диске
+
+    pygame.font.SysFont при первом вызове перебирает все системные шрифты,
+    что заметно замедляет запуск. Здесь результат поиска (путь к файлу и
+    нужно ли рисовать жирный программно) сохраняется в JSON, и при следующих
+    запусках шрифт открывается сразу по пути. Сам шрифт загружается только
+    при первом обращении.
+    """
+
+    def __init__(self, path: str = FONT_CACHE_PATH):
+        self.path = path
+        self._lookups: Optional[Dict[str, List]] = None
+        self._fonts: Dict[tuple, pygame.font.Font] = {}
+
+    def get(self, name: str, size: int, bold: bool = False) -> pygame.font.Font:
+        """Шрифт как pygame.font.SysFont(name, size, bold)"""
+        key = (name, size, bold)
+        font = self._fonts.get(key)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            path, emulate_bold = self.resolve(name, bold)
+            font = pygame.font.Font(path, size)
+            if emulate_bold:
+                font.set_bold(True)
+            self._fonts[key] = font
+        return font
+
+    def resolve(self, name: str, bold: bool = False) -> Tuple[Optional[str], bool]:
+        """Путь к файлу шрифта (None - встроенный шрифт) и нужен ли программный жирный"""
+        lookups = self._load()
+        key = f"{name}:{'bold' if bold else 'regular'}"
+        entry = lookups.get(key)
+        if entry is None or (entry[0] is not None and not os.path.exists(entry[0])):
+            try:
+                # Вместо создания шрифта SysFont отдает результат поиска
+                entry = pygame.font.SysFont(name, 0, bold,
+                                            constructor=lambda path, size, set_bold, set_italic: [path, set_bold])
+            except Exception:
+                entry = [None, False]
+            lookups[key] = entry
+            self._save()
+        return entry[0], bool(entry[1])
+
+    def _load(self) -> Dict[str, List]:
+        if self._lookups is None:
+            try:
+                with open(self.path, encoding='utf-8') as file:
+                    self._lookups = dict(json.load(file))
+            except (OSError, ValueError, TypeError):
+                self._lookups = {}
+        return self._lookups
+
+    def _save(self) -> None:
+        # Кэш на диске - оптимизация: если записать не удалось, работаем без него
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as file:
+                json.dump(self._lookups, file, ensure_ascii=False)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Сброс загруженных шрифтов (они недействительны после pygame.quit)"""
+        self._fonts.clear()
@@ -0,0 +1,256 @@
+"""
+Запись управления по шагам симуляции и быстрое воспроизведение записей
+
+Пример: python replay.py run recording.rpl other.rpl
+"""
+
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import struct
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+from game import Game, InputState
+from snapshots import GameSnapshot
+
+# Двоичный формат (little-endian):
+#   заголовок: сигнатура, версия, число отрезков
+#   отрезок:   номер уровня, число шагов, длина данных, данные
+# Отрезок - прохождение одного уровня от запуска из меню. Данные - серии
+# одинаковых шагов: байт с битами клавиш и длина серии (varint).
+MAGIC = b'PRPL'
+VERSION = 1
+_HEADER = struct.Struct('<4sBI')
+_SEGMENT = struct.Struct('<HII')
+
+LEFT, RIGHT, JUMP, RESTART = 1, 2, 4, 8
+
+# Через сколько шагов записи ReplayPlayer запоминает снимок для перемотки назад
+SEEK_KEYFRAME_INTERVAL = 300
+
+# Все 16 вариантов управления заранее, чтобы не создавать InputState на каждом шаге
+_INPUTS = [InputState(bool(mask & LEFT), bool(mask & RIGHT), bool(mask & JUMP), bool(mask & RESTART))
+           for mask in range(16)]
+
+
+def input_mask(inputs: InputState) -> int:
+    """Упаковка управления в 4 бита"""
+    return ((LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0)
+            | (JUMP if inputs.jump else 0) | (RESTART if inputs.restart else 0))
+
+
+def _encode_runs(masks: bytes) -> bytes:
+    """Сжатие последовательности масок сериями одинаковых значений"""
+    out = bytearray()
+    i, total = 0, len(masks)
+    while i < total:
+        mask = masks[i]
+        j = i + 1
+        while j < total and masks[j] == mask:
+            j += 1
+        out.append(mask)
+        run = j - i
+        while run >= 0x80:
+            out.append((run & 0x7F) | 0x80)
+            run >>= 7
+        out.append(run)
+        i = j
+    return bytes(out)
+
+
+def _decode_runs(data: bytes, ticks: int) -> bytes:
+    """Распаковка серий обратно в одну маску на шаг"""
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        mask = data[i]
+        i += 1
+        run, shift = 0, 0
+        while True:
+            byte = data[i]
+            i += 1
+            run |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        out += bytes((mask,)) * run
+    if len(out) != ticks:
+        raise ValueError("Запись повреждена: число шагов не совпадает")
+    return bytes(out)
+
+
+class ReplaySegment(NamedTuple):
+    """Прохождение одного уровня: номер уровня и маска управления на каждый шаг"""
+    level: int
+    masks: bytes
+
+
+class InputRecorder:
+    """Запись управления, подключается к игре через Game.recorder"""
+
+    def __init__(self):
+        self.segments: List[ReplaySegment] = []
+        self._masks: Optional[bytearray] = None
+        self._level = 0
+
+    def begin(self, level: int) -> None:
+        """Начало нового отрезка (уровень запущен из меню)"""
+        self._finish_segment()
+        self._level = level
+        self._masks = bytearray()
+
+    def record(self, inputs: InputState) -> None:
+        """Запись управления одного шага"""
+        if self._masks is not None:
+            self._masks.append(input_mask(inputs))
+
+    def _finish_segment(self) -> None:
+        if self._masks:
+            self.segments.append(ReplaySegment(self._level, bytes(self._masks)))
+        self._masks = None
+
+    def to_bytes(self) -> bytes:
+        """Запись в двоичном виде (текущий отрезок тоже включается)"""
+        segments = list(self.segments)
+        if self._masks:
+            segments.append(ReplaySegment(self._level, bytes(self._masks)))
+        return encode_replay(segments)
+
+    def save(self, path: str) -> None:
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+
+def encode_replay(segments: Sequence[ReplaySegment]) -> bytes:
+    """Упаковка отрезков записи в двоичный вид"""
+    parts = [_HEADER.pack(MAGIC, VERSION, len(segments))]
+    for segment in segments:
+        data = _encode_runs(segment.masks)
+        parts.append(_SEGMENT.pack(segment.level, len(segment.masks), len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def decode_replay(data: bytes) -> List[ReplaySegment]:
+    """Распаковка записи"""
+    magic, version, count = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Неподдерживаемый формат записи")
+    offset = _HEADER.size
+    segments = []
+    for _ in range(count):
+        level, ticks, size = _SEGMENT.unpack_from(data, offset)
+        offset += _SEGMENT.size
+        segments.append(ReplaySegment(level, _decode_runs(data[offset:offset + size], ticks)))
+        offset += size
+    return segments
+
+
+def load_replay(path: str) -> List[ReplaySegment]:
+    with open(path, 'rb') as file:
+        return decode_replay(file.read())
+
+
+class ReplayPlayer:
+    """Воспроизведение отрезка записи на игре без окна с перемоткой
+
+    Игра детерминирована по счетчику шагов, поэтому состояние на любом шаге
+    восстанавливается повторным прогоном управления. При прогоне каждые
+    SEEK_KEYFRAME_INTERVAL шагов запоминается снимок состояния, и перемотка
+    назад прогоняет управление от ближайшего снимка, а не от начала уровня.
+    step_ticks > 1 - прогон крупными шагами (см. Game.step_many), итог тот же.
+    """
+
+    def __init__(self, segment: ReplaySegment, game: Optional[Game] = None, step_ticks: int = 1):
+        self.segment = segment
+        self.game = game or Game(headless=True)
+        self.step_ticks = step_ticks
+        self.position = 0
+        self.game.start_level(segment.level)
+        self.keyframes: Dict[int, GameSnapshot] = {0: self.game.snapshot()}
+
+    def __len__(self) -> int:
+        return len(self.segment.masks)
+
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.segment.masks)
+
+    def fast_forward(self, ticks: int) -> None:
+        """Прогон следующих ticks шагов записи без ограничения скорости"""
+        end = min(len(self.segment.masks), self.position + ticks)
+        step = self.game.step
+        masks = self.segment.masks
+        while self.position < end:
+            stop = min(end, (self.position // SEEK_KEYFRAME_INTERVAL + 1) * SEEK_KEYFRAME_INTERVAL)
+            if self.step_ticks == 1:
+                for mask in masks[self.position:stop]:
+                    step(_INPUTS[mask])
+            else:
+                self.game.step_many([_INPUTS[mask] for mask in masks[self.position:stop]], self.step_ticks)
+            self.position = stop
+            if stop % SEEK_KEYFRAME_INTERVAL == 0 and stop not in self.keyframes:
+                self.keyframes[stop] = self.game.snapshot()
+
+    def seek(self, tick: int) -> None:
+        """Переход к состоянию после tick шагов записи"""
+        tick = max(0, min(tick, len(self.segment.masks)))
+        if tick < self.position:
+            start = tick - tick % SEEK_KEYFRAME_INTERVAL
+            self.game.restore(self.keyframes[start])
+            self.position = start
+        self.fast_forward(tick - self.position)
+
+    def run_to_end(self) -> Dict[str, Any]:
+        """Прогон до конца записи, возвращает итог как Game.run_headless"""
+        self.fast_forward(len(self.segment.masks) - self.position)
+        return {
+            "level": self.segment.level,
+            "score": self.game.player.score,
+            "lives": self.game.player.lives,
+            "won": self.game.game_won,
+            "lost": self.game.game_over,
+            "frames": self.position,
+        }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Воспроизведение записей управления")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    info = commands.add_parser('info', help="показать отрезки записи")
+    info.add_argument('files', nargs='+')
+
+    run = commands.add_parser('run', help="прогнать записи без окна и вывести итоги в JSON")
+    run.add_argument('files', nargs='+')
+    run.add_argument('--seek', type=int, default=None, help="остановиться после указанного шага")
+    run.add_argument('--step-ticks', type=int, default=1,
+                     help="шагов симуляции в одном крупном шаге (4-8 - быстрее с тем же итогом)")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Точка входа"""
+    args = parse_args()
+    for path in args.files:
+        for index, segment in enumerate(load_replay(path)):
+            if args.command == 'info':
+                result = {"level": segment.level, "frames": len(segment.masks)}
+            else:
+                player = ReplayPlayer(segment, step_ticks=args.step_ticks)
+                if args.seek is not None:
+                    player.seek(args.seek)
+                    result = {"level": segment.level, "frames": player.position,
+                              "score": player.game.player.score, "lives": player.game.player.lives,
+                              "won": player.game.game_won, "lost": player.game.game_over}
+                else:
+                    result = player.run_to_end()
+            result.update(file=path, segment=index)
+            print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+"""
+Сервер игровых сессий без окна: много независимых игр в одном процессе
+
+Пример: python server.py serve --port 5555 --report 5
+        python server.py client --port 5555 --sessions 200 --seconds 10
+"""
+
+import os
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import asyncio
+import json
+import struct
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from batch_runner import RandomPolicy
+from game import MAX_CATCHUP_TICKS, TICK_RATE, Game, InputState
+from profiler import percentile
+from replay import JUMP, LEFT, RESTART, RIGHT, input_mask
+from snapshots import GameSnapshot
+
+# Протокол (little-endian): сообщение - заголовок (тип, длина данных) и данные.
+# Клиент -> сервер
+MSG_JOIN = 1       # номер уровня: создать сессию
+MSG_INPUT = 2      # байт с битами клавиш (как в replay)
+MSG_LEAVE = 3      # закрыть сессию
+MSG_STATS = 4      # запросить сводку сервера
+# Сервер -> клиент
+MSG_WELCOME = 16   # номер сессии, уровень, число монеток и врагов, частота шагов
+MSG_STATE = 17     # состояние сессии (разность с прошлым отправленным)
+MSG_STATS_REPLY = 18  # сводка сервера в JSON
+MSG_ERROR = 19     # текст ошибки
+
+_HEADER = struct.Struct('<BI')
+_JOIN = struct.Struct('<H')
+_INPUT = struct.Struct('<B')
+_WELCOME = struct.Struct('<IHHHH')
+
+# Сообщение STATE: номер шага, биты разделов и разделы в порядке битов
+_STATE = struct.Struct('<IB')
+STATE_FULL = 1      # полное состояние: монетки отсчитываются от "все на месте"
+STATE_PLAYER = 2    # x, y игрока
+STATE_SCORE = 4     # жизни и очки
+STATE_FLAGS = 8     # проигрыш и победа
+STATE_ENEMIES = 16  # число врагов и (номер, x, y, направление) изменившихся
+STATE_COINS = 32    # число монеток и номера монеток, сменивших состояние
+_POSITION = struct.Struct('<ii')
+_SCORE = struct.Struct('<hi')
+_FLAGS = struct.Struct('<B')
+_COUNT = struct.Struct('<H')
+_ENEMY = struct.Struct('<Hiib')
+_COIN = struct.Struct('<H')
+
+# Положение полей в GameSnapshot.scalars (см. snapshots.SCALAR_FIELDS)
+_X, _Y, _LIVES, _SCORE_FIELD, _GAME_OVER, _GAME_WON = 1, 2, 5, 6, 10, 11
+
+# Сколько последних задержек шага хранить на сессию
+LATENCY_WINDOW = 600
+# Клиенту, не успевающему читать, состояние не отправляется (разность копится)
+MAX_WRITE_BUFFER = 64 * 1024
+# Наибольшая длина данных сообщения. От клиента самое длинное - JOIN, от сервера -
+# сводка со всеми сессиями (полное состояние даже с 65535 врагами и монетками < 1 МБ)
+MAX_CLIENT_PAYLOAD = max(_JOIN.size, _INPUT.size)
+MAX_SERVER_PAYLOAD = 16 * 1024 * 1024
+
+# Все 16 вариантов управления заранее
+_INPUTS = [InputState(bool(mask & LEFT), bool(mask & RIGHT), bool(mask & JUMP), bool(mask & RESTART))
+           for mask in range(16)]
+
+
+def pack_message(kind: int, payload: bytes = b'') -> bytes:
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_message(reader: asyncio.StreamReader, max_length: int) -> Tuple[int, bytes]:
+    """Чтение одного сообщения: (тип, данные)
+
+    Сообщение длиннее max_length считается ошибкой протокола (ConnectionError),
+    чтобы заголовок с огромной длиной не заставлял ждать и копить данные.
+    """
+    kind, length = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > max_length:
+        raise ConnectionError(f"Сообщение {kind} длиной {length} байт, допустимо не больше {max_length}")
+    return kind, await reader.readexactly(length) if length else b''
+
+
+def encode_state(current: GameSnapshot, previous: Optional[GameSnapshot]) -> bytes:
+    """Данные сообщения STATE: current целиком (previous=None) или разность с previous"""
+    scalars = current.scalars
+    old = previous.scalars if previous is not None else None
+    sections = 0 if previous is not None else STATE_FULL
+    parts = []
+
+    if old is None or scalars[_X] != old[_X] or scalars[_Y] != old[_Y]:
+        sections |= STATE_PLAYER
+        parts.append(_POSITION.pack(int(scalars[_X]), int(scalars[_Y])))
+    if old is None or scalars[_LIVES] != old[_LIVES] or scalars[_SCORE_FIELD] != old[_SCORE_FIELD]:
+        sections |= STATE_SCORE
+        parts.append(_SCORE.pack(int(scalars[_LIVES]), int(scalars[_SCORE_FIELD])))
+    if old is None or scalars[_GAME_OVER] != old[_GAME_OVER] or scalars[_GAME_WON] != old[_GAME_WON]:
+        sections |= STATE_FLAGS
+        parts.append(_FLAGS.pack(int(scalars[_GAME_OVER]) | int(scalars[_GAME_WON]) << 1))
+
+    enemies = current.enemies
+    if previous is None or enemies != previous.enemies:
+        base = previous.enemies if previous is not None else None
+        changed = [i for i in range(0, len(enemies), 3)
+                   if base is None or enemies[i:i + 3] != base[i:i + 3]]
+        sections |= STATE_ENEMIES
+        parts.append(_COUNT.pack(len(changed)))
+        parts.extend(_ENEMY.pack(i // 3, enemies[i], enemies[i + 1], enemies[i + 2]) for i in changed)
+
+    coins = current.coins
+    if previous is None:
+        toggled = [i for i, alive in enumerate(coins) if not alive]
+    elif coins != previous.coins:
+        toggled = [i for i, (now, was) in enumerate(zip(coins, previous.coins)) if now != was]
+    else:
+        toggled = []
+    if toggled:
+        sections |= STATE_COINS
+        parts.append(_COUNT.pack(len(toggled)))
+        parts.extend(_COIN.pack(i) for i in toggled)
+
+    return _STATE.pack(int(current.tick), sections) + b''.join(parts)
+
+
+class RemoteState:
+    """Состояние сессии на стороне клиента, собранное из сообщений STATE"""
+
+    def __init__(self, coins: int, enemies: int):
+        self.tick = 0
+        self.x = self.y = 0
+        self.lives = self.score = 0
+        self.game_over = self.game_won = False
+        # Враги: [x, y, направление]
+        self.enemies = [[0, 0, 0] for _ in range(enemies)]
+        self.coin_alive = bytearray(b'\x01') * coins
+
+    def apply(self, payload: bytes) -> None:
+        """Применение данных сообщения STATE"""
+        self.tick, sections = _STATE.unpack_from(payload)
+        offset = _STATE.size
+        if sections & STATE_PLAYER:
+            self.x, self.y = _POSITION.unpack_from(payload, offset)
+            offset += _POSITION.size
+        if sections & STATE_SCORE:
+            self.lives, self.score = _SCORE.unpack_from(payload, offset)
+            offset += _SCORE.size
+        if sections & STATE_FLAGS:
+            flags, = _FLAGS.unpack_from(payload, offset)
+            self.game_over, self.game_won = bool(flags & 1), bool(flags & 2)
+            offset += _FLAGS.size
+        if sections & STATE_ENEMIES:
+            count, = _COUNT.unpack_from(payload, offset)
+            offset += _COUNT.size
+            for index, x, y, direction in _ENEMY.iter_unpack(payload[offset:offset + count * _ENEMY.size]):
+                self.enemies[index][:] = (x, y, direction)
+            offset += count * _ENEMY.size
+        if sections & STATE_FULL:
+            self.coin_alive[:] = b'\x01' * len(self.coin_alive)
+        if sections & STATE_COINS:
+            count, = _COUNT.unpack_from(payload, offset)
+            offset += _COUNT.size
+            for index, in _COIN.iter_unpack(payload[offset:offset + count * _COIN.size]):
+                self.coin_alive[index] ^= 1
+
+
+class Session:
+    """Игра без окна на сервере и подключение клиента, который ею управляет
+
+    Клавиши движения действуют, пока клиент их не отпустит, а прыжок
+    и перезапуск срабатывают на ближайшем шаге (как в Game.take_input).
+    """
+
+    def __init__(self, session_id: int, level: int, writer: asyncio.StreamWriter, tick_rate: int = TICK_RATE):
+        self.id = session_id
+        self.level = level
+        self.writer = writer
+        self.tick_rate = tick_rate
+        self.game = Game(headless=True)
+        self.game.start_level(level)
+        self.held = 0
+        self.pressed = 0
+        # Последнее отправленное клиенту состояние (база для разности)
+        self.sent: Optional[GameSnapshot] = None
+        # Задержки шагов в секундах: кольцевой буфер последних LATENCY_WINDOW
+        self.latencies = array('d', bytes(8 * LATENCY_WINDOW))
+        self.latency_count = 0
+
+    def welcome(self) -> bytes:
+        game = self.game
+        return pack_message(MSG_WELCOME, _WELCOME.pack(self.id, self.level, len(game.level_coins),
+                                                       len(game.level_enemies), self.tick_rate))
+
+    def press(self, mask: int) -> None:
+        """Управление от клиента"""
+        self.held = mask & (LEFT | RIGHT)
+        self.pressed |= mask & (JUMP | RESTART)
+
+    def advance(self, ticks: int) -> None:
+        """ticks шагов симуляции с текущим управлением (нажатия - на первом)"""
+        inputs = _INPUTS[self.held | self.pressed]
+        held = _INPUTS[self.held]
+        self.pressed = 0
+        step = self.game.step
+        done = 0
+        while done < ticks:
+            done += step(inputs if done == 0 else held, ticks - done)
+
+    def send_state(self) -> bool:
+        """Отправка разности с прошлым отправленным состоянием; False - клиент не успевает читать"""
+        transport = self.writer.transport
+        if transport.is_closing() or transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            return False
+        snapshot = self.game.snapshot()
+        self.writer.write(pack_message(MSG_STATE, encode_state(snapshot, self.sent)))
+        self.sent = snapshot
+        return True
+
+    def record_latency(self, seconds: float) -> None:
+        self.latencies[self.latency_count % LATENCY_WINDOW] = seconds
+        self.latency_count += 1
+
+    def recent_latencies(self) -> List[float]:
+        return list(self.latencies[:min(self.latency_count, LATENCY_WINDOW)])
+
+    def close(self) -> None:
+        """Возврат спрайтов уровня в пулы"""
+        self.game.reset_game_state()
+
+
+def latency_summary(values: Sequence[float]) -> Dict[str, float]:
+    """Медиана, p99 и максимум задержек в миллисекундах"""
+    values = sorted(values)
+    return {
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": (values[-1] if values else 0.0) * 1000,
+    }
+
+
+class SessionScheduler:
+    """Общий таймер шагов всех сессий
+
+    Шаги идут по одним часам с частотой tick_rate пачками по batch_ticks:
+    раз в batch_ticks шагов все сессии обновляются подряд одним проходом,
+    без отдельной задачи asyncio на сессию. Пачка выполняется одним крупным
+    шагом на сессию (см. Game.step, итог тот же, что у отдельных шагов),
+    после нее клиенту отправляется одно состояние. Управление, пришедшее
+    за время пачки, действует со следующей пачки.
+
+    Если сервер отстал, пропущенные шаги выполняются в той же пачке, но не
+    больше batch_ticks * MAX_CATCHUP_TICKS, остальное отставание
+    сбрасывается. Задержка шага сессии - время от момента, когда пачка
+    должна была выполниться, до отправки состояния клиенту.
+    """
+
+    def __init__(self, tick_rate: int = TICK_RATE, batch_ticks: int = 3):
+        self.tick_rate = tick_rate
+        self.tick_period = 1.0 / tick_rate
+        self.batch_ticks = batch_ticks
+        self.sessions: Dict[int, Session] = {}
+        # Выполненные и сброшенные шаги с запуска
+        self.tick = 0
+        self.dropped_ticks = 0
+        self.step_seconds = 0.0
+        self._next_id = 1
+        self._started = time.perf_counter()
+
+    def open(self, level: int, writer: asyncio.StreamWriter) -> Session:
+        session = Session(self._next_id, level, writer, self.tick_rate)
+        self._next_id += 1
+        self.sessions[session.id] = session
+        return session
+
+    def close(self, session: Session) -> None:
+        if self.sessions.pop(session.id, None) is not None:
+            session.close()
+
+    async def run(self) -> None:
+        """Цикл шагов (работает, пока задачу не отменят)"""
+        period = self.tick_period
+        clock = time.perf_counter
+        start = clock()
+        limit = self.batch_ticks * MAX_CATCHUP_TICKS
+        while True:
+            deadline = start + (self.tick + self.dropped_ticks + self.batch_ticks) * period
+            # Даже при отставании цикл уступает очередь приему сообщений
+            await asyncio.sleep(max(0.0, deadline - clock()))
+            due = int((clock() - start) / period) - self.tick - self.dropped_ticks
+            ticks = min(due, limit)
+            self.dropped_ticks += due - ticks
+            self.tick_all(ticks, deadline)
+
+    def tick_all(self, ticks: int, deadline: float) -> None:
+        """ticks шагов всех сессий и отправка состояний; deadline - когда пачка должна была выполниться"""
+        clock = time.perf_counter
+        started = clock()
+        self.tick += ticks
+        for session in list(self.sessions.values()):
+            session.advance(ticks)
+            session.send_state()
+            session.record_latency(clock() - deadline)
+        self.step_seconds += clock() - started
+
+    def stats(self, sessions: bool = False) -> Dict[str, Any]:
+        """Сводка: число сессий, шаги, загрузка и задержки (sessions - по каждой сессии)"""
+        elapsed = time.perf_counter() - self._started
+        latencies = [value for session in self.sessions.values() for value in session.recent_latencies()]
+        result = {
+            "sessions": len(self.sessions),
+            "tick": self.tick,
+            "dropped_ticks": self.dropped_ticks,
+            "load": self.step_seconds / elapsed if elapsed > 0 else 0.0,
+            "latency": latency_summary(latencies),
+        }
+        if sessions:
+            result["per_session"] = [dict(id=session.id, level=session.level, tick=session.game.tick,
+                                          score=session.game.player.score,
+                                          **latency_summary(session.recent_latencies()))
+                                     for session in self.sessions.values()]
+        return result
+
+
+class GameServer:
+    """Прием подключений: каждое подключение управляет одной сессией"""
+
+    def __init__(self, scheduler: SessionScheduler):
+        self.scheduler = scheduler
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session: Optional[Session] = None
+        try:
+            while True:
+                kind, payload = await read_message(reader, MAX_CLIENT_PAYLOAD)
+                if kind == MSG_INPUT and session is not None:
+                    session.press(_INPUT.unpack(payload)[0])
+                elif kind == MSG_JOIN and session is None:
+                    level, = _JOIN.unpack(payload)
+                    try:
+                        session = self.scheduler.open(level, writer)
+                    except (OSError, ValueError, KeyError) as error:
+                        writer.write(pack_message(MSG_ERROR, f"Уровень {level} не загружен: {error}".encode()))
+                        continue
+                    writer.write(session.welcome())
+                    session.send_state()
+                elif kind == MSG_STATS:
+                    stats = self.scheduler.stats(sessions=True)
+                    writer.write(pack_message(MSG_STATS_REPLY, json.dumps(stats, ensure_ascii=False).encode()))
+                elif kind == MSG_LEAVE:
+                    break
+                else:
+                    writer.write(pack_message(MSG_ERROR, f"Неожиданное сообщение {kind}".encode()))
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error):
+            pass
+        finally:
+            if session is not None:
+                self.scheduler.close(session)
+            writer.close()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 5555, unix: Optional[str] = None,
+                    report: float = 0.0) -> None:
+        """Запуск сервера и цикла шагов; report > 0 - вывод сводки каждые report секунд"""
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        ticker = asyncio.create_task(self.scheduler.run())
+        try:
+            async with server:
+                if report > 0:
+                    while True:
+                        await asyncio.sleep(report)
+                        print(json.dumps(self.scheduler.stats(), ensure_ascii=False), flush=True)
+                else:
+                    await server.serve_forever()
+        finally:
+            ticker.cancel()
+
+
+async def open_connection(host: str, port: int, unix: Optional[str]) -> Tuple[asyncio.StreamReader,
+                                                                          asyncio.StreamWriter]:
+    if unix:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+
+class ClientSession:
+    """Подключение проверочного клиента: своя сессия на сервере и ее состояние"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, seed: int):
+        self.reader = reader
+        self.writer = writer
+        self.policy = RandomPolicy(seed)
+        self.held: Optional[int] = None
+        self.jumping = False
+        self.state: Optional[RemoteState] = None
+        self.session_id = 0
+        # Частота шагов сервера (из WELCOME)
+        self.tick_rate = TICK_RATE
+        self.messages = 0
+        self.bytes = 0
+
+    @classmethod
+    async def connect(cls, host: str, port: int, unix: Optional[str], level: int, seed: int) -> "ClientSession":
+        reader, writer = await open_connection(host, port, unix)
+        client = cls(reader, writer, seed)
+        writer.write(pack_message(MSG_JOIN, _JOIN.pack(level)))
+        kind, payload = await read_message(reader, MAX_SERVER_PAYLOAD)
+        if kind != MSG_WELCOME:
+            writer.close()
+            raise RuntimeError(payload.decode())
+        client.session_id, _, coins, enemies, client.tick_rate = _WELCOME.unpack(payload)
+        client.state = RemoteState(coins, enemies)
+        return client
+
+    def send_input(self, frame: int) -> None:
+        """Управление случайного игрока на кадр frame
+
+        Клавиши движения отправляются только при изменении, прыжок - только
+        в момент нажатия (сервер сам держит движение, а прыжок срабатывает один раз).
+        """
+        mask = input_mask(self.policy(frame))
+        held = mask & (LEFT | RIGHT)
+        pressed = mask & JUMP and not self.jumping
+        self.jumping = bool(mask & JUMP)
+        if held != self.held or pressed:
+            self.writer.write(pack_message(MSG_INPUT, _INPUT.pack(held | (JUMP if pressed else 0))))
+            self.held = held
+
+    async def receive(self) -> None:
+        """Прием состояний до закрытия подключения"""
+        try:
+            while True:
+                kind, payload = await read_message(self.reader, MAX_SERVER_PAYLOAD)
+                if kind == MSG_STATE:
+                    self.state.apply(payload)
+                    self.messages += 1
+                    self.bytes += _HEADER.size + len(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    async def leave(self) -> None:
+        self.writer.write(pack_message(MSG_LEAVE))
+        await self.writer.drain()
+        self.writer.close()
+
+
+async def run_clients(host: str, port: int, unix: Optional[str], sessions: int, levels: Sequence[int],
+                      seconds: float, seed: int = 0) -> Dict[str, Any]:
+    """Проверочный клиент: sessions сессий одновременно, затем сводка клиента и сервера
+
+    Управление всех сессий отправляется из одного цикла с частотой шагов
+    сервера (из WELCOME).
+    """
+    clients = [await ClientSession.connect(host, port, unix, levels[i % len(levels)], seed + i)
+               for i in range(sessions)]
+    receivers = [asyncio.create_task(client.receive()) for client in clients]
+    period = 1.0 / (clients[0].tick_rate if clients else TICK_RATE)
+    started = time.perf_counter()
+    frame = 0
+    while time.perf_counter() - started < seconds:
+        for client in clients:
+            client.send_input(frame)
+        frame += 1
+        await asyncio.sleep(max(0.0, started + frame * period - time.perf_counter()))
+
+    reader, writer = await open_connection(host, port, unix)
+    writer.write(pack_message(MSG_STATS))
+    _, payload = await read_message(reader, MAX_SERVER_PAYLOAD)
+    writer.close()
+    server_stats = json.loads(payload)
+    server_stats.pop("per_session", None)
+    for client in clients:
+        await client.leave()
+    await asyncio.gather(*receivers)
+
+    messages = sum(client.messages for client in clients)
+    return {
+        "sessions": len(clients),
+        "states_received": messages,
+        "bytes_per_state": sum(client.bytes for client in clients) / messages if messages else 0.0,
+        "won": sum(client.state.game_won for client in clients),
+        "lost": sum(client.state.game_over for client in clients),
+        "server": server_stats,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Сервер игровых сессий без окна")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, text in (('serve', "запустить сервер"), ('client', "проверочный клиент с множеством сессий")):
+        command = commands.add_parser(name, help=text)
+        command.add_argument('--host', default='127.0.0.1')
+        command.add_argument('--port', type=int, default=5555)
+        command.add_argument('--unix', default=None, help="путь к UNIX-сокету вместо TCP")
+
+    serve = commands.choices['serve']
+    serve.add_argument('--tick-rate', type=int, default=TICK_RATE, help="шагов симуляции в секунду")
+    serve.add_argument('--batch-ticks', type=int, default=3,
+                       help="шагов в пачке: сессии обновляются и отправляют состояние раз в N шагов")
+    serve.add_argument('--report', type=float, default=0.0, help="выводить сводку каждые N секунд")
+
+    client = commands.choices['client']
+    client.add_argument('--sessions', type=int, default=100, help="число одновременных сессий")
+    client.add_argument('--levels', default='1,2', help="номера уровней через запятую (по кругу)")
+    client.add_argument('--seconds', type=float, default=10.0, help="длительность игры")
+    client.add_argument('--seed', type=int, default=0, help="зерно первой сессии")
+    return parser.parse_args(argv)
+
+
+def main():
+    """Точка входа"""
+    args = parse_args()
+    if args.command == 'serve':
+        server = GameServer(SessionScheduler(args.tick_rate, args.batch_ticks))
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix, args.report))
+        except KeyboardInterrupt:
+            pass
+    else:
+        levels = [int(level) for level in args.levels.split(',')]
+        summary = asyncio.run(run_clients(args.host, args.port, args.unix, args.sessions, levels,
+                                          args.seconds, args.seed))
+        print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Снимки состояния игры и кольцевой буфер снимков для перемотки назад
+"""
+
+from array import array
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+# Скалярные поля снимка в порядке хранения в GameSnapshot.scalars
+SCALAR_FIELDS = ('tick', 'player_x', 'player_y', 'velocity_y', 'jumping', 'lives', 'score',
+                 'invincible', 'invincible_timer', 'camera_x', 'game_over', 'game_won', 'level_complete')
+# Значений на одного врага в GameSnapshot.enemies: x, y, направление
+ENEMY_FIELDS = 3
+
+
+class GameSnapshot:
+    """Снимок изменяемого состояния уровня
+
+    Хранит только то, что меняется во время игры: скаляры игрока, камеры
+    и флагов (array('d')), положения и направления врагов (array('i'))
+    и признаки несобранных монеток (по байту на монетку). Все остальное
+    (платформы, изображения, границы патрулирования) берется из уровня,
+    поэтому снимок восстанавливается только на том же загруженном уровне.
+    """
+
+    __slots__ = ('scalars', 'enemies', 'coins')
+
+    def __init__(self, scalars: array, enemies: array, coins: bytes):
+        self.scalars = scalars
+        self.enemies = enemies
+        self.coins = coins
+
+    @property
+    def tick(self) -> int:
+        return int(self.scalars[0])
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, GameSnapshot) and self.scalars == other.scalars
+                and self.enemies == other.enemies and self.coins == other.coins)
+
+    def nbytes(self) -> int:
+        """Размер данных снимка в байтах"""
+        return (len(self.scalars) * self.scalars.itemsize + len(self.enemies) * self.enemies.itemsize
+                + len(self.coins))
+
+
+class SnapshotDelta:
+    """Разность двух снимков: скаляры целиком и только изменившиеся элементы массивов"""
+
+    __slots__ = ('scalars', 'enemy_index', 'enemy_values', 'coin_index', 'coin_values')
+
+    def __init__(self, target: GameSnapshot, base: GameSnapshot):
+        self.scalars = target.scalars
+        self.enemy_index, self.enemy_values = _changed(target.enemies, base.enemies, 'i')
+        self.coin_index, self.coin_values = _changed(target.coins, base.coins, 'B')
+
+    def apply(self, base: GameSnapshot) -> GameSnapshot:
+        """Снимок, из которого была посчитана разность, по снимку base"""
+        enemies = base.enemies
+        if self.enemy_index:
+            enemies = array('i', enemies)
+            for i, value in zip(self.enemy_index, self.enemy_values):
+                enemies[i] = value
+        coins = base.coins
+        if self.coin_index:
+            coins = bytearray(coins)
+            for i, value in zip(self.coin_index, self.coin_values):
+                coins[i] = value
+            coins = bytes(coins)
+        return GameSnapshot(self.scalars, enemies, coins)
+
+    def nbytes(self) -> int:
+        return (len(self.scalars) * self.scalars.itemsize
+                + (len(self.enemy_index) + len(self.enemy_values) + len(self.coin_index)) * 4
+                + len(self.coin_values))
+
+
+def _changed(target, base, typecode: str) -> Tuple[array, array]:
+    """Индексы и новые значения элементов, которыми target отличается от base"""
+    if target == base:
+        return array('i'), array(typecode)
+    index = array('i', [i for i, (new, old) in enumerate(zip(target, base)) if new != old])
+    return index, array(typecode, [target[i] for i in index])
+
+
+class RewindBuffer:
+    """Кольцевой буфер последних capacity снимков для перемотки назад
+
+    Последний снимок хранится целиком, остальные - как разность с соседним
+    более новым снимком, поэтому шаг назад стоит одного применения разности.
+    Каждый keyframe_interval-й снимок дополнительно хранится целиком, чтобы
+    любой снимок буфера восстанавливался не больше чем за keyframe_interval
+    разностей. Самые старые снимки вытесняются, так что память ограничена.
+    """
+
+    def __init__(self, capacity: int = 600, keyframe_interval: int = 30):
+        self.capacity = capacity
+        self.keyframe_interval = keyframe_interval
+        # Записи от старых к новым: (полный снимок или None, разность к предыдущему снимку)
+        self._entries: Deque[Tuple[Optional[GameSnapshot], Optional[SnapshotDelta]]] = deque()
+        self._latest: Optional[GameSnapshot] = None
+        self._pushed = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._latest = None
+        self._pushed = 0
+
+    def push(self, snapshot: GameSnapshot) -> None:
+        """Добавление нового снимка"""
+        keyframe = snapshot if self._pushed % self.keyframe_interval == 0 else None
+        delta = SnapshotDelta(self._latest, snapshot) if self._latest is not None else None
+        self._entries.append((keyframe, delta))
+        self._latest = snapshot
+        self._pushed += 1
+        if len(self._entries) > self.capacity:
+            self._entries.popleft()
+
+    def pop(self) -> Optional[GameSnapshot]:
+        """Удаление и возврат последнего снимка"""
+        if not self._entries:
+            return None
+        latest = self._latest
+        _, delta = self._entries.pop()
+        self._pushed -= 1
+        if not self._entries:
+            self._latest = None
+        else:
+            keyframe = self._entries[-1][0]
+            self._latest = keyframe if keyframe is not None else delta.apply(latest)
+        return latest
+
+    def peek(self, age: int = 0) -> Optional[GameSnapshot]:
+        """Снимок, сделанный age снимков назад (0 - последний), без удаления"""
+        if not 0 <= age < len(self._entries):
+            return None
+        target = len(self._entries) - 1 - age
+        # Ближайшая более новая точка, с которой известен полный снимок
+        index, snapshot = len(self._entries) - 1, self._latest
+        for i in range(target, len(self._entries) - 1):
+            keyframe = self._entries[i][0]
+            if keyframe is not None:
+                index, snapshot = i, keyframe
+                break
+        while index > target:
+            snapshot = self._entries[index][1].apply(snapshot)
+            index -= 1
+        return snapshot
+
+    def nbytes(self) -> int:
+        """Примерный объем данных буфера в байтах"""
+        total = self._latest.nbytes() if self._latest is not None else 0
+        for keyframe, delta in self._entries:
+            if keyframe is not None and keyframe is not self._latest:
+                total += keyframe.nbytes()
+            if delta is not None:
+                total += delta.nbytes()
+        return total
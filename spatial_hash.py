@@ -0,0 +1,104 @@
+"""
+Пространственный хэш для быстрого поиска столкновений
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import pygame
+
+CellRange = Tuple[int, int, int, int]
+
+
+class SpatialHash:
+    """Равномерная сетка: объект хранится во всех ячейках, которые задевает его прямоугольник
+
+    Запрос возвращает только объекты из ячеек, пересекающих заданный
+    прямоугольник, поэтому его стоимость зависит от плотности объектов
+    рядом, а не от их общего числа. Точную проверку пересечения делает
+    вызывающий код.
+    """
+
+    def __init__(self, cell_size: int = 64):
+        self.cell_size = cell_size
+        # Ячейка -> объекты в ней (dict вместо set сохраняет порядок добавления,
+        # чтобы результаты запросов были детерминированными)
+        self.cells: Dict[Tuple[int, int], Dict[Any, None]] = {}
+        # Объект -> диапазон занятых ячеек
+        self.ranges: Dict[Any, CellRange] = {}
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self.ranges
+
+    def _cell_range(self, rect: pygame.Rect) -> CellRange:
+        """Диапазон ячеек (включительно), которые задевает прямоугольник"""
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def _add_to_cells(self, item: Any, cell_range: CellRange) -> None:
+        x0, y0, x1, y1 = cell_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells.setdefault((cx, cy), {})[item] = None
+
+    def _remove_from_cells(self, item: Any, cell_range: CellRange) -> None:
+        x0, y0, x1, y1 = cell_range
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    cell.pop(item, None)
+                    if not cell:
+                        del self.cells[(cx, cy)]
+
+    def insert(self, item: Any, rect: pygame.Rect) -> None:
+        """Добавление объекта с заданным прямоугольником"""
+        if item in self.ranges:
+            self.move(item, rect)
+            return
+        cell_range = self._cell_range(rect)
+        self.ranges[item] = cell_range
+        self._add_to_cells(item, cell_range)
+
+    def remove(self, item: Any) -> None:
+        """Удаление объекта (если его нет, ничего не происходит)"""
+        cell_range = self.ranges.pop(item, None)
+        if cell_range is not None:
+            self._remove_from_cells(item, cell_range)
+
+    def move(self, item: Any, rect: pygame.Rect) -> None:
+        """Обновление прямоугольника объекта
+
+        Ячейки перестраиваются только если объект пересек границу ячейки.
+        """
+        cell_range = self._cell_range(rect)
+        old_range = self.ranges.get(item)
+        if old_range == cell_range:
+            return
+        if old_range is not None:
+            self._remove_from_cells(item, old_range)
+        self.ranges[item] = cell_range
+        self._add_to_cells(item, cell_range)
+
+    def query(self, rect: pygame.Rect) -> List[Any]:
+        """Объекты из ячеек, которые задевает прямоугольник (без точной проверки)"""
+        x0, y0, x1, y1 = self._cell_range(rect)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            return list(cells.get((x0, y0), ()))
+
+        found: Dict[Any, None] = {}
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    found.update(cell)
+        return list(found)
+
+    def clear(self) -> None:
+        """Удаление всех объектов"""
+        self.cells.clear()
+        self.ranges.clear()
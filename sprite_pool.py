@@ -0,0 +1,94 @@
+"""
+Пулы спрайтов: объекты уровня переиспользуются при смене уровня
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Type
+
+import pygame
+
+# Сколько свободных спрайтов одного типа хранить (остальные отдаются сборщику мусора)
+DEFAULT_POOL_LIMIT = 4096
+
+
+class SpritePool:
+    """Свободные спрайты одного типа
+
+    acquire(*args) берет спрайт из пула и переинициализирует его методом
+    reset(*args) (те же аргументы, что у конструктора) или создает новый,
+    если пул пуст. release() убирает спрайт из всех групп и возвращает в пул.
+    Уровни готовятся и в фоновом потоке (см. preloader), поэтому пул
+    защищен блокировкой.
+    """
+
+    def __init__(self, cls: Type[pygame.sprite.Sprite], limit: Optional[int] = DEFAULT_POOL_LIMIT):
+        self.cls = cls
+        self.limit = limit
+        self._free: List[pygame.sprite.Sprite] = []
+        self._lock = threading.Lock()
+        # Счетчики для проверки, что повторные загрузки не создают новых объектов
+        self.created = 0
+        self.reused = 0
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self, *args: Any) -> pygame.sprite.Sprite:
+        with self._lock:
+            sprite = self._free.pop() if self._free else None
+            if sprite is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if sprite is None:
+            return self.cls(*args)
+        sprite.reset(*args)
+        return sprite
+
+    def release(self, sprite: pygame.sprite.Sprite) -> None:
+        sprite.kill()
+        with self._lock:
+            if self.limit is None or len(self._free) < self.limit:
+                self._free.append(sprite)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._free.clear()
+
+
+class SpritePools:
+    """Пулы по типам спрайтов (тип берется из класса или из самого спрайта)"""
+
+    def __init__(self, limit: Optional[int] = DEFAULT_POOL_LIMIT):
+        self.limit = limit
+        self._pools: Dict[type, SpritePool] = {}
+        self._lock = threading.Lock()
+
+    def pool(self, cls: Type[pygame.sprite.Sprite]) -> SpritePool:
+        with self._lock:
+            pool = self._pools.get(cls)
+            if pool is None:
+                pool = self._pools[cls] = SpritePool(cls, self.limit)
+            return pool
+
+    def acquire(self, cls: Type[pygame.sprite.Sprite], *args: Any) -> pygame.sprite.Sprite:
+        """Спрайт типа cls с аргументами конструктора args"""
+        return self.pool(cls).acquire(*args)
+
+    def release(self, sprite: pygame.sprite.Sprite) -> None:
+        """Возврат спрайта в пул его типа; каждый спрайт возвращается один раз"""
+        self.pool(type(sprite)).release(sprite)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Свободные, созданные и переиспользованные спрайты по типам"""
+        with self._lock:
+            pools = list(self._pools.values())
+        return {pool.cls.__name__: {"free": len(pool), "created": pool.created, "reused": pool.reused}
+                for pool in pools}
+
+    def clear(self) -> None:
+        """Освобождение всех свободных спрайтов"""
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.clear()